@@ -70,6 +70,13 @@ fi
 # 进入脚本目录
 cd "$SCRIPT_DIR"
 
+# 公众号接口额度预检：今日额度已用完时仍生成文章，但跳过发布到草稿箱（避免发布到一半失败）
+WECHAT_BUDGET_OK=1
+if ! python3 scripts/publisher.py --check-budget 2>&1 | tee -a "$LOG_FILE"; then
+    WECHAT_BUDGET_OK=0
+    log "⚠️ 公众号接口额度不足，本次只生成文章，不发布到草稿箱"
+fi
+
 # 创建输出目录（统一保存到生成记录目录）
 OUTPUT_DIR="/home/ubuntu/生成记录/$DATE"
 mkdir -p "$OUTPUT_DIR"
@@ -286,14 +293,18 @@ if [ "$ARTICLE_PASSED" = "true" ]; then
 
             log "✅ 封面图验证通过: $COVER_FILE ($(ls -lh "$COVER_FILE" | awk '{print $5}'))"
 
-            # 发布到草稿箱
-            if timeout 60 python3 /home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py \
+            # 发布到草稿箱（额度预检未通过时跳过，文章已保存）
+            if [ "$WECHAT_BUDGET_OK" != "1" ]; then
+                log "⚠️ 公众号接口额度不足，跳过发布到草稿箱（文章已保存: $HTML_FILE）"
+            elif timeout 60 python3 /home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py \
                 --title "$GENERATED_TITLE" \
                 --content "$HTML_FILE" \
                 --cover "$COVER_FILE" \
                 --author "阳桃AI干货" 2>&1 | tee -a "$LOG_FILE"; then
 
                 log "✅ 发布到草稿箱成功"
+            elif [ $? -eq 3 ]; then
+                log "⚠️ 公众号接口额度不足，未发布到草稿箱（文章已保存: $HTML_FILE）"
             else
                 log "❌ 发布到草稿箱失败"
             fi
@@ -449,7 +460,8 @@ fi
 log "步骤8: 更新发布历史..."
 if python3 "$SCRIPT_DIR/scripts/update_history.py" \
     "$CACHE_DIR/selected_topic.json" \
-    "$GENERATED_TITLE" 2>&1 | tee -a "$LOG_FILE"; then
+    "$GENERATED_TITLE" \
+    ${MARKDOWN_FILE:+"$MARKDOWN_FILE"} 2>&1 | tee -a "$LOG_FILE"; then
     log "✅ 历史记录已更新"
 else
     log "⚠️  历史记录更新失败（不影响发布）"
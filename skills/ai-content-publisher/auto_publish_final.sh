@@ -55,6 +55,15 @@ fi
 # 进入脚本目录
 cd "$SCRIPT_DIR"
 
+# 公众号接口额度预检：今日额度已用完时仍生成文章，但跳过发布到草稿箱（避免发布到一半失败）
+# 本脚本未开启 pipefail，管道的退出码是 tee 的，用 PIPESTATUS 取 python 的退出码
+WECHAT_BUDGET_OK=1
+python3 scripts/publisher.py --check-budget 2>&1 | tee -a "$LOG_FILE"
+if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+    WECHAT_BUDGET_OK=0
+    log "⚠️ 公众号接口额度不足，本次只生成文章，不发布到草稿箱"
+fi
+
 # 创建必要目录
 mkdir -p "$CACHE_DIR"
 OUTPUT_DIR="/home/ubuntu/生成记录/$DATE"
@@ -260,16 +269,24 @@ if [ -n "$MARKDOWN_FILE" ] && [ -f "$MARKDOWN_FILE" ]; then
 
         log "✅ 封面图验证通过: $COVER_FILE ($(ls -lh "$COVER_FILE" | awk '{print $5}'))"
 
-        # 发布到草稿箱
-        if timeout 60 python3 /home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py \
-            --title "$GENERATED_TITLE" \
-            --content "$HTML_FILE" \
-            --cover "$COVER_FILE" \
-            --author "阳桃AI干货" 2>&1 | tee -a "$LOG_FILE"; then
-
-            log "✅ 微信公众号发布成功"
+        # 发布到草稿箱（额度预检未通过时跳过，文章已保存）
+        if [ "$WECHAT_BUDGET_OK" != "1" ]; then
+            log "⚠️ 公众号接口额度不足，跳过发布到草稿箱（文章已保存: $HTML_FILE）"
         else
-            log "❌ 微信公众号发布失败"
+            timeout 60 python3 /home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py \
+                --title "$GENERATED_TITLE" \
+                --content "$HTML_FILE" \
+                --cover "$COVER_FILE" \
+                --author "阳桃AI干货" 2>&1 | tee -a "$LOG_FILE"
+            PUBLISH_STATUS=${PIPESTATUS[0]}
+
+            if [ "$PUBLISH_STATUS" -eq 0 ]; then
+                log "✅ 微信公众号发布成功"
+            elif [ "$PUBLISH_STATUS" -eq 3 ]; then
+                log "⚠️ 公众号接口额度不足，未发布到草稿箱（文章已保存: $HTML_FILE）"
+            else
+                log "❌ 微信公众号发布失败"
+            fi
         fi
     else
         log "❌ HTML格式化失败"
@@ -372,7 +389,8 @@ fi
 log "步骤9: 更新发布历史（防止未来重复）..."
 if python3 "$SCRIPT_DIR/scripts/update_history.py" \
     "$CACHE_DIR/selected_topic.json" \
-    "$GENERATED_TITLE" 2>&1 | tee -a "$LOG_FILE"; then
+    "$GENERATED_TITLE" \
+    ${MARKDOWN_FILE:+"$MARKDOWN_FILE"} 2>&1 | tee -a "$LOG_FILE"; then
     log "✅ 历史记录已更新"
 else
     log "⚠️  历史记录更新失败（不影响发布）"
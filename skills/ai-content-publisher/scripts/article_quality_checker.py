@@ -4,28 +4,204 @@
 根据多个维度评估文章质量，低分文章自动重新生成
 """
 
+import hashlib
 import os
 import re
+import sys
 import yaml
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from markdown_blocks import parse_markdown
+from originality_index import open_default_index
+
+
+# 检查逻辑版本（修改评分逻辑时递增，使批量审计缓存失效）
+CHECKER_VERSION = '3'
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器
+
+    将一组关键词编译为一个前缀树形式的正则，对文本做一次扫描即可得到所有出现过的
+    关键词。每个位置用前瞻匹配最长的关键词，同一位置上更短的关键词必然是它的前缀，
+    因此结果与逐个关键词做子串查找完全一致。
+    """
+
+    def __init__(self, keywords):
+        self.keywords = frozenset(kw for kw in keywords if kw)
+        self.always = '' in keywords  # 空串出现在任何文本中
+
+        self._pattern = None
+        if self.keywords:
+            first_chars = ''.join(sorted({re.escape(kw[0]) for kw in self.keywords}))
+            self._pattern = re.compile(
+                f'(?=[{first_chars}])(?=({self._trie_pattern(self.keywords)}))'
+            )
+
+        # 最长匹配 -> 同一位置上同时出现的所有关键词
+        self._prefixes = {
+            kw: frozenset(other for other in self.keywords if kw.startswith(other))
+            for kw in self.keywords
+        }
+
+    @staticmethod
+    def _trie_pattern(keywords):
+        """把关键词构造成前缀树正则，每个位置的匹配代价与关键词数量无关"""
+        trie = {}
+        for kw in keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        def build(node):
+            branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # 当前节点本身是关键词结尾时，后续部分可选（贪婪匹配保证取最长）
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def find(self, text):
+        """返回 text 中出现过的关键词集合"""
+        found = set()
+        if self.always:
+            found.add('')
+        if self._pattern is None:
+            return found
+
+        seen = set()
+        for match in self._pattern.finditer(text):
+            longest = match.group(1)
+            if longest not in seen:
+                seen.add(longest)
+                found |= self._prefixes[longest]
+                if len(found) == len(self.keywords):
+                    break
+        return found
+
+
+class ArticleAnalysis:
+    """文章的一次性分析结果（块结构 + 关键词命中），供所有维度共用"""
+
+    def __init__(self, content, matcher, case_sensitive_matcher):
+        self.content = content
+        self.word_count = len(content)
+
+        # 结构：解析一次 Markdown 块结构（按内容哈希缓存）
+        self.doc = parse_markdown(content)
+        self.intro_length = len(' '.join(block.text for block in self.doc.intro_blocks()))
+        self.paragraphs = [block.text for block in self.doc.paragraphs]
+
+        # 关键词：只检查正文（不含代码块），不区分大小写的规则只对小写文本扫描一次
+        prose = self.doc.prose_text
+        self.matched = matcher.find(prose.lower())
+        self.matched_case_sensitive = case_sensitive_matcher.find(prose)
+
+        # 与已发布文章的重复（由 corpus_overlap 规则填充）
+        self.overlaps = []
+
+    def contains(self, keywords):
+        """是否包含任一关键词（不区分大小写）"""
+        return any(kw.lower() in self.matched for kw in keywords)
+
+    def count_case_sensitive(self, keywords):
+        """出现过的关键词个数（区分大小写）"""
+        return sum(1 for kw in keywords if kw in self.matched_case_sensitive)
+
+    def structure_count(self, check, rule):
+        """结构类检查的计数"""
+        if check == 'code_blocks':
+            return len(self.doc.code_blocks)
+        if check == 'lists_or_tables':
+            return len(self.doc.lists) + len(self.doc.tables)
+        if check == 'heading_count':
+            return self.doc.heading_count(min_level=rule.get('min_level', 2))
+        raise ValueError(f"未知的结构检查: {check}")
+
 
 class ArticleQualityChecker:
     """文章质量检查器"""
 
-    def __init__(self, config_path=None):
-        """初始化检查器"""
+    def __init__(self, config_path=None, originality_index=None):
+        """
+        初始化检查器
+
+        Args:
+            config_path: 规则文件路径（默认 config/quality_rules.yaml）
+            originality_index: OriginalityIndex；默认在需要时打开 cache/ 下的索引
+        """
         if config_path is None:
             script_dir = Path(__file__).parent
             config_path = script_dir.parent / 'config' / 'quality_rules.yaml'
 
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+        with open(config_path, 'rb') as f:
+            raw_config = f.read()
+        self.config = yaml.safe_load(raw_config.decode('utf-8'))
+
+        # 规则指纹：规则文件或检查器逻辑变化时，批量审计缓存失效
+        self.rules_fingerprint = hashlib.sha256(
+            CHECKER_VERSION.encode('utf-8') + b'\0' + raw_config
+        ).hexdigest()
 
         self.thresholds = self.config['thresholds']
         self.dimensions = self.config['dimensions']
         self.penalties = self.config['penalties']
 
+        self._originality_index = originality_index
+        self._originality_index_loaded = originality_index is not None
+        # 只关闭检查器自己打开的索引，传入的索引由调用方关闭
+        self._owns_originality_index = originality_index is None
+
+        self._compile_rules()
+
+    def close(self):
+        """关闭检查器打开的原创性索引（之后需要时会重新打开）"""
+        if self._owns_originality_index and self._originality_index is not None:
+            self._originality_index.close()
+            self._originality_index = None
+            self._originality_index_loaded = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def originality_version(self):
+        """原创性索引版本（没有索引时为空字符串），重复检查的扣分随索引内容变化"""
+        index = self._load_originality_index()
+        return index.version() if index is not None else ''
+
+    def _load_originality_index(self):
+        if self._originality_index is None and not self._originality_index_loaded:
+            self._originality_index_loaded = True
+            self._originality_index = open_default_index()
+        return self._originality_index
+
+    def _compile_rules(self):
+        """把所有规则的关键词编译为两个多关键词匹配器"""
+        keywords = set()
+        for dimension in self.dimensions.values():
+            for rule in dimension['rules']:
+                keywords.update(kw.lower() for kw in rule.get('keywords', []))
+                keywords.update(kw.lower() for kw in rule.get('avoid_keywords', []))
+        self._matcher = KeywordMatcher(keywords)
+
+        case_sensitive = set()
+        for rule in self.penalties:
+            case_sensitive.update(rule.get('keywords', []))
+        self._case_sensitive_matcher = KeywordMatcher(case_sensitive)
+
+    def analyze(self, content):
+        """对文章做一次扫描，返回 ArticleAnalysis"""
+        return ArticleAnalysis(content, self._matcher, self._case_sensitive_matcher)
+
     def check_article(self, article_path):
         """
         检查文章质量
@@ -40,56 +216,94 @@ class ArticleQualityChecker:
         with open(article_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        # 计算各维度得分
+        return self.check_content(content)
+
+    def check_content(self, content):
+        """
+        检查文章内容的质量
+
+        Args:
+            content: Markdown 文本
+
+        Returns:
+            (score, details, passed)
+        """
+        result = self.evaluate(content)
+        return result['score'], result['details'], result['passed']
+
+    def evaluate(self, content):
+        """
+        检查文章内容并返回完整结果
+
+        Args:
+            content: Markdown 文本
+
+        Returns:
+            {'score', 'passed', 'dimensions', 'penalty', 'details', 'overlaps'}
+        """
+        analysis = self.analyze(content)
+        scores, details, penalty_score = self._score(analysis)
+
+        # 总分
+        total_score = sum(scores.values()) + penalty_score
+        total_score = max(0, min(100, total_score))  # 限制在0-100之间
+
+        # 判断是否通过
+        passed = total_score >= self.thresholds['poor']
+
+        return {
+            'score': total_score,
+            'passed': passed,
+            'dimensions': scores,
+            'penalty': penalty_score,
+            'details': details,
+            'overlaps': analysis.overlaps,
+        }
+
+    def _score(self, analysis):
+        """基于一次分析结果计算各维度得分"""
         scores = {}
         details = []
 
         # 1. 实用性评分
-        prac_score, prac_details = self._check_practicality(content)
+        prac_score, prac_details = self._check_practicality(analysis)
         scores['practicality'] = prac_score
         details.extend(prac_details)
 
         # 2. 深度分析评分
-        depth_score, depth_details = self._check_depth(content)
+        depth_score, depth_details = self._check_depth(analysis)
         scores['depth'] = depth_score
         details.extend(depth_details)
 
         # 3. 结构完整性评分
-        struct_score, struct_details = self._check_structure(content)
+        struct_score, struct_details = self._check_structure(analysis)
         scores['structure'] = struct_score
         details.extend(struct_details)
 
         # 4. 可读性评分
-        read_score, read_details = self._check_readability(content)
+        read_score, read_details = self._check_readability(analysis)
         scores['readability'] = read_score
         details.extend(read_details)
 
         # 5. 原创性评分
-        orig_score, orig_details = self._check_originality(content)
+        orig_score, orig_details = self._check_originality(analysis)
         scores['originality'] = orig_score
         details.extend(orig_details)
 
         # 6. 扣分项
-        penalty_score, penalty_details = self._check_penalties(content)
+        penalty_score, penalty_details = self._check_penalties(analysis)
         details.extend(penalty_details)
 
-        # 总分
-        total_score = sum(scores.values()) + penalty_score
-        total_score = max(0, min(100, total_score))  # 限制在0-100之间
+        return scores, details, penalty_score
 
-        # 判断是否通过
-        passed = total_score >= self.thresholds['poor']
-
-        return total_score, details, passed
-
-    def _check_practicality(self, content):
+    def _check_practicality(self, analysis):
         """检查实用性"""
         score = 0
         details = []
         rules = self.dimensions['practicality']['rules']
 
         for rule in rules:
-            if self._contains_keywords(content, rule['keywords']):
+            if self._rule_matches(rule, analysis):
                 score += rule['score']
                 details.append(f"✅ {rule['name']} (+{rule['score']}分)")
             else:
@@ -97,14 +311,14 @@ class ArticleQualityChecker:
 
         return score, details
 
-    def _check_depth(self, content):
+    def _check_depth(self, analysis):
         """检查深度"""
         score = 0
         details = []
         rules = self.dimensions['depth']['rules']
 
         # 字数检查
-        word_count = len(content)
+        word_count = analysis.word_count
         if word_count >= rules[0]['min_words']:
             score += rules[0]['score']
             details.append(f"✅ {rules[0]['name']} ({word_count}字, +{rules[0]['score']}分)")
@@ -112,14 +326,14 @@ class ArticleQualityChecker:
             details.append(f"❌ {rules[0]['name']} ({word_count}字 < {rules[0]['min_words']}字, 0分)")
 
         # 技术细节检查
-        if self._contains_keywords(content, rules[1]['keywords']):
+        if analysis.contains(rules[1]['keywords']):
             score += rules[1]['score']
             details.append(f"✅ {rules[1]['name']} (+{rules[1]['score']}分)")
         else:
             details.append(f"❌ {rules[1]['name']} (0分)")
 
         # 对比分析检查
-        if self._contains_keywords(content, rules[2]['keywords']):
+        if analysis.contains(rules[2]['keywords']):
             score += rules[2]['score']
             details.append(f"✅ {rules[2]['name']} (+{rules[2]['score']}分)")
         else:
@@ -127,30 +341,21 @@ class ArticleQualityChecker:
 
         return score, details
 
-    def _check_structure(self, content):
+    def _check_structure(self, analysis):
         """检查结构"""
         score = 0
         details = []
         rules = self.dimensions['structure']['rules']
 
         # 引言检查
-        lines = content.split('\n')
-        first_para = []
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                first_para.append(line)
-                if len(' '.join(first_para)) >= rules[0]['min_length']:
-                    break
-
-        if len(' '.join(first_para)) >= rules[0]['min_length']:
+        if analysis.intro_length >= rules[0]['min_length']:
             score += rules[0]['score']
             details.append(f"✅ {rules[0]['name']} (+{rules[0]['score']}分)")
         else:
             details.append(f"❌ {rules[0]['name']} (0分)")
 
-        # 小标题检查
-        heading_count = content.count('##')
+        # 小标题检查（只统计代码块外的二级及以下标题）
+        heading_count = analysis.structure_count('heading_count', rules[1])
         if heading_count >= rules[1]['min_count']:
             score += rules[1]['score']
             details.append(f"✅ {rules[1]['name']} ({heading_count}个, +{rules[1]['score']}分)")
@@ -158,7 +363,7 @@ class ArticleQualityChecker:
             details.append(f"❌ {rules[1]['name']} ({heading_count}个 < {rules[1]['min_count']}个, 0分)")
 
         # 总结检查
-        if self._contains_keywords(content, rules[2]['keywords']):
+        if analysis.contains(rules[2]['keywords']):
             score += rules[2]['score']
             details.append(f"✅ {rules[2]['name']} (+{rules[2]['score']}分)")
         else:
@@ -166,14 +371,14 @@ class ArticleQualityChecker:
 
         return score, details
 
-    def _check_readability(self, content):
+    def _check_readability(self, analysis):
         """检查可读性"""
         score = 0
         details = []
         rules = self.dimensions['readability']['rules']
 
         # 段落长度检查
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip() and not p.strip().startswith('#')]
+        paragraphs = analysis.paragraphs
         if paragraphs:
             avg_length = sum(len(p) for p in paragraphs) / len(paragraphs)
             if avg_length <= rules[0]['max_length']:
@@ -183,7 +388,7 @@ class ArticleQualityChecker:
                 details.append(f"⚠️  {rules[0]['name']} (平均{int(avg_length)}字 > {rules[0]['max_length']}字, 0分)")
 
         # 列表/表格检查
-        if self._contains_keywords(content, rules[1]['keywords']):
+        if self._rule_matches(rules[1], analysis):
             score += rules[1]['score']
             details.append(f"✅ {rules[1]['name']} (+{rules[1]['score']}分)")
         else:
@@ -191,21 +396,21 @@ class ArticleQualityChecker:
 
         return score, details
 
-    def _check_originality(self, content):
+    def _check_originality(self, analysis):
         """检查原创性"""
         score = 0
         details = []
         rules = self.dimensions['originality']['rules']
 
         # 非简单翻译
-        if not self._contains_keywords(content, rules[0]['avoid_keywords']):
+        if not analysis.contains(rules[0]['avoid_keywords']):
             score += rules[0]['score']
             details.append(f"✅ {rules[0]['name']} (+{rules[0]['score']}分)")
         else:
             details.append(f"❌ {rules[0]['name']} (0分)")
 
         # 独特见解
-        if self._contains_keywords(content, rules[1]['keywords']):
+        if analysis.contains(rules[1]['keywords']):
             score += rules[1]['score']
             details.append(f"✅ {rules[1]['name']} (+{rules[1]['score']}分)")
         else:
@@ -213,32 +418,63 @@ class ArticleQualityChecker:
 
         return score, details
 
-    def _check_penalties(self, content):
+    def _rule_matches(self, rule, analysis):
+        """规则是否满足：配置了 check 的按块结构判断，否则按关键词判断"""
+        if 'check' in rule:
+            return analysis.structure_count(rule['check'], rule) >= rule.get('min_count', 1)
+        return analysis.contains(rule['keywords'])
+
+    def _check_penalties(self, analysis):
         """检查扣分项"""
         penalty = 0
         details = []
 
         for rule in self.penalties:
             if rule['name'] == "大量空话":
-                count = sum(1 for kw in rule['keywords'] if kw in content)
+                count = analysis.count_case_sensitive(rule['keywords'])
                 if count > rule.get('max_occurrences', 2):
                     penalty += rule['penalty']
                     details.append(f"⚠️  {rule['name']} ({count}处, {rule['penalty']}分)")
 
+            elif rule.get('check') == 'corpus_overlap':
+                penalty += self._check_corpus_overlap(rule, analysis, details)
+
         return penalty, details
 
-    def _contains_keywords(self, text, keywords):
-        """检查是否包含关键词"""
-        text_lower = text.lower()
-        return any(kw.lower() in text_lower for kw in keywords)
+    def _check_corpus_overlap(self, rule, analysis, details):
+        """与已发布文章的重复检查（需要原创性索引）"""
+        index = self._load_originality_index()
+        if index is None:
+            return 0
+
+        analysis.overlaps = index.query(analysis.content)
+        if not analysis.overlaps:
+            return 0
+
+        penalty = 0
+        top = analysis.overlaps[0]
+        if top['similarity'] >= rule['min_similarity']:
+            penalty = rule['penalty']
+            details.append(f"⚠️  {rule['name']} (《{top['title']}》{top['similarity']:.0%}, {penalty}分)")
+
+        for overlap in analysis.overlaps:
+            details.append(f"   ↳ 《{overlap['title']}》相似度{overlap['similarity']:.0%}，"
+                           f"重复段落{len(overlap['spans'])}处")
+            for span in overlap['spans'][:3]:
+                details.append(f"      第{span['line']}行: {span['text'][:30]}")
+
+        return penalty
 
 
 def main():
     """主函数"""
-    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        from quality_audit import main as audit_main
+        sys.exit(audit_main(sys.argv[2:]))
 
     if len(sys.argv) < 2:
         print("用法: article_quality_checker.py <文章路径>")
+        print("      article_quality_checker.py --batch [目录 ...] [--report 报告路径]")
         sys.exit(1)
 
     article_path = sys.argv[1]
@@ -247,14 +483,12 @@ def main():
         print(f"❌ 文章文件不存在: {article_path}")
         sys.exit(1)
 
-    # 创建检查器
-    checker = ArticleQualityChecker()
-
     # 检查文章
     print(f"\n📝 正在检查文章质量: {os.path.basename(article_path)}")
     print("=" * 60)
 
-    score, details, passed = checker.check_article(article_path)
+    with ArticleQualityChecker() as checker:
+        score, details, passed = checker.check_article(article_path)
 
     # 输出详细结果
     print("\n📊 评分详情：\n")
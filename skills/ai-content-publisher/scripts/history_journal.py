@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+发布历史 JSON 日志模块
+为读取 publish_history.json 的其他 skill 保留 JSON 兼容格式
+
+- publish_history.jsonl：只追加的 JSON Lines 日志，每次发布追加一行
+- publish_history.json：定期压缩得到的快照（{"records": [...]}，格式与旧版一致）
+- 追加和压缩通过 advisory 文件锁串行化；快照使用 fsync + rename 原子替换
+- 读取时合并快照和日志尾部，半行写入会被跳过，不会因局部损坏丢失全部历史
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 历史记录保留时长（7天），压缩时清理
+RETENTION_SECONDS = 7 * 24 * 3600
+
+# 日志超过该大小时触发压缩
+COMPACT_JOURNAL_BYTES = 32 * 1024
+
+# 快照超过该时长未更新时触发压缩（用于清理过期记录）
+COMPACT_INTERVAL_SECONDS = 24 * 3600
+
+
+def get_cache_dir():
+    """获取 skill 的 cache 目录"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(script_dir), 'cache')
+
+
+def get_paths(cache_dir=None):
+    """
+    获取快照、日志和锁文件路径
+
+    Returns:
+        (snapshot_path, journal_path, lock_path)
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    return (
+        os.path.join(cache_dir, 'publish_history.json'),
+        os.path.join(cache_dir, 'publish_history.jsonl'),
+        os.path.join(cache_dir, 'publish_history.lock'),
+    )
+
+
+@contextmanager
+def _locked(lock_path):
+    """持有 advisory 排他锁（不支持 fcntl 的平台上退化为无锁）"""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_dir(path):
+    """fsync 目录，确保 rename 落盘"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path, data):
+    """
+    原子写入 JSON 文件：写临时文件 → fsync → rename
+
+    Args:
+        path: 目标文件路径
+        data: 可 JSON 序列化的对象
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(directory)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _record_key(record):
+    key = (record.get('timestamp', 0), record.get('url', ''), record.get('title', ''))
+    try:
+        hash(key)
+    except TypeError:
+        # 格式错误的记录（如 title 是列表）按内容去重
+        return repr(key)
+    return key
+
+
+def _read_snapshot(snapshot_path):
+    """读取快照记录：快照不存在时返回空列表，存在但无法读取时返回 None"""
+    if not os.path.exists(snapshot_path):
+        return []
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (ValueError, OSError) as e:  # ValueError 包含 JSON 和 UTF-8 解码错误
+        print(f"⚠️  历史快照读取失败（保留原文件，仅使用日志）: {e}")
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('records'), list):
+        print("⚠️  历史快照格式错误（保留原文件，仅使用日志）")
+        return None
+    return data['records']
+
+
+def _read_journal(journal_path):
+    if not os.path.exists(journal_path):
+        return []
+    records = []
+    # 按字节读取：半行可能截断在多字节字符（如中文标题）中间，逐行解码才能只跳过这一行
+    with open(journal_path, 'rb') as f:
+        for line_no, raw in enumerate(f, 1):
+            try:
+                line = raw.decode('utf-8').strip()
+                if not line:
+                    continue
+                records.append(json.loads(line))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                # 崩溃时可能留下半行，跳过即可
+                print(f"⚠️  跳过损坏的日志行: {journal_path}:{line_no}")
+    return records
+
+
+def _merge(snapshot_records, journal_records):
+    """合并快照和日志，去除压缩中断时可能产生的重复记录"""
+    merged = []
+    seen = set()
+    for record in snapshot_records + journal_records:
+        if not isinstance(record, dict):
+            continue
+        key = _record_key(record)
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(record)
+    return merged
+
+
+def load_records(hours=None, cache_dir=None):
+    """
+    读取快照 + 日志尾部
+
+    Args:
+        hours: 只返回最近N小时的记录（默认全部）
+        cache_dir: cache 目录
+
+    Returns:
+        记录字典列表
+    """
+    snapshot_path, journal_path, _ = get_paths(cache_dir)
+    records = _merge(_read_snapshot(snapshot_path) or [], _read_journal(journal_path))
+    if hours is not None:
+        cutoff = time.time() - hours * 3600
+        records = [r for r in records if r.get('timestamp', 0) > cutoff]
+    return records
+
+
+def append_record(record, cache_dir=None):
+    """
+    向日志追加一条记录（O(1)，持锁 + fsync），必要时触发压缩
+
+    Args:
+        record: 记录字典
+        cache_dir: cache 目录
+    """
+    snapshot_path, journal_path, lock_path = get_paths(cache_dir)
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+
+    with _locked(lock_path):
+        # 上次崩溃留下半行时先补换行，避免新记录与残行粘连
+        if _ends_with_partial_line(journal_path):
+            line = '\n' + line
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if _needs_compaction(snapshot_path, journal_path):
+            _compact_locked(snapshot_path, journal_path)
+
+
+def _ends_with_partial_line(journal_path):
+    if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+        return False
+    with open(journal_path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+
+def _needs_compaction(snapshot_path, journal_path):
+    if os.path.getsize(journal_path) >= COMPACT_JOURNAL_BYTES:
+        return True
+    if not os.path.exists(snapshot_path):
+        return True
+    return time.time() - os.path.getmtime(snapshot_path) >= COMPACT_INTERVAL_SECONDS
+
+
+def _compact_locked(snapshot_path, journal_path, retention_seconds=RETENTION_SECONDS):
+    """在已持锁的情况下压缩：快照 + 日志 → 新快照，然后清空日志"""
+    snapshot_records = _read_snapshot(snapshot_path)
+    if snapshot_records is None:
+        # 无法读取的快照先另存，避免被只含日志记录的新快照覆盖；另存失败时本次不压缩
+        corrupt_path = f"{snapshot_path}.corrupt.{int(time.time())}"
+        try:
+            os.replace(snapshot_path, corrupt_path)
+        except OSError as e:
+            print(f"⚠️  无法另存损坏的历史快照，跳过压缩: {e}")
+            return None
+        print(f"⚠️  损坏的历史快照已另存为 {corrupt_path}")
+        snapshot_records = []
+
+    records = _merge(snapshot_records, _read_journal(journal_path))
+    cutoff = time.time() - retention_seconds
+    kept = [r for r in records if r.get('timestamp', 0) > cutoff]
+
+    atomic_write_json(snapshot_path, {'records': kept})
+
+    # 快照已落盘后再截断日志；若在此之前崩溃，下次读取会按记录键去重
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+    pruned = len(records) - len(kept)
+    if pruned > 0:
+        print(f"🧹 快照压缩清理了 {pruned} 条过期记录（>{retention_seconds // 86400}天）")
+    return len(kept)
+
+
+def compact(cache_dir=None, retention_seconds=RETENTION_SECONDS):
+    """
+    立即压缩日志到快照
+
+    Returns:
+        压缩后快照中的记录数；快照损坏且无法另存时返回 None（未压缩）
+    """
+    snapshot_path, journal_path, lock_path = get_paths(cache_dir)
+    with _locked(lock_path):
+        if not os.path.exists(journal_path):
+            open(journal_path, 'a').close()
+        return _compact_locked(snapshot_path, journal_path, retention_seconds)
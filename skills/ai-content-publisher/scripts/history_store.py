@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+发布历史存储模块
+使用本地 SQLite 数据库（WAL 模式）保存发布历史，替代整文件读写的 JSON 方案
+
+- 写入：单行 INSERT，多个 cron 时段重叠时不会互相覆盖
+- 读取：基于 timestamp 索引的范围查询
+- 清理：过期记录在后台线程中分批删除，不阻塞写入
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import history_journal
+
+
+# 历史记录保留时长（7天）
+RETENTION_SECONDS = 7 * 24 * 3600
+
+# 两次自动清理之间的最小间隔（1小时）
+PRUNE_INTERVAL_SECONDS = 3600
+
+# 每批删除的记录数，避免长时间持有写锁
+PRUNE_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    content_type TEXT NOT NULL DEFAULT 'unknown',
+    keywords TEXT NOT NULL DEFAULT '[]',
+    published INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_records_timestamp ON records(timestamp);
+CREATE INDEX IF NOT EXISTS idx_records_content_type ON records(content_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_records_url ON records(url);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+RECORD_COLUMNS = ('date', 'time', 'timestamp', 'title', 'url', 'summary',
+                  'content_type', 'keywords', 'published')
+
+INSERT_SQL = (f"INSERT INTO records ({', '.join(RECORD_COLUMNS)}) "
+              f"VALUES ({', '.join('?' for _ in RECORD_COLUMNS)})")
+
+
+def get_cache_dir():
+    """获取 skill 的 cache 目录"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(script_dir), 'cache')
+
+
+def get_db_path():
+    """获取历史数据库路径"""
+    return os.path.join(get_cache_dir(), 'publish_history.db')
+
+
+def connect(db_path=None):
+    """
+    打开历史数据库连接（WAL 模式），必要时建表并导入旧版 JSON 历史
+
+    Args:
+        db_path: 数据库路径（默认 cache/publish_history.db）
+
+    Returns:
+        sqlite3.Connection
+    """
+    if db_path is None:
+        db_path = get_db_path()
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=30000')
+    conn.executescript(SCHEMA)
+
+    _import_legacy_json(conn, os.path.dirname(db_path))
+    return conn
+
+
+def _get_meta(conn, key, default=None):
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else default
+
+
+def _set_meta(conn, key, value):
+    conn.execute(
+        'INSERT INTO meta (key, value) VALUES (?, ?) '
+        'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+        (key, str(value))
+    )
+
+
+def _import_legacy_json(conn, cache_dir):
+    """首次使用时将 JSON 历史（publish_history.json 快照 + 日志）导入数据库（仅一次）"""
+    if _get_meta(conn, 'legacy_json_imported') is not None:
+        return
+
+    try:
+        records = history_journal.load_records(cache_dir=cache_dir)
+    except OSError as e:
+        print(f"⚠️  JSON 历史记录读取失败，跳过导入: {e}")
+        records = []
+
+    # 格式不对的旧记录跳过，否则每次连接都会导入失败
+    rows = [row for row in map(_legacy_row, records) if row is not None]
+    skipped = len(records) - len(rows)
+
+    with conn:
+        # 加写锁后再检查一次，避免两个进程重复导入
+        conn.execute('BEGIN IMMEDIATE')
+        if _get_meta(conn, 'legacy_json_imported') is not None:
+            return
+        conn.executemany(INSERT_SQL, rows)
+        _set_meta(conn, 'legacy_json_imported', int(time.time()))
+
+    if rows:
+        print(f"📦 已从 JSON 历史导入 {len(rows)} 条历史记录")
+    if skipped:
+        print(f"⚠️  跳过 {skipped} 条格式错误的 JSON 历史记录")
+
+
+def _legacy_row(record):
+    """把旧版 JSON 记录转换为数据库行，格式不对时返回 None"""
+    if not isinstance(record, dict):
+        return None
+    try:
+        row = _record_to_row(record)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    # 每一列都必须是文本或整数（NOT NULL，且不能是列表、字典等），时间戳在 SQLite 整数范围内
+    if not all(isinstance(value, (str, int)) for value in row) or not -2 ** 63 <= row[2] < 2 ** 63:
+        return None
+    return row
+
+
+def _insert(conn, record):
+    cursor = conn.execute(INSERT_SQL, _record_to_row(record))
+    return cursor.lastrowid
+
+
+def _record_to_row(record):
+    return (
+        record.get('date', ''),
+        record.get('time', ''),
+        int(record.get('timestamp', 0)),
+        record.get('title', ''),
+        record.get('url', '') or '',
+        record.get('summary', '') or '',
+        record.get('content_type', 'unknown') or 'unknown',
+        json.dumps(list(record.get('keywords', [])), ensure_ascii=False),
+        1 if record.get('published', True) else 0,
+    )
+
+
+def _row_to_record(row):
+    record = {key: row[key] for key in RECORD_COLUMNS}
+    record['keywords'] = json.loads(record['keywords'] or '[]')
+    record['published'] = bool(record['published'])
+    return record
+
+
+def add_record(record, db_path=None):
+    """
+    写入一条发布记录（单行 INSERT）
+
+    Args:
+        record: 记录字典（date/time/timestamp/title/url/summary/content_type/keywords/published）
+        db_path: 数据库路径
+
+    Returns:
+        新记录的 id
+    """
+    conn = connect(db_path)
+    try:
+        with conn:
+            return _insert(conn, record)
+    finally:
+        conn.close()
+
+
+def load_recent(hours=48, content_type=None, db_path=None):
+    """
+    按时间范围查询最近的发布记录
+
+    Args:
+        hours: 最近N小时
+        content_type: 只返回指定内容类型（可选）
+        db_path: 数据库路径
+
+    Returns:
+        记录字典列表（按时间升序）
+    """
+    cutoff = int(time.time() - hours * 3600)
+    conn = connect(db_path)
+    try:
+        if content_type is None:
+            rows = conn.execute(
+                'SELECT * FROM records WHERE timestamp > ? ORDER BY timestamp',
+                (cutoff,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT * FROM records WHERE content_type = ? AND timestamp > ? '
+                'ORDER BY timestamp',
+                (content_type, cutoff)
+            ).fetchall()
+        return [_row_to_record(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def find_by_url(url, db_path=None):
+    """查询指定 URL 的发布记录"""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            'SELECT * FROM records WHERE url = ? ORDER BY timestamp', (url,)
+        ).fetchall()
+        return [_row_to_record(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def count_records(db_path=None):
+    """返回数据库中的记录总数"""
+    conn = connect(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def prune_expired(retention_seconds=RETENTION_SECONDS, db_path=None):
+    """
+    分批删除过期记录
+
+    Args:
+        retention_seconds: 保留时长（秒）
+        db_path: 数据库路径
+
+    Returns:
+        删除的记录数
+    """
+    cutoff = int(time.time() - retention_seconds)
+    deleted = 0
+    conn = connect(db_path)
+    try:
+        while True:
+            with conn:
+                cursor = conn.execute(
+                    'DELETE FROM records WHERE id IN '
+                    '(SELECT id FROM records WHERE timestamp <= ? LIMIT ?)',
+                    (cutoff, PRUNE_BATCH_SIZE)
+                )
+            deleted += cursor.rowcount
+            if cursor.rowcount < PRUNE_BATCH_SIZE:
+                break
+        with conn:
+            _set_meta(conn, 'last_prune', int(time.time()))
+    finally:
+        conn.close()
+    return deleted
+
+
+def prune_expired_async(retention_seconds=RETENTION_SECONDS, db_path=None,
+                        min_interval=PRUNE_INTERVAL_SECONDS):
+    """
+    在后台线程中清理过期记录（距上次清理不足 min_interval 秒时跳过）
+
+    Returns:
+        清理线程；无需清理时返回 None
+    """
+    conn = connect(db_path)
+    try:
+        last_prune = int(_get_meta(conn, 'last_prune', 0))
+    finally:
+        conn.close()
+
+    if time.time() - last_prune < min_interval:
+        return None
+
+    def _run():
+        try:
+            deleted = prune_expired(retention_seconds, db_path)
+            if deleted > 0:
+                print(f"🧹 清理了 {deleted} 条过期记录（>{retention_seconds // 86400}天）")
+        except sqlite3.Error as e:
+            print(f"⚠️  清理过期记录失败: {e}")
+
+    thread = threading.Thread(target=_run, name='history-prune')
+    thread.start()
+    return thread
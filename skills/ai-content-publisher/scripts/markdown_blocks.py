@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+轻量级 Markdown 块结构解析
+把文章解析为标题、段落、列表、表格、代码块等块，供质量检查等模块共用
+
+解析结果按内容哈希缓存，同一进程内多次检查或处理同一篇文章时只解析一次
+"""
+
+import hashlib
+import re
+from collections import OrderedDict, namedtuple
+
+
+# 块类型：heading / paragraph / list / table / code / quote / hr
+Block = namedtuple('Block', ['kind', 'text', 'level', 'lang', 'line'])
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})\s*([^\s`]*)')
+HEADING_RE = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t#]*$')
+HR_RE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+LIST_ITEM_RE = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+TABLE_DELIMITER_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+QUOTE_RE = re.compile(r'^ {0,3}>')
+
+# 解析缓存（内容哈希 -> MarkdownDocument）
+CACHE_SIZE = 64
+_cache = OrderedDict()
+
+
+class MarkdownDocument:
+    """解析后的文章块结构"""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def of_kind(self, kind):
+        return [block for block in self.blocks if block.kind == kind]
+
+    @property
+    def headings(self):
+        return self.of_kind('heading')
+
+    @property
+    def paragraphs(self):
+        return self.of_kind('paragraph')
+
+    @property
+    def lists(self):
+        return self.of_kind('list')
+
+    @property
+    def tables(self):
+        return self.of_kind('table')
+
+    @property
+    def code_blocks(self):
+        return self.of_kind('code')
+
+    def heading_count(self, min_level=1, max_level=6):
+        """统计指定级别范围内的标题数"""
+        return sum(1 for block in self.headings if min_level <= block.level <= max_level)
+
+    def intro_blocks(self):
+        """引言：第一个二级及以下标题之前的段落和引用"""
+        intro = []
+        for block in self.blocks:
+            if block.kind == 'heading' and block.level >= 2:
+                break
+            if block.kind in ('paragraph', 'quote'):
+                intro.append(block)
+        return intro
+
+    @property
+    def prose_text(self):
+        """除代码块外的全部文本（用于关键词检查）"""
+        return '\n'.join(block.text for block in self.blocks if block.kind != 'code')
+
+
+def _is_block_start(line, next_line):
+    """该行是否开始一个新的非段落块"""
+    return bool(
+        FENCE_RE.match(line) or HEADING_RE.match(line) or HR_RE.match(line)
+        or LIST_ITEM_RE.match(line) or QUOTE_RE.match(line)
+        or ('|' in line and next_line is not None and TABLE_DELIMITER_RE.match(next_line))
+    )
+
+
+def _parse(content):
+    lines = content.split('\n')
+    blocks = []
+    i = 0
+    n = len(lines)
+
+    while i < n:
+        line = lines[i]
+        next_line = lines[i + 1] if i + 1 < n else None
+
+        if not line.strip():
+            i += 1
+            continue
+
+        # 围栏代码块
+        fence = FENCE_RE.match(line)
+        if fence:
+            marker = fence.group(1)
+            start = i
+            body = []
+            i += 1
+            while i < n:
+                stripped = lines[i].strip()
+                if stripped.startswith(marker[0] * len(marker)) and not stripped.strip(marker[0]):
+                    i += 1
+                    break
+                body.append(lines[i])
+                i += 1
+            blocks.append(Block('code', '\n'.join(body), 0, fence.group(2).lower(), start + 1))
+            continue
+
+        # ATX 标题
+        heading = HEADING_RE.match(line)
+        if heading:
+            blocks.append(Block('heading', (heading.group(2) or '').strip(),
+                                len(heading.group(1)), '', i + 1))
+            i += 1
+            continue
+
+        # 分隔线
+        if HR_RE.match(line):
+            blocks.append(Block('hr', '', 0, '', i + 1))
+            i += 1
+            continue
+
+        # 表格（表头 + 分隔行）
+        if '|' in line and next_line is not None and TABLE_DELIMITER_RE.match(next_line):
+            start = i
+            rows = [line]
+            i += 2
+            while i < n and lines[i].strip() and '|' in lines[i]:
+                rows.append(lines[i])
+                i += 1
+            blocks.append(Block('table', '\n'.join(rows), 0, '', start + 1))
+            continue
+
+        # 引用
+        if QUOTE_RE.match(line):
+            start = i
+            quoted = []
+            while i < n and lines[i].strip() and QUOTE_RE.match(lines[i]):
+                quoted.append(QUOTE_RE.sub('', lines[i], count=1).strip())
+                i += 1
+            blocks.append(Block('quote', '\n'.join(quoted), 0, '', start + 1))
+            continue
+
+        # 列表（含缩进的续行）
+        if LIST_ITEM_RE.match(line):
+            start = i
+            items = []
+            while i < n:
+                current = lines[i]
+                if LIST_ITEM_RE.match(current):
+                    items.append(LIST_ITEM_RE.sub('', current, count=1).strip())
+                elif current.strip() and current[:1] in (' ', '\t') and items:
+                    items[-1] += ' ' + current.strip()
+                else:
+                    break
+                i += 1
+            blocks.append(Block('list', '\n'.join(items), 0, '', start + 1))
+            continue
+
+        # 段落：直到空行或新块开始
+        start = i
+        para = [line.strip()]
+        i += 1
+        while i < n and lines[i].strip():
+            following = lines[i + 1] if i + 1 < n else None
+            if _is_block_start(lines[i], following):
+                break
+            para.append(lines[i].strip())
+            i += 1
+        blocks.append(Block('paragraph', ' '.join(para), 0, '', start + 1))
+
+    return MarkdownDocument(blocks)
+
+
+def content_hash(content):
+    """文章内容的 SHA-256"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def parse_markdown(content):
+    """
+    解析 Markdown 为块结构（按内容哈希缓存）
+
+    Args:
+        content: Markdown 文本
+
+    Returns:
+        MarkdownDocument
+    """
+    key = content_hash(content)
+    doc = _cache.get(key)
+    if doc is not None:
+        _cache.move_to_end(key)
+        return doc
+
+    doc = _parse(content)
+    _cache[key] = doc
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return doc
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+已发布文章的原创性索引
+检测新文章是否大段重复了我们自己近期发布过的内容
+
+- 对正文（不含代码块）做字符 shingle，用单次哈希 MinHash（one permutation hashing）生成签名
+- 签名按 LSH 分桶存入 SQLite，查询只访问同桶的候选文章，与文章总数无关
+- 对最相似的候选文章再逐段比对，给出重复的段落位置
+- update_history 记录发布时增量写入索引
+
+用法:
+    originality_index.py add <文章.md> [--title 标题]
+    originality_index.py build <目录 ...>
+    originality_index.py query <文章.md>
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from markdown_blocks import content_hash, parse_markdown
+
+
+# shingle 长度（字符数，去除空白和标点后）
+SHINGLE_SIZE = 5
+
+# 签名长度 = LSH 分带数 × 每带行数
+NUM_BINS = 128
+LSH_BANDS = 64
+LSH_ROWS = NUM_BINS // LSH_BANDS
+
+# 查询参数（相似度为新文章内容被旧文章包含的比例）
+DEFAULT_TOP_K = 3
+DEFAULT_MIN_SIMILARITY = 0.2
+
+# 段落被视为重复的最小包含度（新段落 shingle 有多少比例出现在旧段落中）
+SPAN_MIN_CONTAINMENT = 0.5
+SPAN_MIN_SHINGLES = 10
+
+_MAX_HASH = (1 << 64) - 1
+_SIGNATURE_STRUCT = struct.Struct(f'<{NUM_BINS}Q')
+_NOISE_RE = re.compile(r'[\s\W_]+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL DEFAULT '',
+    content_hash TEXT NOT NULL UNIQUE,
+    published_at INTEGER NOT NULL,
+    shingle_count INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets(band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_article ON lsh_buckets(article_id);
+"""
+
+
+def get_db_path():
+    """获取原创性索引数据库路径"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(script_dir), 'cache', 'originality_index.db')
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _normalize(text):
+    """小写并去掉空白和标点，使排版差异不影响比对"""
+    return _NOISE_RE.sub('', text.lower())
+
+
+def shingle_hashes(text):
+    """文本的 shingle 哈希集合"""
+    normalized = _normalize(text)
+    if len(normalized) < SHINGLE_SIZE:
+        return {_hash64(normalized)} if normalized else set()
+    return {
+        _hash64(normalized[i:i + SHINGLE_SIZE])
+        for i in range(len(normalized) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(hashes):
+    """
+    单次哈希 MinHash：每个 shingle 按哈希值分到一个桶，桶内取最小值；
+    空桶向右借用最近的非空桶（densification），保证签名可比
+    """
+    bins = [_MAX_HASH] * NUM_BINS
+    for h in hashes:
+        index = h % NUM_BINS
+        value = h // NUM_BINS
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == _MAX_HASH for value in bins):
+        return bins
+
+    for i in range(NUM_BINS):
+        if bins[i] != _MAX_HASH:
+            continue
+        offset = 1
+        while bins[(i + offset) % NUM_BINS] == _MAX_HASH:
+            offset += 1
+        # 借用的值加上偏移，避免不同空桶得到完全相同的值
+        bins[i] = bins[(i + offset) % NUM_BINS] + offset * NUM_BINS
+    return bins
+
+
+def estimate_similarity(sig_a, sig_b):
+    """由签名估计 Jaccard 相似度"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_BINS
+
+
+def estimate_containment(jaccard, size_a, size_b):
+    """由 Jaccard 估计 A 被 B 包含的比例 |A∩B| / |A|"""
+    if size_a == 0:
+        return 0.0
+    intersection = jaccard * (size_a + size_b) / (1 + jaccard)
+    return min(1.0, intersection / size_a)
+
+
+def _band_buckets(signature):
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f'<{LSH_ROWS}Q', *rows), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'little', signed=True)
+
+
+def _prose_blocks(content):
+    """参与比对的正文块（不含代码块、标题和分隔线）"""
+    doc = parse_markdown(content)
+    return [block for block in doc.blocks if block.kind in ('paragraph', 'list', 'quote', 'table')]
+
+
+class OriginalityIndex:
+    """已发布文章的 MinHash/LSH 索引"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or get_db_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def count(self):
+        """索引中的文章数"""
+        return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def version(self):
+        """索引版本（文章数:最大 id），文章增删后变化，依赖索引的缓存据此失效"""
+        count, max_id = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(MAX(id), 0) FROM articles'
+        ).fetchone()
+        return f"{count}:{max_id}"
+
+    def add_article(self, content, title='', path='', published_at=None):
+        """
+        把一篇已发布文章加入索引（相同内容只索引一次）
+
+        Args:
+            content: 文章 Markdown
+            title: 标题
+            path: 文章文件路径
+            published_at: 发布时间戳（默认当前时间）
+
+        Returns:
+            文章 id；内容已在索引中时返回 None
+        """
+        key = content_hash(content)
+        prose = '\n'.join(block.text for block in _prose_blocks(content))
+        hashes = shingle_hashes(prose)
+        signature = minhash_signature(hashes)
+
+        try:
+            with self.conn:
+                cursor = self.conn.execute(
+                    'INSERT INTO articles '
+                    '(title, path, content_hash, published_at, shingle_count, signature, body) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (title, str(path), key, int(published_at or time.time()), len(hashes),
+                     _SIGNATURE_STRUCT.pack(*signature),
+                     zlib.compress(content.encode('utf-8')))
+                )
+                article_id = cursor.lastrowid
+                if not hashes:
+                    return article_id
+                self.conn.executemany(
+                    'INSERT INTO lsh_buckets (band, bucket, article_id) VALUES (?, ?, ?)',
+                    [(band, bucket, article_id) for band, bucket in _band_buckets(signature)]
+                )
+        except sqlite3.IntegrityError:
+            return None
+        return article_id
+
+    def query(self, content, top_k=DEFAULT_TOP_K, min_similarity=DEFAULT_MIN_SIMILARITY):
+        """
+        查找与文章重复度最高的已发布文章
+
+        Args:
+            content: 待检查文章 Markdown
+            top_k: 最多返回的文章数
+            min_similarity: 最低相似度（新文章内容被旧文章包含的估计比例）
+
+        Returns:
+            [{'id', 'title', 'path', 'published_at', 'similarity', 'spans'}, ...]（按相似度降序）
+            spans 为重复段落列表：[{'line', 'prior_line', 'containment', 'text'}, ...]
+        """
+        blocks = _prose_blocks(content)
+        prose = '\n'.join(block.text for block in blocks)
+        hashes = shingle_hashes(prose)
+        if not hashes:
+            return []
+        signature = minhash_signature(hashes)
+        key = content_hash(content)
+
+        # LSH：只取与任一分带同桶的候选
+        candidate_ids = set()
+        for band, bucket in _band_buckets(signature):
+            for row in self.conn.execute(
+                'SELECT article_id FROM lsh_buckets WHERE band = ? AND bucket = ?', (band, bucket)
+            ):
+                candidate_ids.add(row['article_id'])
+        if not candidate_ids:
+            return []
+
+        placeholders = ','.join('?' for _ in candidate_ids)
+        rows = self.conn.execute(
+            f'SELECT id, title, path, content_hash, published_at, shingle_count, signature '
+            f'FROM articles WHERE id IN ({placeholders})',
+            tuple(candidate_ids)
+        ).fetchall()
+
+        scored = []
+        for row in rows:
+            if row['content_hash'] == key:
+                continue  # 同一篇文章
+            jaccard = estimate_similarity(signature, _SIGNATURE_STRUCT.unpack(row['signature']))
+            similarity = estimate_containment(jaccard, len(hashes), row['shingle_count'])
+            if similarity >= min_similarity:
+                scored.append((similarity, row))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        results = []
+        for similarity, row in scored[:top_k]:
+            body = self.conn.execute(
+                'SELECT body FROM articles WHERE id = ?', (row['id'],)
+            ).fetchone()['body']
+            prior_content = zlib.decompress(body).decode('utf-8')
+            results.append({
+                'id': row['id'],
+                'title': row['title'],
+                'path': row['path'],
+                'published_at': row['published_at'],
+                'similarity': round(similarity, 3),
+                'spans': overlapping_spans(blocks, _prose_blocks(prior_content)),
+            })
+        return results
+
+
+def overlapping_spans(blocks, prior_blocks):
+    """逐段比对，返回新文章中与旧文章重复的段落"""
+    owner = {}
+    for index, block in enumerate(prior_blocks):
+        for h in shingle_hashes(block.text):
+            owner.setdefault(h, []).append(index)
+
+    spans = []
+    for block in blocks:
+        hashes = shingle_hashes(block.text)
+        if len(hashes) < SPAN_MIN_SHINGLES:
+            continue
+        hits = {}
+        for h in hashes:
+            for index in owner.get(h, ()):
+                hits[index] = hits.get(index, 0) + 1
+        if not hits:
+            continue
+        best_index, best_hits = max(hits.items(), key=lambda item: item[1])
+        containment = best_hits / len(hashes)
+        if containment >= SPAN_MIN_CONTAINMENT:
+            spans.append({
+                'line': block.line,
+                'prior_line': prior_blocks[best_index].line,
+                'containment': round(containment, 3),
+                'text': block.text[:60],
+            })
+    return spans
+
+
+def open_default_index():
+    """默认索引已存在时打开它，否则返回 None"""
+    if not os.path.exists(get_db_path()):
+        return None
+    return OriginalityIndex()
+
+
+def main(argv=None):
+    """主函数，返回退出码"""
+    parser = argparse.ArgumentParser(description='已发布文章原创性索引')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='索引一篇已发布文章')
+    add_parser.add_argument('article')
+    add_parser.add_argument('--title', default='')
+
+    build_parser = subparsers.add_parser('build', help='批量索引目录下的文章')
+    build_parser.add_argument('roots', nargs='+')
+
+    query_parser = subparsers.add_parser('query', help='查询文章与已发布内容的重复')
+    query_parser.add_argument('article')
+    query_parser.add_argument('--top', type=int, default=DEFAULT_TOP_K)
+
+    args = parser.parse_args(argv)
+
+    with OriginalityIndex() as index:
+        if args.command == 'add':
+            content = Path(args.article).read_text(encoding='utf-8')
+            added = index.add_article(content, args.title, os.path.abspath(args.article))
+            print("✅ 已加入原创性索引" if added else "ℹ️  文章已在索引中")
+
+        elif args.command == 'build':
+            added = 0
+            paths = sorted({p for root in args.roots for p in Path(root).rglob('*.md')})
+            for path in paths:
+                content = path.read_text(encoding='utf-8', errors='ignore')
+                published_at = int(path.stat().st_mtime)
+                if index.add_article(content, path.stem, str(path.resolve()), published_at):
+                    added += 1
+            print(f"✅ 新增 {added} 篇，索引共 {index.count()} 篇")
+
+        else:
+            content = Path(args.article).read_text(encoding='utf-8')
+            matches = index.query(content, top_k=args.top)
+            if not matches:
+                print("✅ 未发现与已发布文章明显重复")
+            for match in matches:
+                print(f"⚠️  《{match['title']}》 相似度 {match['similarity']:.2f}  {match['path']}")
+                for span in match['spans']:
+                    print(f"     第{span['line']}行 ≈ 原文第{span['prior_line']}行 "
+                          f"({span['containment']:.0%}): {span['text']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
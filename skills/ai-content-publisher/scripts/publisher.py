@@ -49,39 +49,131 @@ def find_latest_articles():
     return articles
 
 
-def format_article(md_file, theme='tech'):
-    """调用 wechat-article-formatter 转换文章"""
-    formatter_path = '/home/ubuntu/.claude/skills/wechat-article-formatter/convert.py'
-    output_file = md_file.replace('.md', '_wechat.html')
+FORMATTER_PATH = '/home/ubuntu/.claude/skills/wechat-article-formatter/convert.py'
 
-    cmd = [
-        'python3',
-        formatter_path,
-        '--input', md_file,
-        '--theme', theme,
-        '--output', output_file
-    ]
 
+def _load_formatter_client():
+    """加载格式化服务客户端（常驻服务未运行时客户端会在进程内转换）"""
+    scripts_dir = os.path.join(os.path.dirname(FORMATTER_PATH), 'scripts')
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            print(f"✅ 格式化成功: {output_file}")
-            return output_file
-        else:
-            print(f"❌ 格式化失败: {result.stderr}")
-            return None
+        from formatter_client import FormatterClient
+    except ImportError:
+        return None
+    return FormatterClient()
+
+
+def _report_format_result(item, html_files):
+    if item.get('status') == 'error':
+        print(f"❌ 格式化失败: {item.get('input')}: {item.get('error')}")
+    else:
+        cached = '（缓存）' if item.get('status') == 'cached' else ''
+        print(f"✅ 格式化成功{cached}: {item['output']}")
+        html_files[item['input']] = item['output']
+
+
+def format_articles(md_files, theme='tech'):
+    """
+    批量调用 wechat-article-formatter 转换文章（未变化的文章复用缓存）
+
+    优先使用格式化服务客户端（常驻服务或进程内转换），不可用时启动一个 convert.py 进程完成全部文章
+
+    Args:
+        md_files: Markdown 文件列表
+        theme: 主题
+
+    Returns:
+        {md_file: html_file}，转换失败的文章不在其中
+    """
+    if not md_files:
+        return {}
+
+    html_files = {}
+
+    client = _load_formatter_client()
+    if client is not None:
+        with client:
+            for md_file in md_files:
+                item = client.convert_file(md_file, theme=theme)
+                _report_format_result(dict(item, input=md_file), html_files)
+        return html_files
+
+    cmd = ['python3', FORMATTER_PATH, '--theme', theme, '--json'] + list(md_files)
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120 + 30 * len(md_files))
     except Exception as e:
         print(f"❌ 格式化出错: {e}")
-        return None
+        return {}
+
+    for line in result.stdout.splitlines():
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if item.get('input') in md_files:
+            _report_format_result(item, html_files)
+
+    if not html_files and result.returncode != 0:
+        print(f"❌ 格式化失败: {result.stderr}")
+    return html_files
+
+
+def format_article(md_file, theme='tech'):
+    """调用 wechat-article-formatter 转换文章"""
+    return format_articles([md_file], theme).get(md_file)
+
+
+WECHAT_PUBLISHER_PATH = '/home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py'
+
+# wechat-draft-publisher 因接口额度不足失败时的退出码（见其 publisher.EXIT_QUOTA_EXCEEDED）
+EXIT_QUOTA_EXCEEDED = 3
+
+
+def check_wechat_budget(article_count=1):
+    """
+    发布前检查公众号接口今日剩余额度（调用 publisher.py --api-budget --json）
+
+    Args:
+        article_count: 计划发布的文章数（每篇一次 draft/add）
+
+    Returns:
+        (是否可以发布, 说明)。无法获取额度时按可以发布处理
+    """
+    cmd = ['python3', WECHAT_PUBLISHER_PATH, '--api-budget', '--json']
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        budget = json.loads(result.stdout) if result.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        return True, f"无法获取接口额度（{e}），按可以发布处理"
+    if not isinstance(budget, dict):
+        return True, "无法获取接口额度，按可以发布处理"
+
+    def remaining(endpoint):
+        value = budget.get(endpoint, {}).get('remaining')
+        return float('inf') if value is None else value
+
+    if remaining('draft/add') < article_count:
+        return False, f"draft/add 今日剩余 {remaining('draft/add')} 次，需要 {article_count} 次"
+    if remaining('token') < 1:
+        return False, "access_token 接口今日额度已用完"
+    # 正文图片在 media/uploadimg 用完时会改为上传永久素材，两者都用完才无法发布
+    if remaining('media/uploadimg') < 1 and remaining('material/add_material') < 1:
+        return False, "图片上传接口（media/uploadimg、material/add_material）今日额度均已用完"
+    return True, "接口额度充足"
 
 
 def publish_to_wechat(html_file, title, cover_file):
-    """调用 wechat-draft-publisher 发布文章"""
-    publisher_path = '/home/ubuntu/.claude/skills/wechat-draft-publisher/publisher.py'
+    """
+    调用 wechat-draft-publisher 发布文章
 
+    Returns:
+        (是否成功, 输出, 是否因接口额度不足失败)
+    """
     cmd = [
         'python3',
-        publisher_path,
+        WECHAT_PUBLISHER_PATH,
         '--title', title,
         '--content', html_file,
         '--cover', cover_file,
@@ -92,13 +184,16 @@ def publish_to_wechat(html_file, title, cover_file):
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
         if result.returncode == 0:
             print(f"✅ 发布成功: {title}")
-            return True, result.stdout
+            return True, result.stdout, False
+        elif result.returncode == EXIT_QUOTA_EXCEEDED:
+            print(f"⚠️ 公众号接口额度不足，未发布: {title}")
+            return False, result.stdout, True
         else:
             print(f"❌ 发布失败: {result.stderr}")
-            return False, result.stderr
+            return False, result.stderr, False
     except Exception as e:
         print(f"❌ 发布出错: {e}")
-        return False, str(e)
+        return False, str(e), False
 
 
 def extract_title_from_md(md_file):
@@ -120,7 +215,25 @@ def publish_all_articles():
 
     print(f"找到 {len(articles)} 篇文章待发布")
 
+    # 接口额度预检：额度不足时不格式化、不发布（文章保留，额度恢复后可重新发布）
+    budget_ok, budget_note = check_wechat_budget(len(articles))
+    if not budget_ok:
+        print(f"⚠️ 公众号接口额度不足，今日跳过发布: {budget_note}")
+        save_publish_results([
+            {'title': extract_title_from_md(article['md_file']), 'md_file': article['md_file'],
+             'success': False, 'skipped': 'quota', 'output': budget_note}
+            for article in articles
+        ])
+        return
+
+    # 一次性格式化全部有封面图的文章（只启动一个格式化进程）
+    html_files = format_articles([
+        article['md_file'] for article in articles
+        if os.path.exists(os.path.join(article['dir'], 'cover.png'))
+    ])
+
     results = []
+    quota_exhausted = False
 
     for article in articles:
         print(f"\n=== 处理文章 {article['index']} ===")
@@ -138,13 +251,19 @@ def publish_all_articles():
             print(f"⚠️ 封面图不存在: {cover_file}")
             continue
 
-        # 格式化文章
-        html_file = format_article(md_file)
+        # 格式化结果
+        html_file = html_files.get(md_file)
         if not html_file:
             continue
 
+        # 额度用完后不再尝试剩余文章（避免继续消耗调用次数）
+        if quota_exhausted:
+            results.append({'title': title, 'md_file': md_file, 'html_file': html_file,
+                            'success': False, 'skipped': 'quota', 'output': ''})
+            continue
+
         # 发布到微信
-        success, output = publish_to_wechat(html_file, title, cover_file)
+        success, output, quota_exhausted = publish_to_wechat(html_file, title, cover_file)
 
         results.append({
             'title': title,
@@ -159,8 +278,11 @@ def publish_all_articles():
 
     # 总结
     success_count = sum(1 for r in results if r['success'])
+    skipped_count = sum(1 for r in results if r.get('skipped'))
     print(f"\n=== 发布完成 ===")
     print(f"成功: {success_count}/{len(results)}")
+    if skipped_count:
+        print(f"因接口额度不足跳过: {skipped_count} 篇（额度北京时间零点恢复）")
 
 
 def save_publish_results(results):
@@ -178,4 +300,9 @@ def save_publish_results(results):
 
 
 if __name__ == '__main__':
+    if '--check-budget' in sys.argv[1:]:
+        # 供 auto_publish*.sh 在生成文章前预检：额度不足时以 EXIT_QUOTA_EXCEEDED 退出
+        ok, note = check_wechat_budget()
+        print(f"{'✅' if ok else '⚠️'} 公众号接口额度预检: {note}")
+        sys.exit(0 if ok else EXIT_QUOTA_EXCEEDED)
     publish_all_articles()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+文章质量批量审计脚本
+修改 quality_rules.yaml 后，对归档的历史文章（output/、生成记录/）重新评分
+
+- 多进程并行评分，每个进程只加载和编译一次规则
+- 内容哈希、规则指纹和原创性索引版本都未变化的文章直接复用上次结果
+- 输出 JSON 或 CSV 报告，包含每个维度的得分分布
+
+用法:
+    quality_audit.py [目录 ...] [--report 报告路径] [--workers N] [--force]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing.util import Finalize
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from article_quality_checker import ArticleQualityChecker
+
+
+SKILL_DIR = Path(__file__).resolve().parent.parent
+CACHE_FILE = SKILL_DIR / 'cache' / 'quality_audit_cache.json'
+
+# 每个工作进程持有一个已编译规则的检查器
+_worker_checker = None
+
+
+def default_roots():
+    """默认审计目录：skill 的 output/ 和生成记录目录"""
+    return [
+        SKILL_DIR / 'output',
+        Path(os.environ.get('OUTPUT_DIR', Path.home() / '生成记录')),
+    ]
+
+
+def discover_articles(roots):
+    """递归查找目录下的 Markdown 文章"""
+    articles = []
+    for root in roots:
+        root = Path(root)
+        if root.is_file() and root.suffix == '.md':
+            articles.append(root.resolve())
+        elif root.is_dir():
+            articles.extend(p.resolve() for p in root.rglob('*.md') if p.is_file())
+    return sorted(set(articles))
+
+
+def load_cache():
+    """加载上次审计的结果缓存"""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache):
+    """原子写入审计缓存"""
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_FILE.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, CACHE_FILE)
+
+
+def _init_worker(config_path):
+    global _worker_checker
+    _worker_checker = ArticleQualityChecker(config_path)
+    # 进程退出时关闭检查器打开的原创性索引（工作进程退出时不执行 atexit）
+    Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    if _worker_checker is not None:
+        _worker_checker.close()
+
+
+def _audit_one(path, checker=None):
+    """评分一篇文章（默认使用工作进程的检查器）"""
+    checker = checker or _worker_checker
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        # 文章在审计过程中被删除或无法读取时只记录错误，不中断整个审计
+        return {'path': path, 'content_hash': None, 'error': f"读取失败: {e}"}
+    content_hash = hashlib.sha256(raw).hexdigest()
+    try:
+        result = checker.evaluate(raw.decode('utf-8'))
+    except UnicodeDecodeError as e:
+        return {'path': path, 'content_hash': content_hash, 'error': f"编码错误: {e}"}
+    result.update({'path': path, 'content_hash': content_hash})
+    return result
+
+
+def _same_version(entry, fingerprint, index_version):
+    """缓存结果是否由相同的规则和原创性索引算出（重复检查的扣分随索引变化）"""
+    return (
+        entry is not None
+        and entry.get('rules_fingerprint') == fingerprint
+        and entry.get('index_version', '') == index_version
+    )
+
+
+def _is_fresh(entry, stat, fingerprint, index_version):
+    return (
+        _same_version(entry, fingerprint, index_version)
+        and entry.get('mtime_ns') == stat.st_mtime_ns
+        and entry.get('size') == stat.st_size
+    )
+
+
+def audit(roots, config_path=None, workers=None, force=False):
+    """
+    批量审计文章质量
+
+    Args:
+        roots: 目录或文件列表
+        config_path: 规则文件路径（默认 config/quality_rules.yaml）
+        workers: 进程数（默认 CPU 核数）
+        force: 忽略缓存，全部重新评分
+
+    Returns:
+        (results, stats)：results 为每篇文章的结果列表，stats 为统计信息
+    """
+    # 读取索引版本后先关闭索引（进程内评分时会重新打开，评分结束后关闭）
+    checker = ArticleQualityChecker(config_path)
+    fingerprint = checker.rules_fingerprint
+    index_version = checker.originality_version
+    checker.close()
+    cache = {} if force else load_cache()
+
+    articles = discover_articles(roots)
+    results = {}
+    pending = []
+
+    # 先用 mtime/size 判断，变化时再按内容哈希判断
+    for path in articles:
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            pending.append(key)
+            continue
+        entry = cache.get(key)
+        if _is_fresh(entry, stat, fingerprint, index_version):
+            results[key] = entry
+        else:
+            pending.append(key)
+
+    rehashed = []
+    for key in pending:
+        entry = cache.get(key)
+        if _same_version(entry, fingerprint, index_version):
+            try:
+                with open(key, 'rb') as f:
+                    content_hash = hashlib.sha256(f.read()).hexdigest()
+                stat = os.stat(key)
+            except OSError:
+                content_hash = None
+            if content_hash is not None and content_hash == entry.get('content_hash'):
+                results[key] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                continue
+        rehashed.append(key)
+
+    skipped = len(articles) - len(rehashed)
+    started = time.time()
+
+    if rehashed:
+        if workers is None:
+            workers = min(os.cpu_count() or 1, len(rehashed))
+        if workers <= 1:
+            scored = (_audit_one(path, checker) for path in rehashed)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(config_path,))
+            scored = executor.map(_audit_one, rehashed,
+                                  chunksize=max(1, len(rehashed) // (workers * 4)))
+        try:
+            for result in scored:
+                results[result['path']] = result
+                try:
+                    stat = os.stat(result['path'])
+                except OSError:
+                    # 无法读取的文章不写入规则指纹，下次审计会重新评分
+                    continue
+                result.update({
+                    'rules_fingerprint': fingerprint,
+                    'index_version': index_version,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                })
+        finally:
+            if workers > 1:
+                executor.shutdown()
+            else:
+                checker.close()
+
+    # 清理已删除文章的缓存
+    new_cache = {key: entry for key, entry in cache.items() if os.path.exists(key)}
+    new_cache.update((key, entry) for key, entry in results.items() if os.path.exists(key))
+    save_cache(new_cache)
+
+    ordered = [results[str(path)] for path in articles]
+    stats = {
+        'articles': len(articles),
+        'scored': len(rehashed),
+        'skipped': skipped,
+        'elapsed_seconds': round(time.time() - started, 3),
+        'rules_fingerprint': fingerprint,
+        'index_version': index_version,
+    }
+    return ordered, stats
+
+
+def _distribution(values):
+    if not values:
+        return {}
+    return {
+        'min': min(values),
+        'max': max(values),
+        'mean': round(statistics.mean(values), 2),
+        'median': statistics.median(values),
+        'counts': {str(score): count for score, count in sorted(Counter(values).items())},
+    }
+
+
+def build_report(results, stats):
+    """生成报告（汇总 + 每个维度的得分分布 + 逐篇结果）"""
+    valid = [r for r in results if 'error' not in r]
+    dimension_names = sorted({name for r in valid for name in r['dimensions']})
+
+    total_buckets = Counter(min(r['score'] // 10 * 10, 90) for r in valid)
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'summary': dict(stats, **{
+            'passed': sum(1 for r in valid if r['passed']),
+            'failed': sum(1 for r in valid if not r['passed']),
+            'errors': len(results) - len(valid),
+        }),
+        # 全部文章出错时没有得分分布（与其他分布一致，为空字典）
+        'score_distribution': dict(
+            _distribution([r['score'] for r in valid]),
+            buckets={f"{b}-{b + 9 if b < 90 else 100}": total_buckets[b]
+                     for b in sorted(total_buckets)},
+        ) if valid else {},
+        'dimension_distributions': {
+            name: _distribution([r['dimensions'].get(name, 0) for r in valid])
+            for name in dimension_names
+        },
+        'penalty_distribution': _distribution([r['penalty'] for r in valid]),
+        'articles': [
+            {key: r.get(key) for key in
+             ('path', 'score', 'passed', 'dimensions', 'penalty', 'content_hash', 'error')}
+            for r in results
+        ],
+    }
+
+
+def write_report(report, report_path):
+    """按扩展名写出 JSON 或 CSV 报告"""
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if report_path.suffix.lower() == '.csv':
+        dimension_names = sorted(report['dimension_distributions'])
+        with open(report_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['path', 'score', 'passed'] + dimension_names + ['penalty', 'error'])
+            for article in report['articles']:
+                dimensions = article.get('dimensions') or {}
+                writer.writerow(
+                    [article['path'], article.get('score'), article.get('passed')]
+                    + [dimensions.get(name) for name in dimension_names]
+                    + [article.get('penalty'), article.get('error') or '']
+                )
+    else:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    """主函数，返回退出码"""
+    parser = argparse.ArgumentParser(description='批量审计归档文章质量')
+    parser.add_argument('roots', nargs='*', help='文章目录或文件（默认 output/ 和 生成记录/）')
+    parser.add_argument('--report', default=str(SKILL_DIR / 'cache' / 'quality_audit_report.json'),
+                        help='报告路径（.json 或 .csv）')
+    parser.add_argument('--config', help='规则文件路径')
+    parser.add_argument('--workers', type=int, help='并行进程数')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新评分')
+    args = parser.parse_args(argv)
+
+    roots = args.roots or default_roots()
+    print(f"\n📂 审计目录: {', '.join(str(r) for r in roots)}")
+
+    results, stats = audit(roots, args.config, args.workers, args.force)
+    if not results:
+        print("⚠️  没有找到任何文章")
+        return 1
+
+    report = build_report(results, stats)
+    write_report(report, args.report)
+
+    summary = report['summary']
+    print(f"📊 文章总数: {summary['articles']}（重新评分 {summary['scored']}，"
+          f"复用缓存 {summary['skipped']}，耗时 {summary['elapsed_seconds']}秒）")
+    print(f"✅ 合格: {summary['passed']}  ❌ 不合格: {summary['failed']}  ⚠️  错误: {summary['errors']}")
+    distribution = report['score_distribution']
+    if distribution:
+        print(f"🎯 总分: 平均 {distribution['mean']}，中位数 {distribution['median']}，"
+              f"最低 {distribution['min']}，最高 {distribution['max']}")
+    print(f"📝 报告已保存: {args.report}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,7 @@ import json
 import os
 import sys
 import re
+import sqlite3
 import time
 import yaml
 from datetime import datetime
@@ -15,6 +16,7 @@ from datetime import datetime
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from title_generator import get_time_slot_type, TIME_SLOT_CONTENT
+import history_store
 
 
 # 排除关键词黑名单
@@ -618,37 +620,14 @@ def load_publish_history(hours=48):
     Returns:
         历史记录列表
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cache_dir = os.path.join(os.path.dirname(script_dir), 'cache')
-    history_file = os.path.join(cache_dir, 'publish_history.json')
-
-    if not os.path.exists(history_file):
-        print(f"📝 历史记录文件不存在，将创建新文件")
-        return []
-
     try:
-        with open(history_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if 'records' not in data:
-            print(f"⚠️  历史记录格式错误，返回空列表")
-            return []
-
-        # 过滤出最近N小时内的记录
-        cutoff = time.time() - (hours * 3600)
-        recent_records = [
-            r for r in data['records']
-            if r.get('timestamp', 0) > cutoff
-        ]
-
+        recent_records = history_store.load_recent(hours=hours)
         print(f"📊 加载了 {len(recent_records)} 条历史记录（最近{hours}小时）")
         return recent_records
 
-    except json.JSONDecodeError as e:
-        print(f"⚠️  历史记录JSON解析失败: {e}")
-        return []
-    except Exception as e:
-        print(f"⚠️  加载历史记录失败: {e}")
+    except (sqlite3.Error, OSError) as e:
+        # 数据库不可用或缓存目录不可写时不中断选题，按无历史处理
+        print(f"⚠️  加载历史记录失败，按无历史记录继续: {e}")
         return []
 
 
@@ -4,7 +4,12 @@
 根据文章类型和内容生成吸引人且符合实际的标题
 """
 
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import cached_property
+from string import Formatter
+import os
 import re
 
 
@@ -138,175 +143,401 @@ TITLE_TEMPLATES = {
 }
 
 
+# 预编译的正则（模块级，只编译一次）
+NUMBER_RE = re.compile(r'\b([3-9]|10)\b')
+TIME_PATTERNS = [
+    (re.compile(r'(\d+)\s*分钟', re.IGNORECASE), '分钟'),
+    (re.compile(r'(\d+)\s*min', re.IGNORECASE), '分钟'),
+    (re.compile(r'(\d+)\s*小时', re.IGNORECASE), '小时'),
+    (re.compile(r'(\d+)\s*hour', re.IGNORECASE), '小时'),
+]
+COST_RE = re.compile(r'(\d+)万')
+PERCENT_RE = re.compile(r'(\d+)%')
+WHITESPACE_RE = re.compile(r'\s+')
+MEANINGFUL_CHAR_RE = re.compile(r'[\u4e00-\u9fa5a-zA-Z0-9]')
+
+TOOL_NAME_PREFIXES = ['New ', 'Introducing ', 'Announcing ', '发布：', '推出：']
+
+# 收益关键词映射（更具体）
+BENEFIT_KEYWORDS = {
+    '节省时间': ['save time', 'faster', 'quick', '节省', '快速', '提速'],
+    '降低成本': ['free', 'cost', 'cheap', '免费', '低成本', '省钱'],
+    '提高效率': ['efficient', 'productivity', 'boost', '效率', '生产力'],
+    '简化流程': ['easy', 'simple', 'automate', '简单', '自动', '便捷'],
+    '增强能力': ['powerful', 'advanced', 'smart', '强大', '智能', '高级'],
+    '易于上手': ['beginner', 'user-friendly', '入门', '新手', '友好'],
+}
+
+# 痛点关键词映射
+PAIN_POINT_KEYWORDS = {
+    '效率低': ['slow', 'inefficient', '缓慢', '效率', '速度'],
+    '成本高': ['expensive', 'cost', '昂贵', '价格', '付费'],
+    '难度大': ['difficult', 'complex', 'hard', '困难', '复杂'],
+    '手动操作': ['manual', 'tedious', '手动', '重复'],
+    '配置繁琐': ['setup', 'configuration', '配置', '安装'],
+}
+
+AUDIENCE_KEYWORDS = {
+    'AI开发者': ['developer', 'engineer', '开发', '工程师'],
+    'AI产品经理': ['product', 'pm', '产品'],
+    'AI初学者': ['beginner', 'starter', '入门', '新手', '初学'],
+    '企业用户': ['enterprise', 'business', '企业', '商业'],
+    'AI从业者': ['professional', 'practitioner', '从业', '专业'],
+}
+
+COMPANY_KEYWORDS = {
+    'OpenAI': ['openai'],
+    'Anthropic': ['anthropic', 'claude'],
+    'Google': ['google', 'deepmind'],
+    'Meta': ['meta', 'facebook'],
+    'Microsoft': ['microsoft'],
+    '智谱AI': ['zhipu'],
+    '百度': ['baidu'],
+}
+
+CLICKBAIT_WORDS = ['震惊！', '必看！', '惊呆了！', '不看后悔！']
+
+# 标题评分用词
+BENEFIT_WORDS = ['效率', '节省', '简化', '提升', '增强', '降低']
+ACTION_WORDS = ['用', '实现', '搞定', '学会', '提升', '抓住']
+BENEFIT_WORDS_RE = re.compile('|'.join(map(re.escape, BENEFIT_WORDS)))
+ACTION_WORDS_RE = re.compile('|'.join(map(re.escape, ACTION_WORDS)))
+
+
+def _contains_any(text, keywords):
+    return any(kw in text for kw in keywords)
+
+
+class TitleContext(Mapping):
+    """
+    标题生成上下文
+
+    对一个话题只做一次文本预处理（拼接、小写化），各模板变量在首次访问时
+    计算并缓存。实现 Mapping 接口，可直接用于 str.format_map 和 evaluate_title_quality
+    """
+
+    # 模板变量 -> 属性名
+    FIELDS = (
+        'tool_name', 'benefit', 'pain_point', 'number', 'time', 'action', 'goal',
+        'tool', 'event', 'target', 'impact', 'company', 'industry', 'cost',
+        'income', 'achievement', 'skill', 'percent', 'concept', 'type',
+        'long_time', 'short_time', 'level_a', 'level_b', 'state_a', 'state_b',
+    )
+
+    def __init__(self, topic):
+        self.topic = topic
+        self._values = {}
+
+    # ---- 预处理文本（只计算一次） ----
+
+    @cached_property
+    def raw_title(self):
+        return self.topic.get('title', '')
+
+    @cached_property
+    def raw_summary(self):
+        return self.topic.get('summary', '')
+
+    @cached_property
+    def text(self):
+        return self.raw_title + ' ' + self.raw_summary
+
+    @cached_property
+    def text_lower(self):
+        return self.text.lower()
+
+    @cached_property
+    def title_lower(self):
+        return self.raw_title.lower()
+
+    @cached_property
+    def summary_lower(self):
+        return self.raw_summary.lower()
+
+    @cached_property
+    def url_lower(self):
+        return self.topic.get('url', '').lower()
+
+    # ---- Mapping 接口 ----
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self.FIELDS:
+                raise KeyError(key)
+            self._values[key] = getattr(self, f'_field_{key}')()
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def satisfies(self, fields):
+        """模板所需的变量是否都存在且非空"""
+        for field in fields:
+            if field not in self.FIELDS or not self[field]:
+                return False
+        return True
+
+    # ---- 提取结果（带缓存） ----
+
+    @cached_property
+    def full_tool_name(self):
+        title = self.raw_title
+        # 移除常见的前缀/后缀
+        for prefix in TOOL_NAME_PREFIXES:
+            if prefix in title:
+                title = title.replace(prefix, '')
+        return title.split('|')[0].split('-')[0].strip()[:30]
+
+    @cached_property
+    def core_feature(self):
+        for kw in ['API', 'LLM', 'Agent', '模型', '算法', '框架']:
+            if kw in self.raw_title or kw in self.raw_summary:
+                return kw
+        return '新功能'
+
+    @cached_property
+    def state_range(self):
+        if _contains_any(self.text_lower, ['manual', 'hand', '手动']):
+            return {'state_a': '手动操作', 'state_b': '自动化'}
+        elif _contains_any(self.text_lower, ['slow', 'inefficient', '缓慢', '低效']):
+            return {'state_a': '低效', 'state_b': '高效'}
+        else:
+            return {'state_a': '0', 'state_b': '1'}
+
+    # ---- 模板变量 ----
+
+    def _field_tool_name(self):
+        return self.full_tool_name[:15]  # 限制长度
+
+    def _field_tool(self):
+        return self.full_tool_name.split()[0] if self.full_tool_name else 'AI'
+
+    def _field_event(self):
+        return self.full_tool_name
+
+    def _field_benefit(self):
+        for benefit, keywords in BENEFIT_KEYWORDS.items():
+            if _contains_any(self.text_lower, keywords):
+                return benefit
+        return '提高效率'  # 默认收益
+
+    def _field_pain_point(self):
+        for pain, keywords in PAIN_POINT_KEYWORDS.items():
+            if _contains_any(self.text_lower, keywords):
+                return pain
+        return '效率低'  # 默认痛点
+
+    def _field_number(self):
+        # 1. 直接查找数字（优先级：3-10之间的数字）
+        match = NUMBER_RE.search(self.text)
+        if match:
+            return match.group(1)
+
+        # 2. 根据内容特征推断合适的数字
+        if _contains_any(self.text_lower, ['step', 'way', 'method', '步骤', '方法']):
+            return '5'  # 教程类默认5步
+        elif _contains_any(self.text_lower, ['tip', 'trick', '技巧', '要点']):
+            return '7'  # 技巧类默认7个
+        else:
+            return '3'  # 要点类/默认3个
+
+    def _field_time(self):
+        # 1. 查找已有的时间表述
+        for pattern, unit in TIME_PATTERNS:
+            match = pattern.search(self.text)
+            if match:
+                return f"{match.group(1)}{unit}"
+
+        # 2. 根据内容类型推断
+        content_type = self.topic.get('content_type', '')
+        if 'tutorial' in content_type or 'guide' in self.text_lower:
+            return '15分钟'  # 教程默认15分钟
+        elif 'quick' in self.text_lower or '快速' in self.text:
+            return '5分钟'
+        else:
+            return '10分钟'
+
+    def _field_action(self):
+        title = self.title_lower
+        if _contains_any(title, ['build', 'create', 'make', '搭建', '创建', '构建']):
+            return '搭建AI应用'
+        elif _contains_any(title, ['use', 'apply', '使用', '应用']):
+            return '使用AI工具'
+        elif _contains_any(title, ['deploy', '部署']):
+            return '部署AI服务'
+        else:
+            return '实践AI开发'
+
+    def _field_goal(self):
+        summary = self.summary_lower
+        if _contains_any(summary, ['chatbot', 'assistant', '助手', '机器人']):
+            return '智能助手'
+        elif _contains_any(summary, ['agent', '代理']):
+            return 'AI Agent'
+        elif _contains_any(summary, ['automation', ' automate', '自动化']):
+            return '工作流自动化'
+        else:
+            return 'AI项目'
+
+    def _field_target(self):
+        for audience, keywords in AUDIENCE_KEYWORDS.items():
+            if _contains_any(self.text_lower, keywords):
+                return audience
+        return 'AI开发者'  # 默认受众
+
+    def _field_impact(self):
+        text = self.text_lower
+        if _contains_any(text, ['game changer', 'revolution', '革命', '颠覆']):
+            return '彻底改变'
+        elif _contains_any(text, ['improve', 'enhance', '改进', '提升']):
+            return '大幅提升'
+        elif _contains_any(text, ['new', 'launch', '发布', '推出']):
+            return '带来新机会'
+        else:
+            return '产生重要影响'
+
+    def _field_company(self):
+        for company, keywords in COMPANY_KEYWORDS.items():
+            if any(kw in self.url_lower or kw in self.title_lower for kw in keywords):
+                return company
+        return 'AI公司'
+
+    def _field_industry(self):
+        return 'AI'
+
+    def _field_cost(self):
+        match = COST_RE.search(self.text)
+        if match:
+            return f"{match.group(1)}万"
+        return "10万"  # 默认值
+
+    def _field_income(self):
+        return "5万"  # 默认值，可以根据实际情况调整
+
+    def _field_achievement(self):
+        if _contains_any(self.text_lower, ['user', 'subscriber', '用户', '订阅']):
+            return "10万用户"
+        elif _contains_any(self.text_lower, ['revenue', 'income', '收入', '营收']):
+            return "月入10万"
+        else:
+            return "盈利"
+
+    def _field_skill(self):
+        title = self.title_lower
+        if 'prompt' in title:
+            return 'Prompt工程'
+        elif 'llm' in title or 'language model' in title:
+            return 'LLM开发'
+        elif 'agent' in title:
+            return 'AI Agent'
+        else:
+            return 'AI开发'
+
+    def _field_percent(self):
+        match = PERCENT_RE.search(self.text)
+        if match:
+            return f"{match.group(1)}%"
+        return "90%"  # 默认使用常见的百分比
+
+    def _field_concept(self):
+        if 'ai' in self.title_lower:
+            return "AI应用"
+        elif _contains_any(self.title_lower, ['startup', 'business', '创业', '商业']):
+            return "创业"
+        else:
+            return "这个概念"
+
+    def _field_type(self):
+        text = self.text_lower
+        if _contains_any(text, ['content', 'article', '内容', '文章']):
+            return "内容创作"
+        elif _contains_any(text, ['project', 'manage', '项目', '管理']):
+            return "项目管理"
+        elif _contains_any(text, ['workflow', '工作流']):
+            return "工作流"
+        else:
+            return "AI开发"
+
+    def _field_long_time(self):
+        return '8小时'
+
+    def _field_short_time(self):
+        return '2小时'
+
+    def _field_level_a(self):
+        return '新手'
+
+    def _field_level_b(self):
+        return '高手'
+
+    def _field_state_a(self):
+        return self.state_range['state_a']
+
+    def _field_state_b(self):
+        return self.state_range['state_b']
+
+
+def _template_fields(template):
+    """解析模板中的占位符名称"""
+    return frozenset(
+        field_name for _, field_name, _, _ in Formatter().parse(template)
+        if field_name is not None
+    )
+
+
+# 预分析的模板：{内容类型: [(模板, 所需变量集合), ...]}
+COMPILED_TEMPLATES = {
+    content_type: [(template, _template_fields(template)) for template in templates]
+    for content_type, templates in TITLE_TEMPLATES.items()
+}
+
+
 def extract_tool_name(topic):
     """从话题中提取工具名称"""
-    # 简单提取：取标题的核心部分
-    title = topic['title']
-    # 移除常见的前缀/后缀
-    prefixes = ['New ', 'Introducing ', 'Announcing ', '发布：', '推出：']
-    for prefix in prefixes:
-        if prefix in title:
-            title = title.replace(prefix, '')
-    return title.split('|')[0].split('-')[0].strip()[:30]
+    return TitleContext(topic).full_tool_name
 
 
 def extract_benefit(topic):
     """提取具体收益（增强版）"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-
-    # 收益关键词映射（更具体）
-    benefits = {
-        '节省时间': ['save time', 'faster', 'quick', '节省', '快速', '提速'],
-        '降低成本': ['free', 'cost', 'cheap', '免费', '低成本', '省钱'],
-        '提高效率': ['efficient', 'productivity', 'boost', '效率', '生产力'],
-        '简化流程': ['easy', 'simple', 'automate', '简单', '自动', '便捷'],
-        '增强能力': ['powerful', 'advanced', 'smart', '强大', '智能', '高级'],
-        '易于上手': ['beginner', 'user-friendly', '入门', '新手', '友好'],
-    }
-
-    for benefit, keywords in benefits.items():
-        if any(kw in text for kw in keywords):
-            return benefit
-
-    return '提高效率'  # 默认收益
+    return TitleContext(topic)['benefit']
 
 
 def extract_core_feature(topic):
     """从话题中提取核心特性"""
-    summary = topic.get('summary', '')
-    title = topic['title']
-
-    # 查找技术关键词
-    tech_keywords = ['API', 'LLM', 'Agent', '模型', '算法', '框架']
-    for kw in tech_keywords:
-        if kw in title or kw in summary:
-            return kw
-
-    return '新功能'
+    return TitleContext(topic).core_feature
 
 
 def extract_number(topic):
     """从话题中提取有意义的数字"""
-    text = topic.get('title', '') + ' ' + topic.get('summary', '')
-
-    # 1. 直接查找数字（优先级：3-10之间的数字）
-    numbers = re.findall(r'\b([3-9]|10)\b', text)
-    if numbers:
-        return numbers[0]
-
-    # 2. 根据内容特征推断合适的数字
-    text_lower = text.lower()
-    if any(kw in text_lower for kw in ['step', 'way', 'method', '步骤', '方法']):
-        return '5'  # 教程类默认5步
-    elif any(kw in text_lower for kw in ['tip', 'trick', '技巧', '要点']):
-        return '7'  # 技巧类默认7个
-    elif any(kw in text_lower for kw in ['thing', 'point', '件事', '要点']):
-        return '3'  # 要点类默认3个
-    else:
-        return '3'  # 默认3
+    return TitleContext(topic)['number']
 
 
 def extract_time(topic):
     """提取学习/使用时间"""
-    text = topic.get('title', '') + ' ' + topic.get('summary', '')
-
-    # 1. 查找已有的时间表述
-    time_patterns = [
-        (r'(\d+)\s*分钟', lambda m: f"{m.group(1)}分钟"),
-        (r'(\d+)\s*min', lambda m: f"{m.group(1)}分钟"),
-        (r'(\d+)\s*小时', lambda m: f"{m.group(1)}小时"),
-        (r'(\d+)\s*hour', lambda m: f"{m.group(1)}小时"),
-    ]
-
-    for pattern, formatter in time_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return formatter(match)
-
-    # 2. 根据内容类型推断
-    text_lower = text.lower()
-    content_type = topic.get('content_type', '')
-    if 'tutorial' in content_type or 'guide' in text_lower:
-        return '15分钟'  # 教程默认15分钟
-    elif 'quick' in text_lower or '快速' in text:
-        return '5分钟'
-    else:
-        return '10分钟'
+    return TitleContext(topic)['time']
 
 
 def extract_pain_point(topic):
     """识别用户痛点"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-
-    # 痛点关键词映射
-    pain_points = {
-        '效率低': ['slow', 'inefficient', '缓慢', '效率', '速度'],
-        '成本高': ['expensive', 'cost', '昂贵', '价格', '付费'],
-        '难度大': ['difficult', 'complex', 'hard', '困难', '复杂'],
-        '手动操作': ['manual', 'tedious', '手动', '重复'],
-        '配置繁琐': ['setup', 'configuration', '配置', '安装'],
-    }
-
-    for pain, keywords in pain_points.items():
-        if any(kw in text for kw in keywords):
-            return pain
-
-    return '效率低'  # 默认痛点
+    return TitleContext(topic)['pain_point']
 
 
 def extract_target_audience(topic):
     """提取目标受众"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-
-    audiences = {
-        'AI开发者': ['developer', 'engineer', '开发', '工程师'],
-        'AI产品经理': ['product', 'pm', '产品'],
-        'AI初学者': ['beginner', 'starter', '入门', '新手', '初学'],
-        '企业用户': ['enterprise', 'business', '企业', '商业'],
-        'AI从业者': ['professional', 'practitioner', '从业', '专业'],
-    }
-
-    for audience, keywords in audiences.items():
-        if any(kw in text for kw in keywords):
-            return audience
-
-    return 'AI开发者'  # 默认受众
+    return TitleContext(topic)['target']
 
 
 def extract_impact(topic):
     """提取影响描述"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-
-    if any(kw in text for kw in ['game changer', 'revolution', '革命', '颠覆']):
-        return '彻底改变'
-    elif any(kw in text for kw in ['improve', 'enhance', '改进', '提升']):
-        return '大幅提升'
-    elif any(kw in text for kw in ['new', 'launch', '发布', '推出']):
-        return '带来新机会'
-    else:
-        return '产生重要影响'
+    return TitleContext(topic)['impact']
 
 
 def extract_company(topic):
     """提取公司名"""
-    url = topic.get('url', '').lower()
-    title = topic.get('title', '').lower()
-
-    companies = {
-        'OpenAI': ['openai'],
-        'Anthropic': ['anthropic', 'claude'],
-        'Google': ['google', 'deepmind'],
-        'Meta': ['meta', 'facebook'],
-        'Microsoft': ['microsoft'],
-        '智谱AI': ['zhipu'],
-        '百度': ['baidu'],
-    }
-
-    for company, keywords in companies.items():
-        if any(kw in url or kw in title for kw in keywords):
-            return company
-
-    return 'AI公司'
+    return TitleContext(topic)['company']
 
 
 def get_time_slot_type():
@@ -331,6 +562,37 @@ def get_time_slot_type():
         return selected_type, 'evening'
 
 
+def rank_title_candidates(info, content_type):
+    """
+    填充并评分某内容类型的全部可用模板
+
+    Args:
+        info: TitleContext
+        content_type: 内容类型（未知类型使用 new_tool 模板）
+
+    Returns:
+        [(分数, 标题), ...]，按分数降序；同分时保持模板顺序
+    """
+    templates = COMPILED_TEMPLATES.get(content_type, COMPILED_TEMPLATES['new_tool'])
+
+    candidates = []
+    for template, fields in templates:
+        # 模板缺少某个变量或变量为空，直接跳过
+        if not info.satisfies(fields):
+            continue
+
+        title = clean_title(template.format_map(info))
+        candidates.append((evaluate_title_quality(title, info), title))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    return candidates
+
+
+def fallback_title(info):
+    """所有模板都不可用时的后备标题"""
+    return f"{info['tool_name'] or info['tool']}：{info['benefit']}"
+
+
 def generate_title(topic, content_type=None):
     """
     为话题生成标题（优化版 - 使用评分机制）
@@ -345,199 +607,193 @@ def generate_title(topic, content_type=None):
     if content_type is None:
         content_type, _ = get_time_slot_type()
 
-    # 提取所有可能的信息（扩展版 - 支持新模板变量）
-    time_ranges = extract_time_range(topic)
-    level_ranges = extract_level_range(topic)
-    state_ranges = extract_state_range(topic)
-
-    info = {
-        'tool_name': extract_tool_name(topic)[:15],  # 限制长度
-        'benefit': extract_benefit(topic),
-        'pain_point': extract_pain_point(topic),
-        'number': extract_number(topic),
-        'time': extract_time(topic),
-        'action': get_action_keyword(topic),
-        'goal': get_goal_keyword(topic),
-        'tool': extract_tool_name(topic).split()[0] if extract_tool_name(topic) else 'AI',
-        'event': extract_tool_name(topic),
-        'target': extract_target_audience(topic),
-        'impact': extract_impact(topic),
-        'company': extract_company(topic),
-        'industry': 'AI',
-        # 新增变量（用于扩展模板）
-        'cost': extract_cost(topic),
-        'income': extract_income(topic),
-        'achievement': extract_achievement(topic),
-        'skill': get_skill_keyword(topic),
-        'percent': extract_percent(topic),
-        'concept': extract_concept(topic),
-        'type': extract_template_type(topic),
-        'long_time': time_ranges['long_time'],
-        'short_time': time_ranges['short_time'],
-        'level_a': level_ranges['level_a'],
-        'level_b': level_ranges['level_b'],
-        'state_a': state_ranges['state_a'],
-        'state_b': state_ranges['state_b'],
-    }
+    # 所有模板变量按需提取、只计算一次
+    info = TitleContext(topic)
 
-    # 选择模板
-    templates = TITLE_TEMPLATES.get(content_type, TITLE_TEMPLATES['new_tool'])
+    candidates = rank_title_candidates(info, content_type)
+    if candidates:
+        return candidates[0][1]
+
+    # 如果所有模板都失败，返回后备标题
+    return fallback_title(info)
 
-    # 尝试填充每个模板，选择最合适的
-    best_title = None
-    best_score = 0
 
-    for template in templates:
-        try:
-            title = template.format(**info)
-            title = clean_title(title)
+# 批量生成超过该数量时默认使用多进程
+PARALLEL_BATCH_THRESHOLD = 5000
 
-            # 评估标题质量
-            score = evaluate_title_quality(title, info)
 
-            if score > best_score:
-                best_score = score
-                best_title = title
+def _title_result(title, info):
+    breakdown = evaluate_title_quality_breakdown(title, info)
+    valid, issues = validate_title(title)
+    return {
+        'title': title,
+        'score': sum(breakdown.values()),
+        'breakdown': breakdown,
+        'valid': valid,
+        'issues': issues,
+    }
 
-        except (KeyError, IndexError):
-            # 模板缺少某个变量，跳过
+
+def _generate_titles_for_topic(args):
+    topic, content_type, top_k = args
+    info = TitleContext(topic)
+
+    results = []
+    seen = set()
+    for _, title in rank_title_candidates(info, content_type):
+        if title in seen:
             continue
+        seen.add(title)
+        results.append(_title_result(title, info))
+        if len(results) >= top_k:
+            break
 
-    # 如果所有模板都失败，返回后备标题
-    if best_title is None:
-        best_title = f"{info['tool_name']}：{info['benefit']}"
+    if not results:
+        results.append(_title_result(fallback_title(info), info))
 
-    return best_title
+    return results
 
 
-def evaluate_title_quality(title, info):
+def generate_titles(topics, content_types=None, top_k=3, workers=None):
     """
-    评估标题质量（简化版）
+    批量生成标题，返回每个话题得分最高的 top_k 个候选
+
+    Args:
+        topics: 话题字典列表
+        content_types: 内容类型；可为单个字符串、与 topics 等长的列表，
+            或 None（使用话题自身的 content_type，缺失时按当前时间段选择）
+        top_k: 每个话题返回的候选数
+        workers: 进程数；None 表示批量较大时自动并行，1 表示串行
+
+    Returns:
+        与 topics 等长的列表，每项为候选列表：
+        [{'title', 'score', 'breakdown', 'valid', 'issues'}, ...]（按分数降序）
+
+    Raises:
+        ValueError: top_k 小于 1，或 content_types 与 topics 长度不一致
+    """
+    if top_k < 1:
+        raise ValueError("top_k 必须大于等于 1")
+
+    if content_types is None or isinstance(content_types, str):
+        types = [content_types] * len(topics)
+    else:
+        types = list(content_types)
+        if len(types) != len(topics):
+            raise ValueError("content_types 长度必须与 topics 一致")
+
+    default_type = None
+    jobs = []
+    for topic, content_type in zip(topics, types):
+        if content_type is None:
+            content_type = topic.get('content_type')
+        if content_type is None:
+            if default_type is None:
+                default_type, _ = get_time_slot_type()
+            content_type = default_type
+        jobs.append((topic, content_type, top_k))
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(jobs) >= PARALLEL_BATCH_THRESHOLD else 1
+
+    if workers <= 1 or len(jobs) < 2:
+        return [_generate_titles_for_topic(job) for job in jobs]
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_generate_titles_for_topic, jobs, chunksize=chunksize))
+
+
+def evaluate_title_quality_breakdown(title, info):
+    """
+    评估标题质量，返回各评分项明细
 
     Args:
         title: 生成的标题
         info: 提取的信息字典
 
     Returns:
-        质量分数（0-100）
+        {评分项: 分数}，各项之和即 evaluate_title_quality 的结果
     """
-    score = 50  # 基础分
+    breakdown = {'base': 50}  # 基础分
 
     # 包含数字 +10
-    if any(char.isdigit() for char in title):
-        score += 10
+    breakdown['number'] = 10 if any(map(str.isdigit, title)) else 0
 
     # 长度适中（15-30字）+10
     if 15 <= len(title) <= 30:
-        score += 10
+        breakdown['length'] = 10
     elif len(title) < 15:
-        score -= 5  # 太短扣分
+        breakdown['length'] = -5  # 太短扣分
     elif len(title) > 40:
-        score -= 10  # 太长扣分
+        breakdown['length'] = -10  # 太长扣分
+    else:
+        breakdown['length'] = 0
 
     # 包含具体工具名 +10
-    if info.get('tool_name') and len(info['tool_name']) > 2:
-        score += 10
+    breakdown['tool_name'] = 10 if info.get('tool_name') and len(info['tool_name']) > 2 else 0
 
     # 包含收益词 +10
-    if any(kw in title for kw in ['效率', '节省', '简化', '提升', '增强', '降低']):
-        score += 10
+    breakdown['benefit'] = 10 if BENEFIT_WORDS_RE.search(title) else 0
 
     # 包含行动词 +5
-    if any(kw in title for kw in ['用', '实现', '搞定', '学会', '提升', '抓住']):
-        score += 5
+    breakdown['action'] = 5 if ACTION_WORDS_RE.search(title) else 0
+
+    return breakdown
+
+
+def evaluate_title_quality(title, info):
+    """
+    评估标题质量（简化版）
 
-    return score
+    Args:
+        title: 生成的标题
+        info: 提取的信息字典
+
+    Returns:
+        质量分数（0-100）
+    """
+    return sum(evaluate_title_quality_breakdown(title, info).values())
 
 
 def get_action_keyword(topic):
     """提取动作关键词"""
-    title = topic['title'].lower()
-    if any(kw in title for kw in ['build', 'create', 'make', '搭建', '创建', '构建']):
-        return '搭建AI应用'
-    elif any(kw in title for kw in ['use', 'apply', '使用', '应用']):
-        return '使用AI工具'
-    elif any(kw in title for kw in ['deploy', '部署', 'deploy']):
-        return '部署AI服务'
-    else:
-        return '实践AI开发'
+    return TitleContext(topic)['action']
 
 
 def get_goal_keyword(topic):
     """提取目标关键词"""
-    summary = topic.get('summary', '').lower()
-    if any(kw in summary for kw in ['chatbot', 'assistant', '助手', '机器人']):
-        return '智能助手'
-    elif any(kw in summary for kw in ['agent', '代理']):
-        return 'AI Agent'
-    elif any(kw in summary for kw in ['automation', ' automate', '自动化']):
-        return '工作流自动化'
-    else:
-        return 'AI项目'
+    return TitleContext(topic)['goal']
 
 
 def get_skill_keyword(topic):
     """提取技能关键词"""
-    title = topic['title'].lower()
-    if 'prompt' in title:
-        return 'Prompt工程'
-    elif 'llm' in title or 'language model' in title:
-        return 'LLM开发'
-    elif 'agent' in title:
-        return 'AI Agent'
-    else:
-        return 'AI开发'
+    return TitleContext(topic)['skill']
 
 
 def extract_cost(topic):
     """提取成本/代价（用于避坑类标题）"""
-    text = topic.get('title', '') + ' ' + topic.get('summary', '')
-    # 查找金额
-    import re
-    amounts = re.findall(r'(\d+)万', text)
-    if amounts:
-        return f"{amounts[0]}万"
-    return "10万"  # 默认值
+    return TitleContext(topic)['cost']
 
 
 def extract_income(topic):
     """提取收入（用于成功案例）"""
-    return "5万"  # 默认值，可以根据实际情况调整
+    return TitleContext(topic)['income']
 
 
 def extract_achievement(topic):
     """提取成就（用于成功案例）"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-    if any(kw in text for kw in ['user', 'subscriber', '用户', '订阅']):
-        return "10万用户"
-    elif any(kw in text for kw in ['revenue', 'income', '收入', '营收']):
-        return "月入10万"
-    else:
-        return "盈利"
+    return TitleContext(topic)['achievement']
 
 
 def extract_percent(topic):
     """提取百分比（用于好奇化标题）"""
-    import re
-    text = topic.get('title', '') + ' ' + topic.get('summary', '')
-    # 查找百分比
-    percents = re.findall(r'(\d+)%', text)
-    if percents:
-        return f"{percents[0]}%"
-    # 默认使用常见的百分比
-    return "90%"
+    return TitleContext(topic)['percent']
 
 
 def extract_concept(topic):
     """提取概念（用于好奇化标题）"""
-    title = topic.get('title', '')
-    # 提取核心概念
-    if 'AI' in title or 'ai' in title.lower():
-        return "AI应用"
-    elif any(kw in title.lower() for kw in ['startup', 'business', '创业', '商业']):
-        return "创业"
-    else:
-        return "这个概念"
+    return TitleContext(topic)['concept']
 
 
 def extract_time_range(topic):
@@ -559,32 +815,18 @@ def extract_level_range(topic):
 
 def extract_state_range(topic):
     """提取状态范围（用于对比化标题）"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-    if any(kw in text for kw in ['manual', 'hand', '手动']):
-        return {'state_a': '手动操作', 'state_b': '自动化'}
-    elif any(kw in text for kw in ['slow', 'inefficient', '缓慢', '低效']):
-        return {'state_a': '低效', 'state_b': '高效'}
-    else:
-        return {'state_a': '0', 'state_b': '1'}
+    return dict(TitleContext(topic).state_range)
 
 
 def extract_template_type(topic):
     """提取模板类型（用于模板分享类标题）"""
-    text = (topic.get('title', '') + ' ' + topic.get('summary', '')).lower()
-    if any(kw in text for kw in ['content', 'article', '内容', '文章']):
-        return "内容创作"
-    elif any(kw in text for kw in ['project', 'manage', '项目', '管理']):
-        return "项目管理"
-    elif any(kw in text for kw in ['workflow', '工作流']):
-        return "工作流"
-    else:
-        return "AI开发"
+    return TitleContext(topic)['type']
 
 
 def clean_title(title):
     """清理标题，确保符合规范"""
     # 移除多余空格
-    title = re.sub(r'\s+', ' ', title)
+    title = WHITESPACE_RE.sub(' ', title)
 
     # 确保不超过长度限制（微信公众号64字节，约20个汉字）
     max_length = 30  # 留些余量
@@ -594,8 +836,7 @@ def clean_title(title):
         title = title[:-1] + '…'
 
     # 移除标题党词汇
-    clickbait_words = ['震惊！', '必看！', '惊呆了！', '不看后悔！']
-    for word in clickbait_words:
+    for word in CLICKBAIT_WORDS:
         title = title.replace(word, '')
 
     return title.strip()
@@ -618,7 +859,7 @@ def validate_title(title):
         issues.append("标题过短")
 
     # 检查是否全是符号
-    if not re.search(r'[\u4e00-\u9fa5a-zA-Z0-9]', title):
+    if not MEANINGFUL_CHAR_RE.search(title):
         issues.append("标题缺少实质内容")
 
     return len(issues) == 0, issues
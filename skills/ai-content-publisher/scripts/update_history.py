@@ -6,11 +6,17 @@
 
 import json
 import os
+import sqlite3
 import sys
 import time
 import re
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import history_journal
+import history_store
+from originality_index import OriginalityIndex
+
 
 def extract_keywords(topic):
     """从话题中提取关键词集合"""
@@ -30,7 +36,7 @@ def extract_keywords(topic):
     return keywords
 
 
-def update_history(topic, title, published=True):
+def update_history(topic, title, published=True, article_path=None):
     """
     更新发布历史
 
@@ -38,29 +44,8 @@ def update_history(topic, title, published=True):
         topic: 选中的话题字典
         title: 生成的标题
         published: 是否已发布
+        article_path: 文章 Markdown 路径（提供时同时加入原创性索引）
     """
-    # 获取脚本所在目录
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cache_dir = os.path.join(os.path.dirname(script_dir), 'cache')
-    history_file = os.path.join(cache_dir, 'publish_history.json')
-
-    # 确保cache目录存在
-    os.makedirs(cache_dir, exist_ok=True)
-
-    # 初始化或加载历史文件
-    if not os.path.exists(history_file):
-        data = {'records': []}
-        print(f"✅ 创建新的历史记录文件: {history_file}")
-    else:
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            if 'records' not in data:
-                data = {'records': []}
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"⚠️  历史记录文件损坏，重新初始化: {e}")
-            data = {'records': []}
-
     # 提取关键词
     keywords = list(extract_keywords(topic))
 
@@ -77,40 +62,49 @@ def update_history(topic, title, published=True):
         'published': published
     }
 
-    # 添加记录
-    data['records'].append(record)
-    print(f"✅ 添加记录: {title}")
-
-    # 自动清理7天前的记录
-    cutoff = time.time() - (7 * 24 * 3600)
-    original_count = len(data['records'])
-    data['records'] = [r for r in data['records'] if r.get('timestamp', 0) > cutoff]
-    cleaned_count = original_count - len(data['records'])
-
-    if cleaned_count > 0:
-        print(f"🧹 清理了 {cleaned_count} 条过期记录（>7天）")
-
-    # 保存
+    # 单行写入历史数据库
     try:
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"✅ 历史记录已更新: {history_file}")
-        print(f"📊 当前历史记录总数: {len(data['records'])}")
-    except Exception as e:
+        history_store.add_record(record)
+        print(f"✅ 添加记录: {title}")
+        print(f"✅ 历史记录已更新: {history_store.get_db_path()}")
+        print(f"📊 当前历史记录总数: {history_store.count_records()}")
+    except sqlite3.Error as e:
         print(f"❌ 保存历史记录失败: {e}")
         sys.exit(1)
 
+    # 追加到 JSON 兼容日志（供读取 publish_history.json 的其他 skill 使用）
+    try:
+        history_journal.append_record(record)
+    except OSError as e:
+        print(f"❌ 写入历史日志失败: {e}")
+        sys.exit(1)
+
+    # 已发布文章增量加入原创性索引（失败不影响历史记录）
+    if published and article_path:
+        try:
+            with open(article_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            with OriginalityIndex() as index:
+                if index.add_article(content, title, os.path.abspath(article_path), record['timestamp']):
+                    print(f"✅ 已加入原创性索引（共 {index.count()} 篇）")
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️  更新原创性索引失败: {e}")
+
+    # 后台清理7天前的记录
+    history_store.prune_expired_async()
+
 
 def main():
     """主函数"""
     # 检查命令行参数
     if len(sys.argv) < 3:
-        print("用法: update_history.py <selected_topic.json> <生成的标题>")
+        print("用法: update_history.py <selected_topic.json> <生成的标题> [文章.md]")
         print("示例: update_history.py cache/selected_topic.json 'Claude 3.5来了！提高效率效率提升3倍'")
         sys.exit(1)
 
     topic_file = sys.argv[1]
     title = sys.argv[2]
+    article_path = sys.argv[3] if len(sys.argv) > 3 else None
 
     # 检查topic文件是否存在
     if not os.path.exists(topic_file):
@@ -126,7 +120,7 @@ def main():
         sys.exit(1)
 
     # 更新历史
-    update_history(topic, title)
+    update_history(topic, title, article_path=article_path)
 
 
 if __name__ == '__main__':
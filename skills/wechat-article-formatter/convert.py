@@ -5,463 +5,190 @@
 将 Markdown 转换为适配微信公众号的精美 HTML
 """
 
-import markdown
-from bs4 import BeautifulSoup, NavigableString
 import sys
 import argparse
-import re
+import hashlib
+import json
+import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from formatter_engine import available_themes, get_engine, load_theme
 
-def detect_alert_type(blockquote):
-    """
-    检测blockquote是否为特殊警告框
-    支持的关键词：
-    - Info: 💡, 提示, Info, TIP, NOTE
-    - Warning: ⚠️, 警告, Warning, WARN, CAUTION
-    - Success: ✅, 成功, Success, DONE
-    - Danger: ❌, 危险, Danger, ERROR, CRITICAL
-    """
-    first_strong = blockquote.find('strong')
-    if first_strong:
-        text = first_strong.get_text().strip()
-        text_lower = text.lower()
-        if any(kw in text for kw in ['💡', '提示']) or any(kw in text_lower for kw in ['info', 'tip', 'note']):
-            return 'info'
-        elif any(kw in text for kw in ['⚠️', '警告']) or any(kw in text_lower for kw in ['warning', 'warn', 'caution']):
-            return 'warning'
-        elif any(kw in text for kw in ['✅', '成功']) or any(kw in text_lower for kw in ['success', 'done']):
-            return 'success'
-        elif any(kw in text for kw in ['❌', '危险']) or any(kw in text_lower for kw in ['danger', 'error', 'critical']):
-            return 'danger'
-    return None
-
-
-def is_intro_paragraph(p, index):
-    """判断是否为导语段落（前2段）"""
-    return index < 2
-
-
-def is_scenario_paragraph(p):
-    """判断段落是否为场景描述（包含"场景"、"示例"、"案例"等关键词）"""
-    text = p.get_text()
-    keywords = ['场景一', '场景二', '场景三', '场景四', '场景五',
-                '示例', '案例', '亮点', '特点', '优势']
-    return any(kw in text for kw in keywords)
-
-
-def has_numbered_list_pattern(p):
-    """检测段落是否包含编号模式（如：1. xxx）"""
-    text = p.get_text()
-    return bool(re.match(r'^\d+[.、]', text.strip()))
-
-
-def apply_syntax_highlighting(code_element):
-    """为代码块应用Atom One Dark语法高亮"""
-    syntax_colors = {
-        'k': '#c678dd', 'kn': '#c678dd', 'kd': '#c678dd', 'kt': '#c678dd',
-        'o': '#abb2bf',
-        's': '#98c379', 's1': '#98c379', 's2': '#98c379',
-        'mi': '#d19a66', 'mf': '#d19a66',
-        'nf': '#61afef',
-        'nc': '#e5c07b',
-        'nn': '#abb2bf',
-        'na': '#d19a66',
-        'nb': '#e5c07b',
-        'c': '#5c6370', 'c1': '#5c6370', 'cm': '#5c6370',
-    }
+# 格式化器版本（输出变化时递增，使转换缓存失效；主题文件的变化由主题指纹覆盖）
+FORMATTER_VERSION = '3.0'
 
-    for span in code_element.find_all('span'):
-        if 'class' in span.attrs:
-            for cls in span['class']:
-                if cls in syntax_colors:
-                    span['style'] = f'color: {syntax_colors[cls]};'
-                    break
+# 可用主题（templates/ 下的主题文件，默认 tech 为 v3.0 专业排版样式）
+THEMES = tuple(available_themes())
 
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'convert')
 
-def apply_inline_styles(html_content):
+
+def apply_inline_styles(html_content, theme='tech'):
     """应用内联CSS样式 - v3.0 专业排版版"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # ==================== H2 标题增强（大幅美化 - 淡紫色背景） ====================
-    for h2 in soup.find_all('h2'):
-        h2['style'] = (
-            'font-size: 22px; '
-            'font-weight: bold; '
-            'color: #1f2937; '
-            'margin-top: 45px; '
-            'margin-bottom: 25px; '
-            'padding: 15px 20px; '
-            'background: #faf5ff; '  # 淡紫色（微信不支持渐变）
-            'border-left: 5px solid #7c3aed; '  # 紫色边框（微信不支持border-image）
-            'border-radius: 0 8px 8px 0; '
-            'box-shadow: 0 2px 8px rgba(124, 58, 237, 0.1);'
-        )
-
-    # ==================== H3 标题美化（蓝色系） ====================
-    for h3 in soup.find_all('h3'):
-        h3['style'] = (
-            'font-size: 19px; '
-            'font-weight: 600; '
-            'color: #1f2937; '
-            'margin-top: 30px; '
-            'margin-bottom: 18px; '
-            'padding-left: 15px; '
-            'border-left: 4px solid #3b82f6; '  # 蓝色边框
-            'position: relative;'
-        )
-
-    # ==================== 段落增强处理 ====================
-    paragraphs = soup.find_all('p')
-    for idx, p in enumerate(paragraphs):
-        # 基础样式
-        base_style = (
-            'font-size: 16px; '
-            'line-height: 1.9; '  # 增加行高
-            'color: #374151; '
-            'margin: 20px 0; '  # 加大间距
-        )
-
-        # 导语段落（前2段）- 特殊样式（淡蓝色系）
-        if is_intro_paragraph(p, idx):
-            p['style'] = base_style + (
-                'background: #eff6ff; '  # 淡蓝色（微信不支持渐变）
-                'padding: 20px; '
-                'border-left: 4px solid #3b82f6; '  # 蓝色边框
-                'border-radius: 0 8px 8px 0; '
-                'font-size: 17px; '
-                'line-height: 2.0; '
-                'color: #1f2937; '
-                'margin-bottom: 25px; '
-                'box-shadow: 0 2px 6px rgba(59, 130, 246, 0.1);'  # 蓝色阴影
-            )
-        # 场景/案例段落 - 卡片样式（青色系）
-        elif is_scenario_paragraph(p):
-            p['style'] = base_style + (
-                'background: #ecfeff; '  # 淡青背景
-                'padding: 18px 20px; '
-                'border-left: 4px solid #06b6d4; '  # 青色边框
-                'border-radius: 0 6px 6px 0; '
-                'margin: 25px 0; '
-                'box-shadow: 0 1px 4px rgba(6, 182, 212, 0.1);'  # 青色阴影
-            )
-        # 包含编号的段落 - 突出显示（绿色系）
-        elif has_numbered_list_pattern(p):
-            p['style'] = base_style + (
-                'padding-left: 25px; '
-                'border-left: 3px solid #10b981; '  # 绿色边框
-                'margin: 18px 0;'
-            )
-        # 普通段落
-        else:
-            p['style'] = base_style + (
-                'text-align: justify; '
-                'text-indent: 0;'  # 首行不缩进（微信编辑器会自动处理）
-            )
-
-    # ==================== 列表大幅美化 ====================
-    for ul in soup.find_all('ul'):
-        ul['style'] = (
-            'margin: 25px 0; '
-            'padding-left: 0; '
-            'list-style: none;'
-        )
-
-    for li in soup.find_all('li'):
-        if li.parent.name == 'ul':
-            li['style'] = (
-                'font-size: 16px; '
-                'line-height: 1.9; '
-                'color: #374151; '
-                'margin: 15px 0; '
-                'padding: 12px 12px 12px 35px; '
-                'background: #fafafa; '  # 浅灰背景
-                'border-radius: 6px; '
-                'position: relative;'
-            )
-            # 蓝紫渐变圆点
-            bullet = soup.new_tag('span')
-            bullet['style'] = (
-                'position: absolute; '
-                'left: 12px; '
-                'top: 12px; '
-                'color: #8b5cf6; '  # 稍浅的紫色
-                'font-weight: bold; '
-                'font-size: 18px;'
-            )
-            bullet.string = '●'
-            li.insert(0, bullet)
-            if li.contents and len(li.contents) > 1:
-                li.insert(1, ' ')
-        else:
-            # 有序列表
-            li['style'] = (
-                'font-size: 16px; '
-                'line-height: 1.9; '
-                'color: #374151; '
-                'margin: 12px 0; '
-                'padding-left: 8px;'
-            )
-
-    # 有序列表容器
-    for ol in soup.find_all('ol'):
-        ol['style'] = (
-            'margin: 25px 0; '
-            'padding-left: 30px; '
-            'counter-reset: li;'
-        )
-
-    # ==================== 代码块增强 ====================
-    for pre in soup.find_all('pre'):
-        pre['style'] = (
-            'background: #282c34; '
-            'color: #abb2bf; '
-            'padding: 16px; '
-            'border-radius: 8px; '
-            'overflow-x: auto; '
-            'margin: 20px 0; '
-            'font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, Courier, monospace; '
-            'font-size: 14px; '
-            'line-height: 1.6;'
-        )
-        for code in pre.find_all('code'):
-            code['style'] = (
-                'background-color: transparent; '
-                'color: #abb2bf; '
-                'padding: 0; '
-                'font-family: inherit;'
-            )
-            apply_syntax_highlighting(code)
-
-    # 行内代码（浅灰色系）
-    for code in soup.find_all('code'):
-        if code.parent.name != 'pre':
-            code['style'] = (
-                'background: #f5f5f5; '
-                'color: #e83e8c; '
-                'padding: 2px 6px; '
-                'border-radius: 4px; '
-                'font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, Courier, monospace; '
-                'font-size: 0.9em; '
-                'font-weight: 500;'
-            )
-
-    # ==================== 强调文本增强 ====================
-    for strong in soup.find_all('strong'):
-        strong['style'] = (
-            'color: #3b82f6; '  # 蓝色（从紫色改为蓝色）
-            'font-weight: 600; '
-            'background: #eff6ff; '  # 淡蓝色（微信不支持渐变）
-            'padding: 2px 6px; '
-            'border-radius: 3px;'
-        )
-
-    # ==================== 引用块大幅增强 ====================
-    for blockquote in soup.find_all('blockquote'):
-        alert_type = detect_alert_type(blockquote)
-
-        if alert_type == 'info':
-            blockquote['style'] = (
-                'border-left: 5px solid #6366f1; '
-                'background: #eef2ff; '  # 淡紫蓝色（微信不支持渐变）
-                'padding: 20px 24px; '
-                'margin: 30px 0; '
-                'border-radius: 0 10px 10px 0; '
-                'color: #3730a3; '
-                'font-style: normal; '
-                'box-shadow: 0 2px 8px rgba(99, 102, 241, 0.1);'
-            )
-        elif alert_type == 'warning':
-            blockquote['style'] = (
-                'border-left: 5px solid #f59e0b; '
-                'background: #fffbeb; '  # 淡黄色（微信不支持渐变）
-                'padding: 20px 24px; '
-                'margin: 30px 0; '
-                'border-radius: 0 10px 10px 0; '
-                'color: #92400e; '
-                'font-style: normal; '
-                'box-shadow: 0 2px 8px rgba(245, 158, 11, 0.1);'
-            )
-        elif alert_type == 'success':
-            blockquote['style'] = (
-                'border-left: 5px solid #10b981; '
-                'background: #ecfdf5; '  # 淡绿色（微信不支持渐变）
-                'padding: 20px 24px; '
-                'margin: 30px 0; '
-                'border-radius: 0 10px 10px 0; '
-                'color: #065f46; '
-                'font-style: normal; '
-                'box-shadow: 0 2px 8px rgba(16, 185, 129, 0.1);'
-            )
-        elif alert_type == 'danger':
-            blockquote['style'] = (
-                'border-left: 5px solid #ef4444; '
-                'background: #fef2f2; '  # 淡红色（微信不支持渐变）
-                'padding: 20px 24px; '
-                'margin: 30px 0; '
-                'border-radius: 0 10px 10px 0; '
-                'color: #991b1b; '
-                'font-style: normal; '
-                'box-shadow: 0 2px 8px rgba(239, 68, 68, 0.1);'
-            )
-        else:
-            # 默认引用块 - 更醒目
-            blockquote['style'] = (
-                'border-left: 5px solid #a78bfa; '
-                'background: #faf5ff; '  # 淡紫色（微信不支持渐变）
-                'padding: 20px 24px; '
-                'margin: 30px 0; '
-                'color: #4b5563; '
-                'font-style: italic; '
-                'border-radius: 0 10px 10px 0; '
-                'box-shadow: 0 2px 6px rgba(167, 139, 250, 0.1);'
-            )
-
-    # ==================== 表格大幅美化 ====================
-    for table in soup.find_all('table'):
-        table['style'] = (
-            'border-collapse: collapse; '
-            'width: 100%; '
-            'margin: 20px 0; '
-            'font-size: 15px; '
-            'overflow-x: auto; '
-            'display: block;'
-        )
-
-    for th in soup.find_all('th'):
-        th['style'] = (
-            'background: #7c3aed; '  # 纯色紫色背景（微信不支持渐变）
-            'color: white; '
-            'padding: 12px 16px; '
-            'text-align: left; '
-            'font-weight: 600; '
-            'border: 1px solid #dee2e6; '
-            'font-size: 15px; '
-            'letter-spacing: 0.3px;'
-        )
-
-    # 表格行条纹 + hover效果模拟
-    for tbody in soup.find_all('tbody'):
-        rows = tbody.find_all('tr')
-        for idx, tr in enumerate(rows):
-            cells = tr.find_all('td')
-            for td in cells:
-                base_style = (
-                    'padding: 12px 16px; '
-                    'border: 1px solid #dee2e6; '
-                    'color: #374151; '
-                    'font-size: 14px; '
-                    'line-height: 1.7;'
-                )
-                if idx % 2 == 0:
-                    td['style'] = base_style + 'background: #f8f9fa;'
-                else:
-                    td['style'] = base_style + 'background: white;'
-
-    # ==================== 分隔线美化 ====================
-    for hr in soup.find_all('hr'):
-        hr['style'] = (
-            'border: none; '
-            'height: 3px; '
-            'background: #7c3aed; '  # 紫色（微信不支持渐变）
-            'margin: 50px auto; '
-            'width: 70%; '
-            'opacity: 0.5; '
-            'border-radius: 2px;'
-        )
-
-    # ==================== 链接美化 ====================
-    for a in soup.find_all('a'):
-        a['style'] = (
-            'color: #3b82f6; '  # 蓝色（从紫色改为蓝色）
-            'text-decoration: none; '
-            'border-bottom: 2px solid #dbeafe; '  # 浅蓝下划线
-            'padding-bottom: 2px; '
-            'font-weight: 500;'
-        )
-
-    return str(soup)
-
-
-def markdown_to_html(input_file, skip_h1=True):
+    return get_engine(theme).style_html(html_content)
+
+
+def strip_h1(md_content, theme='tech'):
+    """移除 H1 标题行（及其后紧跟的一个空行）"""
+    return get_engine(theme).strip_h1(md_content)
+
+
+def convert_markdown(md_content, skip_h1=True, theme='tech'):
+    """将 Markdown 文本转换为完整的微信 HTML"""
+    return get_engine(theme).convert(md_content, skip_h1=skip_h1)
+
+
+def markdown_to_html(input_file, skip_h1=True, theme='tech'):
     """将 Markdown 转换为 HTML"""
 
     # 读取 Markdown 文件
     with open(input_file, 'r', encoding='utf-8') as f:
         md_content = f.read()
 
-    # 如果需要跳过 H1 标题
-    if skip_h1:
-        lines = md_content.split('\n')
-        filtered_lines = []
-        skip_next_empty = False
-
-        for line in lines:
-            if line.startswith('# ') and not line.startswith('## '):
-                skip_next_empty = True
-                continue
-            if skip_next_empty and line.strip() == '':
-                skip_next_empty = False
-                continue
-            skip_next_empty = False
-            filtered_lines.append(line)
-
-        md_content = '\n'.join(filtered_lines)
-
-    # 转换为 HTML - 增强配置
-    html = markdown.markdown(
-        md_content,
-        extensions=[
-            'markdown.extensions.extra',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.tables',
-            'markdown.extensions.toc',
-            'markdown.extensions.nl2br',
-            'markdown.extensions.fenced_code',
-        ],
-        extension_configs={
-            'markdown.extensions.codehilite': {
-                'css_class': 'highlight',
-                'linenums': False,
-                'use_pygments': True,
-                'noclasses': True,
-                'pygments_style': 'monokai',
-            }
-        }
-    )
-
-    # 应用内联样式
-    styled_html = apply_inline_styles(html)
-
-    # 创建完整的 HTML 文档 - 更大的内边距
-    full_html = f"""<!-- ⚠️ 标题请在微信公众号编辑器中单独填写 -->
-<section style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px; color: #374151; line-height: 1.8; padding: 30px 24px; background: #ffffff;">
-{styled_html}
-</section>"""
-
-    return full_html
+    return convert_markdown(md_content, skip_h1=skip_h1, theme=theme)
+
+
+def default_output_path(input_file):
+    """默认输出路径：<输入文件名>_wechat.html"""
+    return input_file.rsplit('.', 1)[0] + '_wechat.html'
+
+
+def cache_key(source_bytes, theme='tech', skip_h1=True):
+    """转换缓存键：源文件哈希 + 主题（含主题指纹） + 格式化器版本 + 选项"""
+    key_data = {
+        'source': hashlib.sha256(source_bytes).hexdigest(),
+        'theme': theme,
+        'theme_fingerprint': load_theme(theme).fingerprint,
+        'version': FORMATTER_VERSION,
+        'options': {'skip_h1': skip_h1},
+    }
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _write_if_changed(path, content):
+    """内容不同时才写入（原子替换），返回是否写入"""
+    data = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def convert_file_cached(input_file, output_file=None, theme='tech', skip_h1=True,
+                        cache_dir=CACHE_DIR, force=False):
+    """
+    转换单个文件，输出按内容寻址缓存
+
+    Returns:
+        结果字典 {'input', 'output', 'status': 'converted' | 'cached' | 'error', 'error'}
+    """
+    output_file = output_file or default_output_path(input_file)
+    result = {'input': input_file, 'output': output_file}
+
+    try:
+        with open(input_file, 'rb') as f:
+            source_bytes = f.read()
+
+        key = cache_key(source_bytes, theme, skip_h1)
+        cache_path = os.path.join(cache_dir, f'{key}.html')
+
+        if not force and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            result['status'] = 'cached'
+        else:
+            html = convert_markdown(source_bytes.decode('utf-8'), skip_h1=skip_h1, theme=theme)
+            try:
+                _write_if_changed(cache_path, html)
+            except OSError:
+                # 缓存目录不可写时不影响转换
+                pass
+            result['status'] = 'converted'
+
+        _write_if_changed(output_file, html)
+    except Exception as e:
+        result.update(status='error', error=str(e))
+
+    return result
+
+
+def batch_convert(input_files, theme='tech', skip_h1=True, cache_dir=CACHE_DIR, force=False):
+    """
+    在同一进程中批量转换（复用 Markdown 实例，命中缓存的文件直接跳过）
+
+    Args:
+        input_files: Markdown 文件列表
+        theme: 主题
+        skip_h1: 是否移除 H1 标题
+        cache_dir: 转换缓存目录
+        force: 忽略缓存，全部重新转换
+
+    Returns:
+        每个文件的结果字典列表
+    """
+    return [
+        convert_file_cached(input_file, theme=theme, skip_h1=skip_h1,
+                            cache_dir=cache_dir, force=force)
+        for input_file in input_files
+    ]
 
 
 def main():
     parser = argparse.ArgumentParser(description='微信公众号文章格式化工具 v3.0')
-    parser.add_argument('input', help='输入的 Markdown 文件路径')
-    parser.add_argument('-o', '--output', help='输出的 HTML 文件路径')
+    parser.add_argument('inputs', nargs='*', help='输入的 Markdown 文件路径（可多个，批量转换）')
+    parser.add_argument('-i', '--input', action='append', default=[], dest='input_options',
+                        help='输入的 Markdown 文件路径（可重复）')
+    parser.add_argument('-o', '--output', help='输出的 HTML 文件路径（仅单个输入时可用）')
+    parser.add_argument('-t', '--theme', default='tech', choices=THEMES, help='主题（默认：tech）')
     parser.add_argument('--keep-h1', action='store_true', help='保留 H1 标题')
+    parser.add_argument('--force', action='store_true', help='忽略转换缓存')
+    parser.add_argument('--json', action='store_true', help='以 JSON Lines 输出每个文件的结果')
 
     args = parser.parse_args()
 
-    # 确定输出文件路径
-    if args.output:
-        output_file = args.output
+    input_files = args.inputs + args.input_options
+    if not input_files:
+        parser.error('请提供至少一个输入文件')
+    if args.output and len(input_files) > 1:
+        parser.error('批量转换时不能指定 --output（输出为 <文件名>_wechat.html）')
+
+    # 单个文件
+    if len(input_files) == 1:
+        results = [convert_file_cached(input_files[0], args.output, theme=args.theme,
+                                       skip_h1=not args.keep_h1, force=args.force)]
     else:
-        output_file = args.input.rsplit('.', 1)[0] + '_wechat.html'
+        results = batch_convert(input_files, theme=args.theme,
+                                skip_h1=not args.keep_h1, force=args.force)
+
+    failed = [r for r in results if r['status'] == 'error']
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+        sys.exit(1 if failed else 0)
+
+    for result in failed:
+        print(f"❌ 转换失败: {result['input']}: {result['error']}", file=sys.stderr)
 
-    # 转换
-    html = markdown_to_html(args.input, skip_h1=not args.keep_h1)
+    if len(results) > 1:
+        cached = sum(1 for r in results if r['status'] == 'cached')
+        print(f"✅ 批量转换完成：{len(results) - len(failed)}/{len(results)} 成功（复用缓存 {cached} 篇）")
+        sys.exit(1 if failed else 0)
 
-    # 保存
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    if failed:
+        sys.exit(1)
 
+    output_file = results[0]['output']
     print(f"✅ 转换成功！（v3.0 专业排版版）")
     print(f"📄 输出文件：{output_file}")
     print(f"\n📋 发布步骤：")
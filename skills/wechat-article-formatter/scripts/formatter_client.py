@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formatter Client - 常驻格式化服务的客户端
+优先通过 Unix socket 调用 formatter_worker.py；服务未启动时在当前进程内直接转换
+
+用法（Python）:
+    from formatter_client import FormatterClient
+    client = FormatterClient()
+    html = client.convert(markdown_text)
+    result = client.convert_file('article.md', 'article_wechat.html')
+
+用法（命令行）:
+    formatter_client.py article.md [更多文章...] [--engine v3|theme] [--theme 主题]
+    formatter_client.py --ping
+"""
+
+import argparse
+import itertools
+import json
+import os
+import socket
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from formatter_worker import FormatterEngine, default_socket_path
+
+# 连接超时（秒）：服务不可用时尽快回退到进程内转换
+CONNECT_TIMEOUT = 0.5
+
+# 单个请求的超时（秒）
+REQUEST_TIMEOUT = 120
+
+
+class FormatterClient:
+    """格式化客户端（服务不可用时回退到进程内转换）"""
+
+    def __init__(self, socket_path=None, fallback=True):
+        self.socket_path = socket_path or default_socket_path()
+        self.fallback = fallback
+        self._sock = None
+        self._reader = None
+        self._ids = itertools.count(1)
+        self._local_engine = None
+
+    def _connect(self):
+        if self._sock is not None:
+            return True
+        if not os.path.exists(self.socket_path):
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            return False
+        sock.settimeout(REQUEST_TIMEOUT)
+        self._sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8')
+        return True
+
+    def close(self):
+        """关闭与服务的连接"""
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _local(self):
+        if self._local_engine is None:
+            self._local_engine = FormatterEngine()
+        return self._local_engine
+
+    def request(self, request):
+        """
+        发送一个请求并返回响应字典
+
+        服务不可用（未启动、连接断开）时，fallback=True 则在进程内处理
+        """
+        request = dict(request, id=next(self._ids))
+        if self._connect():
+            try:
+                self._sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+                line = self._reader.readline()
+                if line:
+                    return json.loads(line)
+            except (OSError, ValueError):
+                pass
+            # 连接中断：丢弃连接，按服务不可用处理
+            self.close()
+
+        if not self.fallback:
+            return {'id': request['id'], 'ok': False, 'error': f"格式化服务不可用: {self.socket_path}"}
+        try:
+            engine = self._local()
+        except ImportError as e:
+            return {'id': request['id'], 'ok': False, 'error': f"缺少格式化依赖: {e}"}
+        return engine.handle(request)
+
+    def ping(self):
+        """检查服务是否在运行（不回退），返回响应或 None"""
+        if not self._connect():
+            return None
+        fallback, self.fallback = self.fallback, False
+        try:
+            response = self.request({'op': 'ping'})
+        finally:
+            self.fallback = fallback
+        return response if response.get('ok') else None
+
+    def convert(self, markdown_text, engine='v3', theme=None, skip_h1=True):
+        """转换 Markdown 文本，返回 HTML（失败时抛出 RuntimeError）"""
+        response = self.request({'op': 'convert', 'markdown': markdown_text,
+                                 'engine': engine, 'theme': theme, 'skip_h1': skip_h1})
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error'))
+        return response['html']
+
+    def convert_file(self, input_file, output_file=None, engine='v3', theme=None,
+                     skip_h1=True, force=False):
+        """
+        转换文件（路径会转为绝对路径，服务可能运行在其他工作目录）
+
+        Returns:
+            结果字典 {'input', 'output', 'status': 'converted' | 'cached' | 'error', 'error'}
+        """
+        input_file = os.path.abspath(input_file)
+        response = self.request({
+            'op': 'convert_file', 'input': input_file,
+            'output': os.path.abspath(output_file) if output_file else None,
+            'engine': engine, 'theme': theme, 'skip_h1': skip_h1, 'force': force,
+        })
+        if not response.get('ok'):
+            return {'input': input_file, 'output': output_file, 'status': 'error',
+                    'error': response.get('error')}
+        return {'input': input_file, 'output': response['output'], 'status': response['status']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='格式化服务客户端（服务未启动时进程内转换）')
+    parser.add_argument('inputs', nargs='*', help='输入的 Markdown 文件')
+    parser.add_argument('--engine', default='v3', choices=['v3', 'theme'], help='转换引擎')
+    parser.add_argument('--theme', help='主题')
+    parser.add_argument('--socket', help='Unix socket 路径')
+    parser.add_argument('--ping', action='store_true', help='检查服务状态')
+    args = parser.parse_args()
+
+    with FormatterClient(args.socket) as client:
+        if args.ping:
+            response = client.ping()
+            if response is None:
+                print(f"❌ 格式化服务未运行: {client.socket_path}")
+                sys.exit(1)
+            print(f"✅ 格式化服务运行中: pid {response['pid']}，已处理 {response['jobs']} 个任务")
+            return
+
+        failed = 0
+        for input_file in args.inputs:
+            result = client.convert_file(input_file, engine=args.engine, theme=args.theme)
+            if result['status'] == 'error':
+                failed += 1
+                print(f"❌ 转换失败: {input_file}: {result['error']}", file=sys.stderr)
+            else:
+                print(f"✅ {result['status']}: {result['output']}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formatter Engine - 统一的 Markdown → 微信 HTML 转换引擎
+convert.py（v3.0 排版）和 markdown_to_html.py（主题CSS）都是它的前端
+
+主题以数据表示（templates/<主题名>.yaml），加载时编译一次：
+- elements：按标签和条件给出的样式（如 v3.0 排版），编译为「元素 → 样式字符串」表
+- css：主题CSS，编译为选择器表后由 StyleResolver 按特异性内联
+转换流程：预处理（H1、信息框）→ Markdown（实例复用）→ 徽章 → 一次解析 → 一次遍历应用样式 → 一次序列化 → 包装
+"""
+
+import hashlib
+import os
+import re
+import sys
+from pathlib import Path
+from string import Template
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import markdown
+import yaml
+from bs4 import BeautifulSoup, Tag
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import highlight_cache
+from style_engine import StyleResolver
+from theme_cache import load_compiled_theme
+
+# 代码高亮结果缓存（fenced_code / codehilite 扩展共用）
+highlight_cache.install()
+
+# 引擎版本（转换逻辑变化时递增，参与主题指纹）
+ENGINE_VERSION = '1'
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / 'templates'
+
+ROOT_VARS_RE = re.compile(r':root\s*\{([^}]+)\}')
+BADGE_RE = re.compile(r'\[!([^\]]+)\]')
+
+
+def available_themes() -> List[str]:
+    """可用主题列表（templates/ 下的 .yaml 主题文件）"""
+    return sorted(path.stem for path in TEMPLATES_DIR.glob('*.yaml'))
+
+
+# ==================== 条件（elements 中的 when） ====================
+
+class WalkContext:
+    """一次文档树遍历中的状态：同名标签序号、表格行序号、引用块类型"""
+
+    def __init__(self, theme: 'Theme', soup: BeautifulSoup):
+        self.theme = theme
+        self.soup = soup
+        self._ordinals: Dict[str, int] = {}
+        self._current_ordinal: Dict[int, int] = {}
+        self._tbody_rows: Dict[int, int] = {}
+        self._row_index: Dict[int, int] = {}
+
+    def enter(self, elem: Tag) -> None:
+        """按文档顺序登记元素（在匹配样式之前调用）"""
+        ordinal = self._ordinals.get(elem.name, 0)
+        self._ordinals[elem.name] = ordinal + 1
+        self._current_ordinal[id(elem)] = ordinal
+
+        if elem.name == 'tr':
+            # 行序号按最近的 tbody 计算（tbody 的所有后代行都参与计数）
+            nearest = None
+            for ancestor in elem.parents:
+                if ancestor.name == 'tbody':
+                    count = self._tbody_rows.get(id(ancestor), 0)
+                    self._tbody_rows[id(ancestor)] = count + 1
+                    if nearest is None:
+                        nearest = count
+            if nearest is not None:
+                self._row_index[id(elem)] = nearest
+
+    def ordinal(self, elem: Tag) -> int:
+        """元素在同名标签中的序号（从0开始）"""
+        return self._current_ordinal[id(elem)]
+
+    def row_index(self, elem: Tag) -> Optional[int]:
+        """单元格所在行在 tbody 中的序号；不在 tbody 中时返回 None"""
+        tr = elem.find_parent('tr')
+        if tr is None:
+            return None
+        return self._row_index.get(id(tr))
+
+    def alert_type(self, elem: Tag) -> Optional[str]:
+        """根据第一个 <strong> 的文字判断引用块类型"""
+        first_strong = elem.find('strong')
+        if not first_strong:
+            return None
+        text = first_strong.get_text().strip()
+        text_lower = text.lower()
+        for alert in self.theme.alerts:
+            if any(kw in text for kw in alert['symbols']) or any(kw in text_lower for kw in alert['words']):
+                return alert['type']
+        return None
+
+
+Predicate = Callable[[Tag, WalkContext], bool]
+
+
+def _index_below(limit) -> Predicate:
+    return lambda elem, ctx: ctx.ordinal(elem) < limit
+
+
+def _text_contains_any(keywords) -> Predicate:
+    keywords = tuple(keywords)
+    return lambda elem, ctx: any(kw in elem.get_text() for kw in keywords)
+
+
+def _text_matches(pattern) -> Predicate:
+    compiled = re.compile(pattern)
+    return lambda elem, ctx: bool(compiled.match(elem.get_text().strip()))
+
+
+def _parent(tag_name) -> Predicate:
+    return lambda elem, ctx: elem.parent is not None and elem.parent.name == tag_name
+
+
+def _alert(alert_type) -> Predicate:
+    return lambda elem, ctx: ctx.alert_type(elem) == alert_type
+
+
+def _row_parity(parity) -> Predicate:
+    remainder = 0 if parity == 'even' else 1
+
+    def check(elem, ctx):
+        index = ctx.row_index(elem)
+        return index is not None and index % 2 == remainder
+    return check
+
+
+# 主题数据中可用的条件
+PREDICATES: Dict[str, Callable[..., Predicate]] = {
+    'index_below': _index_below,            # 同名标签中的序号 < N（如前2段）
+    'text_contains_any': _text_contains_any,  # 文本包含任一关键词
+    'text_matches': _text_matches,          # 去除首尾空白后的文本匹配正则（从开头匹配）
+    'parent': _parent,                      # 父元素标签名
+    'alert': _alert,                        # 引用块类型（见主题 alerts）
+    'row_parity': _row_parity,              # tbody 中的行序号奇偶（even / odd）
+}
+
+
+class ElementRule(NamedTuple):
+    """编译后的元素样式规则"""
+    predicates: Tuple[Predicate, ...]
+    style: str
+    bullet: Optional[Tuple[str, str]]
+
+    def matches(self, elem: Tag, ctx: WalkContext) -> bool:
+        return all(predicate(elem, ctx) for predicate in self.predicates)
+
+
+def _compile_predicates(when: Optional[dict]) -> Tuple[Predicate, ...]:
+    predicates = []
+    for name, arg in (when or {}).items():
+        if name not in PREDICATES:
+            raise ValueError(f"Unknown condition in theme: {name}. Available: {', '.join(PREDICATES)}")
+        predicates.append(PREDICATES[name](arg))
+    return tuple(predicates)
+
+
+def _compile_elements(elements: dict) -> Dict[str, Tuple[ElementRule, ...]]:
+    """把主题的 elements 编译为 {标签: (规则, ...)}，样式字符串预先拼接好"""
+    table = {}
+    for tag_name, spec in (elements or {}).items():
+        if isinstance(spec, str):
+            table[tag_name] = (ElementRule((), spec, None),)
+            continue
+
+        base = spec.get('base', '')
+        rules = []
+        for variant in spec.get('variants', []):
+            bullet = variant.get('bullet')
+            rules.append(ElementRule(
+                _compile_predicates(variant.get('when')),
+                base + variant.get('style', ''),
+                (bullet['text'], bullet['style']) if bullet else None,
+            ))
+        table[tag_name] = tuple(rules)
+    return table
+
+
+# ==================== 主题 ====================
+
+class Theme:
+    """编译后的主题（每个进程每个主题只编译一次）"""
+
+    def __init__(self, name: str):
+        theme_file = TEMPLATES_DIR / f'{name}.yaml'
+        if not theme_file.exists():
+            raise ValueError(f"Unknown theme: {name}. Available: {', '.join(available_themes())}")
+
+        source = theme_file.read_bytes()
+        spec = yaml.safe_load(source) or {}
+
+        self.name = name
+        self.description = spec.get('description', '')
+
+        # 主题CSS（可选）
+        self.css_text = ''
+        if spec.get('css'):
+            css_file = TEMPLATES_DIR / spec['css']
+            if not css_file.exists():
+                raise FileNotFoundError(f"Theme CSS file not found: {css_file}")
+            self.css_text = css_file.read_text(encoding='utf-8')
+        self.resolver = StyleResolver(load_compiled_theme(self.css_text)) if self.css_text else None
+        root_vars = ROOT_VARS_RE.search(self.css_text)
+        self.root_vars = root_vars.group(1) if root_vars else ''
+
+        # 主题指纹：主题文件 + CSS + 引擎版本（用于转换缓存）
+        digest = hashlib.sha256(ENGINE_VERSION.encode('utf-8'))
+        digest.update(source)
+        digest.update(self.css_text.encode('utf-8'))
+        self.fingerprint = digest.hexdigest()
+
+        strip_h1 = spec.get('strip_h1', {})
+        self.h1_match_stripped = strip_h1.get('match_stripped', False)
+        self.h1_drop_blank_after = strip_h1.get('drop_blank_after', False)
+
+        block_types = spec.get('custom_blocks') or []
+        self.custom_block_re = re.compile(
+            r':::\s*(' + '|'.join(re.escape(t) for t in block_types) + r')\s*\n(.*?)\n:::',
+            re.DOTALL
+        ) if block_types else None
+
+        badges = spec.get('badges')
+        self.badge_classes = badges.get('classes', {}) if badges else None
+        self.badge_default = badges.get('default', 'badge-primary') if badges else None
+
+        md_spec = spec.get('markdown', {})
+        self.md_extensions = md_spec.get('extensions', [])
+        self.md_extension_configs = md_spec.get('extension_configs', {})
+        self._markdown = None
+
+        self.alerts = [
+            {'type': a['type'], 'symbols': tuple(a.get('symbols', ())), 'words': tuple(a.get('words', ()))}
+            for a in spec.get('alerts', [])
+        ]
+        self.syntax_colors = spec.get('syntax_colors') or {}
+        self.element_rules = _compile_elements(spec.get('elements'))
+        self.code_lang_attribute = spec.get('code_lang_attribute', False)
+        self.image_style = spec.get('image_style')
+        self.wrapper = Template(spec.get('wrapper', '${body}'))
+
+    def markdown(self) -> markdown.Markdown:
+        """获取可复用的 Markdown 实例（已 reset）"""
+        if self._markdown is None:
+            self._markdown = markdown.Markdown(
+                extensions=self.md_extensions,
+                extension_configs=self.md_extension_configs
+            )
+        return self._markdown.reset()
+
+
+_themes: Dict[str, Theme] = {}
+
+
+def load_theme(name: str) -> Theme:
+    """加载并编译主题（进程内缓存）"""
+    theme = _themes.get(name)
+    if theme is None:
+        theme = Theme(name)
+        _themes[name] = theme
+    return theme
+
+
+# ==================== 转换 ====================
+
+class ConversionEngine:
+    """Markdown → 微信 HTML 转换引擎"""
+
+    def __init__(self, theme: str = 'tech'):
+        self.theme = load_theme(theme)
+
+    def strip_h1(self, markdown_text: str) -> str:
+        """移除 H1 标题行（微信公众号有独立的标题输入框）"""
+        match_stripped = self.theme.h1_match_stripped
+        drop_blank_after = self.theme.h1_drop_blank_after
+
+        filtered_lines = []
+        skip_next_empty = False
+        for line in markdown_text.split('\n'):
+            candidate = line.strip() if match_stripped else line
+            # 只删除单个 # 开头的行（## 和更多 # 的不删除）
+            if candidate.startswith('# ') and not candidate.startswith('## '):
+                skip_next_empty = drop_blank_after
+                continue
+            if skip_next_empty and line.strip() == '':
+                skip_next_empty = False
+                continue
+            skip_next_empty = False
+            filtered_lines.append(line)
+
+        return '\n'.join(filtered_lines)
+
+    def _process_custom_blocks(self, markdown_text: str) -> str:
+        """::: info 等信息框 -> <div class="alert alert-info">"""
+        def replace_block(match):
+            return f'<div class="alert alert-{match.group(1)}">{match.group(2)}</div>'
+
+        return self.theme.custom_block_re.sub(replace_block, markdown_text)
+
+    def _process_badges(self, html: str) -> str:
+        """[!NEW] -> <span class="badge badge-new">NEW</span>"""
+        classes = self.theme.badge_classes
+        default = self.theme.badge_default
+
+        def replace_badge(match):
+            text = match.group(1)
+            return f'<span class="badge {classes.get(text, default)}">{text}</span>'
+
+        return BADGE_RE.sub(replace_badge, html)
+
+    def _apply_element_rules(self, elem: Tag, ctx: WalkContext) -> None:
+        for rule in self.theme.element_rules.get(elem.name, ()):
+            if rule.matches(elem, ctx):
+                elem['style'] = rule.style
+                if rule.bullet:
+                    text, style = rule.bullet
+                    bullet = ctx.soup.new_tag('span')
+                    bullet['style'] = style
+                    bullet.string = text
+                    elem.insert(0, bullet)
+                    if len(elem.contents) > 1:
+                        elem.insert(1, ' ')
+                break
+
+    def _apply_syntax_colors(self, code: Tag) -> None:
+        """为代码块中带 Pygments 类名的 span 设置颜色"""
+        colors = self.theme.syntax_colors
+        for span in code.find_all('span', class_=True):
+            for cls in span['class']:
+                if cls in colors:
+                    span['style'] = f'color: {colors[cls]};'
+                    break
+
+    def _code_lang_attribute(self, pre: Tag) -> None:
+        """为 <pre> 添加 data-lang 语言标签"""
+        code = pre.find('code')
+        if code:
+            for cls in code.get('class', []):
+                if cls.startswith('language-'):
+                    pre['data-lang'] = cls.replace('language-', '')
+                    break
+
+    def _image_defaults(self, img: Tag) -> None:
+        """图片没有 max-width 时追加默认样式"""
+        existing_style = img.get('style', '')
+        if 'max-width' not in existing_style:
+            additions = self.theme.image_style
+            img['style'] = f'{existing_style}; {additions}' if existing_style else additions
+
+    def style_tree(self, soup: BeautifulSoup) -> None:
+        """遍历文档树一次，为每个元素查表应用样式"""
+        theme = self.theme
+        ctx = WalkContext(theme, soup)
+        for elem in soup.find_all(True):
+            ctx.enter(elem)
+            if theme.code_lang_attribute and elem.name == 'pre':
+                self._code_lang_attribute(elem)
+            if theme.image_style and elem.name == 'img':
+                self._image_defaults(elem)
+            if elem.name in theme.element_rules:
+                self._apply_element_rules(elem, ctx)
+            if theme.syntax_colors and elem.name == 'code' and elem.find_parent('pre'):
+                self._apply_syntax_colors(elem)
+            if theme.resolver is not None:
+                theme.resolver.apply(elem)
+
+    def style_html(self, html: str) -> str:
+        """为 HTML 片段应用主题样式"""
+        soup = BeautifulSoup(html, 'html.parser')
+        self.style_tree(soup)
+        return str(soup)
+
+    def render_body(self, markdown_text: str, skip_h1: bool = True) -> str:
+        """转换为带内联样式的 HTML 片段（不含包装）"""
+        if skip_h1:
+            markdown_text = self.strip_h1(markdown_text)
+        if self.theme.custom_block_re is not None:
+            markdown_text = self._process_custom_blocks(markdown_text)
+
+        html = self.theme.markdown().convert(markdown_text)
+
+        # 徽章在解析前做文本替换
+        if self.theme.badge_classes is not None:
+            html = self._process_badges(html)
+
+        return self.style_html(html)
+
+    def convert(self, markdown_text: str, skip_h1: bool = True) -> str:
+        """转换为完整的微信 HTML"""
+        body = self.render_body(markdown_text, skip_h1=skip_h1)
+        return self.theme.wrapper.substitute(body=body, root_vars=self.theme.root_vars)
+
+
+_engines: Dict[str, ConversionEngine] = {}
+
+
+def get_engine(theme: str = 'tech') -> ConversionEngine:
+    """获取主题对应的转换引擎（进程内缓存）"""
+    engine = _engines.get(theme)
+    if engine is None:
+        engine = ConversionEngine(theme)
+        _engines[theme] = engine
+    return engine
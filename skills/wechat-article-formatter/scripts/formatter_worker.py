@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formatter Worker - 常驻格式化服务
+保持 Markdown 管线、主题和 Pygments 词法分析器常驻内存，避免每篇文章都重新启动解释器和导入依赖
+
+协议（JSON Lines，每行一个请求，每行一个响应）：
+    请求：{"id": 1, "op": "convert", "markdown": "...", "engine": "v3", "theme": "tech", "skip_h1": true}
+          {"id": 2, "op": "convert_file", "input": "a.md", "output": "a.html", "engine": "v3"}
+          {"id": 3, "op": "ping"}
+          {"id": 4, "op": "shutdown"}
+    响应：{"id": 1, "ok": true, "html": "..."} / {"id": 2, "ok": true, "output": "...", "status": "cached"}
+          {"id": 1, "ok": false, "error": "..."}
+
+engine：v3（convert.py 的 v3.0 排版）或 theme（markdown_to_html.py 的主题CSS转换器）
+
+用法:
+    formatter_worker.py                    # 监听 Unix socket
+    formatter_worker.py --stdio            # 通过 stdin/stdout 通信（由父进程管理生命周期）
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+# 预热用的示例文章（覆盖常见块和代码高亮）
+WARMUP_MARKDOWN = '''# 预热
+
+## 标题
+
+段落 **强调** `code` [链接](https://example.com)
+
+- 列表
+1. 有序
+
+> 引用
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+```python
+def hello():
+    return "world"
+```
+
+```bash
+echo hello
+```
+'''
+
+
+def default_socket_path():
+    """默认 socket 路径（可用 WECHAT_FORMATTER_SOCKET 覆盖）"""
+    if os.environ.get('WECHAT_FORMATTER_SOCKET'):
+        return os.environ['WECHAT_FORMATTER_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime_dir, f'wechat-formatter-{os.getuid()}.sock')
+
+
+class FormatterEngine:
+    """常驻的转换引擎（转换串行执行，Markdown 实例不是线程安全的）"""
+
+    def __init__(self):
+        import convert
+        from markdown_to_html import WeChatHTMLConverter
+
+        self._convert = convert
+        self._converter_class = WeChatHTMLConverter
+        self._theme_converters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.jobs = 0
+
+    def _theme_converter(self, theme):
+        converter = self._theme_converters.get(theme)
+        if converter is None:
+            converter = self._converter_class(theme=theme)
+            self._theme_converters[theme] = converter
+        return converter
+
+    def warm_up(self):
+        """预热：构建 Markdown 管线、编译主题、加载常用语言的词法分析器"""
+        self.convert_text(WARMUP_MARKDOWN, engine='v3')
+        self.convert_text(WARMUP_MARKDOWN, engine='theme', theme='ai-tech')
+
+    def convert_text(self, markdown_text, engine='v3', theme=None, skip_h1=True):
+        """转换 Markdown 文本，返回 HTML"""
+        with self._lock:
+            self.jobs += 1
+            if engine == 'v3':
+                return self._convert.convert_markdown(markdown_text, skip_h1=skip_h1, theme=theme or 'tech')
+            if engine == 'theme':
+                return self._theme_converter(theme or 'ai-tech').convert(markdown_text)
+            raise ValueError(f"Unknown engine: {engine}")
+
+    def convert_file(self, input_file, output_file=None, engine='v3', theme=None,
+                     skip_h1=True, force=False):
+        """转换文件并写入输出，返回结果字典"""
+        if engine == 'v3':
+            with self._lock:
+                self.jobs += 1
+                return self._convert.convert_file_cached(
+                    input_file, output_file, theme=theme or 'tech', skip_h1=skip_h1, force=force)
+
+        if engine != 'theme':
+            raise ValueError(f"Unknown engine: {engine}")
+        with self._lock:
+            self.jobs += 1
+            output_file = self._theme_converter(theme or 'ai-tech').convert_file(input_file, output_file)
+        return {'input': input_file, 'output': output_file, 'status': 'converted'}
+
+    def handle(self, request):
+        """处理一个请求，返回响应字典"""
+        response = {'id': request.get('id')}
+        op = request.get('op', 'convert')
+        options = {
+            'engine': request.get('engine', 'v3'),
+            'theme': request.get('theme'),
+            'skip_h1': request.get('skip_h1', True),
+        }
+
+        try:
+            if op == 'ping':
+                response.update(ok=True, pid=os.getpid(), jobs=self.jobs,
+                                uptime=round(time.time() - self.started_at, 1))
+            elif op == 'convert':
+                response.update(ok=True, html=self.convert_text(request['markdown'], **options))
+            elif op == 'convert_file':
+                result = self.convert_file(request['input'], request.get('output'),
+                                           force=request.get('force', False), **options)
+                if result.get('status') == 'error':
+                    response.update(ok=False, error=result.get('error'))
+                else:
+                    response.update(ok=True, output=result['output'], status=result['status'])
+            elif op == 'shutdown':
+                response.update(ok=True)
+            else:
+                response.update(ok=False, error=f"Unknown op: {op}")
+        except Exception as e:
+            response.update(ok=False, error=str(e))
+
+        return response
+
+
+def serve_lines(engine, reader, writer):
+    """
+    逐行处理 JSON 请求
+
+    Returns:
+        收到 shutdown 请求时返回 True
+    """
+    for line in reader:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            writer.write(json.dumps({'ok': False, 'error': f"Invalid JSON: {e}"}) + '\n')
+            writer.flush()
+            continue
+
+        response = engine.handle(request)
+        writer.write(json.dumps(response, ensure_ascii=False) + '\n')
+        writer.flush()
+        if request.get('op') == 'shutdown':
+            return True
+    return False
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(engine, socket_path):
+    """监听 Unix socket（每个连接可发送多个请求）"""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = (line.decode('utf-8') for line in self.rfile)
+            writer = _TextWriter(self.wfile)
+            if serve_lines(engine, reader, writer):
+                threading.Thread(target=self.server.shutdown).start()
+
+    server = _Server(socket_path, Handler)
+    os.chmod(socket_path, 0o600)
+    print(f"✅ 格式化服务已启动: {socket_path} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class _TextWriter:
+    """把 socket 的二进制写端包装为文本写端"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻 Markdown → 微信 HTML 格式化服务')
+    parser.add_argument('--socket', default=default_socket_path(), help='Unix socket 路径')
+    parser.add_argument('--stdio', action='store_true', help='通过 stdin/stdout 通信')
+    parser.add_argument('--no-warmup', action='store_true', help='启动时不预热')
+    args = parser.parse_args()
+
+    engine = FormatterEngine()
+    if not args.no_warmup:
+        engine.warm_up()
+
+    try:
+        if args.stdio:
+            serve_lines(engine, sys.stdin, sys.stdout)
+        else:
+            serve_socket(engine, args.socket)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
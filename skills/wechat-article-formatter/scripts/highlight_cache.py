@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Syntax Highlighting Cache
+为 Markdown 的 codehilite 高亮结果提供缓存，避免每次转换都重新高亮所有代码块
+
+- 缓存键：代码 + 语言 + Pygments 样式 + 内联模式（noclasses）等全部格式化选项
+- 内存 LRU + 磁盘（cache/highlight_cache.db，SQLite）两级缓存
+- 词法分析器和格式化器按（语言/名称, 选项）只创建一次
+- 未标注语言的代码块先用轻量规则判断语言，判断不出时才调用代价很高的 guess_lexer
+
+用法:
+    import highlight_cache
+    highlight_cache.install()   # 之后 fenced_code / codehilite 扩展都会使用缓存
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import markdown.extensions.codehilite as codehilite_ext
+import markdown.extensions.fenced_code as fenced_code_ext
+from markdown.extensions.codehilite import CodeHilite
+
+try:
+    import pygments
+    from pygments import highlight
+    from pygments.formatters import get_formatter_by_name
+    from pygments.lexers import get_lexer_by_name, guess_lexer
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover
+    pygments = None
+
+# 内存缓存条目数
+MEMORY_CACHE_SIZE = 512
+
+# 磁盘缓存条目上限（超出后按最近使用时间淘汰）
+DISK_CACHE_SIZE = 5000
+
+# 每写入多少条检查一次磁盘缓存大小
+DISK_PRUNE_EVERY = 100
+
+CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'cache', 'highlight_cache.db')
+
+# 判断规则版本（修改 LANGUAGE_HINTS 时递增，使按旧规则判断语言的缓存失效）
+LANGUAGE_HINTS_VERSION = '2'
+
+# 未标注语言时的快速判断规则（按顺序匹配，命中即用）
+LANGUAGE_HINTS = [
+    (re.compile(r'\A#!.*\b(?:ba|z)?sh\b'), 'bash'),
+    (re.compile(r'\A#!.*\bpython'), 'python'),
+    (re.compile(r'\A\s*[\[{]\s*(?:"|\]|\}|\Z)'), 'json'),
+    (re.compile(r'\A\s*<(?:!DOCTYPE|html|div|span|p|a|section|body|head)\b', re.IGNORECASE), 'html'),
+    (re.compile(r'^\s*(?:SELECT|INSERT INTO|UPDATE|DELETE FROM|CREATE TABLE)\b', re.IGNORECASE | re.MULTILINE), 'sql'),
+    (re.compile(r'^\s*(?:def |class \w+(?:\(.*\))?:\s*$|from \w[\w.]* import |import \w+$|print\()', re.MULTILINE), 'python'),
+    # export 后必须是 JS 声明（shell 中的 export KEY=value 留给 bash 规则）
+    (re.compile(r'^\s*(?:const |let |function |import .* from |export (?:default|const|let|function|class|async|\{)'
+                r'|console\.log\()', re.MULTILINE), 'javascript'),
+    (re.compile(r'^\s*(?:\$ |(?:pip|npm|npx|yarn|git|cd|ls|curl|wget|docker|brew|sudo|apt|export|echo|python3?) )',
+                re.MULTILINE), 'bash'),
+]
+
+_memory_cache = OrderedDict()
+_lexers = {}
+_formatters = {}
+_lock = threading.RLock()
+_db = None
+_db_failed = False
+_writes = 0
+
+stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'heuristic': 0, 'guessed': 0}
+
+
+def _options_key(options):
+    return tuple(sorted((key, repr(value)) for key, value in options.items()))
+
+
+def get_lexer(lang, options):
+    """按（语言, 选项）缓存词法分析器；语言未知时抛出 ValueError"""
+    key = (lang, _options_key(options))
+    lexer = _lexers.get(key)
+    if lexer is None:
+        lexer = get_lexer_by_name(lang, **options)
+        _lexers[key] = lexer
+    return lexer
+
+
+def get_formatter(name, options):
+    """按（名称, 选项）缓存格式化器"""
+    key = (name, _options_key(options))
+    formatter = _formatters.get(key)
+    if formatter is None:
+        try:
+            formatter = get_formatter_by_name(name, **options)
+        except ClassNotFound:
+            formatter = get_formatter_by_name('html', **options)
+        _formatters[key] = formatter
+    return formatter
+
+
+def detect_language(src):
+    """用轻量规则判断代码语言，判断不出时返回 None"""
+    for pattern, lang in LANGUAGE_HINTS:
+        if pattern.search(src):
+            return lang
+    return None
+
+
+def _get_db():
+    global _db, _db_failed
+    if _db is None and not _db_failed:
+        try:
+            os.makedirs(os.path.dirname(CACHE_DB), exist_ok=True)
+            _db = sqlite3.connect(CACHE_DB, timeout=5, check_same_thread=False)
+            _db.execute('PRAGMA journal_mode=WAL')
+            _db.execute(
+                'CREATE TABLE IF NOT EXISTS highlights ('
+                'key TEXT PRIMARY KEY, lang TEXT NOT NULL, html TEXT NOT NULL, '
+                'used_at REAL NOT NULL)'
+            )
+        except sqlite3.Error:
+            # 缓存目录不可用时只使用内存缓存
+            _db = None
+            _db_failed = True
+    return _db
+
+
+def _disk_get(key):
+    db = _get_db()
+    if db is None:
+        return None
+    try:
+        row = db.execute('SELECT lang, html FROM highlights WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            with db:
+                db.execute('UPDATE highlights SET used_at = ? WHERE key = ?', (time.time(), key))
+        return row
+    except sqlite3.Error:
+        return None
+
+
+def _disk_put(key, lang, html):
+    global _writes
+    db = _get_db()
+    if db is None:
+        return
+    try:
+        with db:
+            db.execute('INSERT OR REPLACE INTO highlights (key, lang, html, used_at) VALUES (?, ?, ?, ?)',
+                       (key, lang, html, time.time()))
+        _writes += 1
+        if _writes % DISK_PRUNE_EVERY == 0:
+            with db:
+                db.execute(
+                    'DELETE FROM highlights WHERE key IN (SELECT key FROM highlights '
+                    'ORDER BY used_at DESC LIMIT -1 OFFSET ?)', (DISK_CACHE_SIZE,)
+                )
+    except sqlite3.Error:
+        pass
+
+
+def _memory_put(key, value):
+    _memory_cache[key] = value
+    _memory_cache.move_to_end(key)
+    if len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+class CachedCodeHilite(CodeHilite):
+    """带缓存的 CodeHilite（输出与 CodeHilite 一致，未标注语言时先用规则判断）"""
+
+    def _cache_key(self):
+        formatter = self.pygments_formatter
+        formatter_name = formatter if isinstance(formatter, str) else f'{formatter.__module__}.{formatter.__qualname__}'
+        parts = [
+            pygments.__version__, LANGUAGE_HINTS_VERSION, self.src, self.lang or '', str(self.guess_lang),
+            self.lang_prefix, formatter_name, repr(_options_key(self.options)),
+        ]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def _resolve_lexer(self):
+        try:
+            return get_lexer(self.lang, self.options)
+        except ValueError:
+            pass
+        if self.guess_lang:
+            hinted = detect_language(self.src)
+            if hinted is not None:
+                stats['heuristic'] += 1
+                return get_lexer(hinted, self.options)
+            stats['guessed'] += 1
+            try:
+                return guess_lexer(self.src, **self.options)
+            except ValueError:  # pragma: no cover
+                pass
+        return get_lexer('text', self.options)
+
+    def hilite(self, shebang=True):
+        self.src = self.src.strip('\n')
+        if self.lang is None and shebang:
+            self._parseHeader()
+        if not (pygments and self.use_pygments):
+            return super().hilite(shebang=False)
+
+        key = self._cache_key()
+        with _lock:
+            cached = _memory_cache.get(key)
+            if cached is not None:
+                _memory_cache.move_to_end(key)
+                stats['memory_hits'] += 1
+            else:
+                cached = _disk_get(key)
+                if cached is not None:
+                    stats['disk_hits'] += 1
+                    _memory_put(key, tuple(cached))
+        if cached is not None:
+            lang, html = cached
+            self.lang = lang or self.lang
+            return html
+
+        stats['misses'] += 1
+        lexer = self._resolve_lexer()
+        if not self.lang:
+            # 使用判断出的语言
+            self.lang = lexer.aliases[0]
+        lang_str = f'{self.lang_prefix}{self.lang}'
+        if isinstance(self.pygments_formatter, str):
+            formatter = get_formatter(self.pygments_formatter, self.options)
+        else:
+            formatter = self.pygments_formatter(lang_str=lang_str, **self.options)
+        html = highlight(self.src, lexer, formatter)
+
+        with _lock:
+            _memory_put(key, (self.lang, html))
+            _disk_put(key, self.lang, html)
+        return html
+
+
+def install():
+    """让 fenced_code 和 codehilite 扩展使用带缓存的高亮器（可重复调用）"""
+    fenced_code_ext.CodeHilite = CachedCodeHilite
+    codehilite_ext.CodeHilite = CachedCodeHilite
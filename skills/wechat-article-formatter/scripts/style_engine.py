@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inline Style Engine
+按标签、类名、ID为主题规则建立索引，一次遍历文档树即可为每个元素计算内联样式
+
+- 支持简单选择器：标签、类、ID及其组合，以及后代选择器（如 `pre code`、`table.x th`）
+- 伪类、子选择器、属性选择器等复杂选择器无法内联，直接跳过
+- 层叠顺序：已有 style 属性 > 特异性高的规则 > 同特异性中靠后的规则
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bs4 import Tag
+
+from theme_cache import CompiledTheme
+
+# 无法内联的选择器特征（伪类、伪元素、@规则、子/兄弟选择器、属性、通配符）
+UNSUPPORTED_SELECTOR_CHARS = (':', '@', '>', '+', '~', '[', '*')
+
+COMPOUND_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9-]*)?((?:[.#][\w-]+)*)$')
+SIMPLE_PART_RE = re.compile(r'([.#])([\w-]+)')
+
+
+class Compound(NamedTuple):
+    """复合选择器，如 table.model-comparison"""
+    tag: Optional[str]
+    classes: Tuple[str, ...]
+    id: Optional[str]
+
+    def matches(self, elem: Tag) -> bool:
+        if self.tag is not None and elem.name != self.tag:
+            return False
+        if self.id is not None and elem.get('id') != self.id:
+            return False
+        if self.classes:
+            elem_classes = elem.get('class') or ()
+            return all(cls in elem_classes for cls in self.classes)
+        return True
+
+
+class StyleRule(NamedTuple):
+    """可内联的样式规则"""
+    order: int
+    specificity: Tuple[int, int, int]
+    compounds: Tuple[Compound, ...]
+    declarations: Tuple[Tuple[str, str], ...]
+
+    def matches(self, elem: Tag) -> bool:
+        """从右向左匹配后代选择器"""
+        *ancestors, subject = self.compounds
+        if not subject.matches(elem):
+            return False
+        node = elem.parent
+        for compound in reversed(ancestors):
+            while node is not None and not (isinstance(node, Tag) and compound.matches(node)):
+                node = node.parent
+            if node is None:
+                return False
+            node = node.parent
+        return True
+
+
+def parse_selector(selector: str) -> Optional[Tuple[Compound, ...]]:
+    """
+    解析简单选择器
+
+    Returns:
+        复合选择器元组（从左到右）；无法内联时返回 None
+    """
+    if any(x in selector for x in UNSUPPORTED_SELECTOR_CHARS):
+        return None
+
+    compounds = []
+    for part in selector.split():
+        match = COMPOUND_RE.match(part)
+        if not match or not (match.group(1) or match.group(2)):
+            return None
+        tag = match.group(1).lower() if match.group(1) else None
+        classes = []
+        element_id = None
+        for kind, name in SIMPLE_PART_RE.findall(match.group(2)):
+            if kind == '.':
+                classes.append(name)
+            else:
+                element_id = name
+        compounds.append(Compound(tag, tuple(classes), element_id))
+
+    return tuple(compounds) if compounds else None
+
+
+def _specificity(compounds: Tuple[Compound, ...]) -> Tuple[int, int, int]:
+    return (
+        sum(1 for c in compounds if c.id is not None),
+        sum(len(c.classes) for c in compounds),
+        sum(1 for c in compounds if c.tag is not None),
+    )
+
+
+def parse_inline_style(style: str) -> Dict[str, str]:
+    """解析 style 属性为 {属性: 值}"""
+    declarations = {}
+    for item in style.split(';'):
+        if ':' in item:
+            key, value = item.split(':', 1)
+            declarations[key.strip()] = value.strip()
+    return declarations
+
+
+class StyleResolver:
+    """按索引查找候选规则，计算元素的最终内联样式"""
+
+    def __init__(self, css_rules: CompiledTheme):
+        self.by_id: Dict[str, List[StyleRule]] = defaultdict(list)
+        self.by_class: Dict[str, List[StyleRule]] = defaultdict(list)
+        self.by_tag: Dict[str, List[StyleRule]] = defaultdict(list)
+
+        for order, (selector, styles) in enumerate(css_rules.items()):
+            compounds = parse_selector(selector)
+            if compounds is None or not styles:
+                continue
+            rule = StyleRule(order, _specificity(compounds), compounds, tuple(styles.items()))
+
+            # 按最右侧复合选择器中区分度最高的部分建立索引
+            subject = compounds[-1]
+            if subject.id is not None:
+                self.by_id[subject.id].append(rule)
+            elif subject.classes:
+                self.by_class[subject.classes[0]].append(rule)
+            else:
+                self.by_tag[subject.tag].append(rule)
+
+    def matching_rules(self, elem: Tag) -> List[StyleRule]:
+        """匹配元素的全部规则（按源码顺序）"""
+        candidates = list(self.by_tag.get(elem.name, ()))
+        for cls in elem.get('class') or ():
+            candidates.extend(self.by_class.get(cls, ()))
+        element_id = elem.get('id')
+        if element_id:
+            candidates.extend(self.by_id.get(element_id, ()))
+
+        seen = set()
+        matched = []
+        for rule in candidates:
+            if rule.order not in seen and rule.matches(elem):
+                seen.add(rule.order)
+                matched.append(rule)
+        matched.sort(key=lambda rule: rule.order)
+        return matched
+
+    def resolve(self, elem: Tag) -> Optional[Dict[str, str]]:
+        """
+        计算元素的合并样式
+
+        Returns:
+            {属性: 值}；没有匹配规则时返回 None（不修改元素）
+        """
+        matched = self.matching_rules(elem)
+        if not matched:
+            return None
+
+        # 已有 style 属性优先，其余属性按首次出现的规则顺序排列
+        existing = parse_inline_style(elem.get('style', ''))
+        declarations = dict(existing)
+        for rule in matched:
+            for prop, _ in rule.declarations:
+                declarations.setdefault(prop, None)
+
+        # 按层叠顺序赋值：特异性低的先写，特异性高、位置靠后的覆盖
+        for rule in sorted(matched, key=lambda rule: (rule.specificity, rule.order)):
+            for prop, value in rule.declarations:
+                if prop not in existing:
+                    declarations[prop] = value
+        return declarations
+
+    def apply(self, elem: Tag) -> None:
+        """将合并样式写回元素的 style 属性（每个元素只写一次）"""
+        declarations = self.resolve(elem)
+        if declarations is not None:
+            elem['style'] = '; '.join(f'{k}: {v}' for k, v in declarations.items())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Theme CSS Compiler & Cache
+把主题CSS预编译为「选择器 → 样式声明」只读表（CSS变量已替换）
+
+- 进程内缓存：同一进程多次转换只编译一次
+- 磁盘缓存：cache/themes/<CSS文件SHA-256>.json，CSS不变时新进程也无需cssutils
+- 只有CSS内容变化（或编译器版本升级）后首次使用才会调用cssutils
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+# 编译逻辑变化时递增，使旧的磁盘缓存失效
+COMPILER_VERSION = 1
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / 'cache' / 'themes'
+
+CSS_VAR_RE = re.compile(r'--([a-zA-Z0-9-]+):\s*([^;]+);')
+
+CompiledTheme = Mapping[str, Mapping[str, str]]
+
+# 进程内缓存（CSS哈希 -> 编译结果）
+_memory_cache: Dict[str, CompiledTheme] = {}
+
+
+def css_hash(css_text: str) -> str:
+    """主题CSS内容的 SHA-256"""
+    return hashlib.sha256(css_text.encode('utf-8')).hexdigest()
+
+
+def compile_theme_css(css_text: str) -> Dict[str, Dict[str, str]]:
+    """
+    使用cssutils解析CSS，生成选择器到样式声明的映射（冷路径）
+
+    Args:
+        css_text: 主题CSS文本
+
+    Returns:
+        {选择器: {属性: 值}}，顺序与CSS中首次出现的顺序一致
+    """
+    import cssutils
+
+    # 禁用cssutils的警告日志
+    cssutils.log.setLevel(logging.CRITICAL)
+
+    # 解析CSS变量
+    css_vars = {}
+    for match in CSS_VAR_RE.finditer(css_text):
+        css_vars[f'--{match.group(1)}'] = match.group(2).strip()
+
+    css_rules = {}
+    sheet = cssutils.parseString(css_text)
+
+    for rule in sheet:
+        if rule.type != rule.STYLE_RULE:
+            continue
+
+        styles = {}
+        for prop in rule.style:
+            value = prop.value
+            # 替换CSS变量（按定义顺序依次替换，与逐条替换的结果一致）
+            if 'var(' in value:
+                for var_name, var_value in css_vars.items():
+                    value = value.replace(f'var({var_name})', var_value)
+            styles[prop.name] = value
+
+        # 处理多个选择器
+        for sel in rule.selectorText.split(','):
+            sel = sel.strip()
+            if sel not in css_rules:
+                css_rules[sel] = {}
+            css_rules[sel].update(styles)
+
+    return css_rules
+
+
+def _freeze(css_rules: Dict[str, Dict[str, str]]) -> CompiledTheme:
+    return MappingProxyType({
+        selector: MappingProxyType(dict(styles))
+        for selector, styles in css_rules.items()
+    })
+
+
+def _cache_path(digest: str, cache_dir: Path) -> Path:
+    return cache_dir / f'{digest}.json'
+
+
+def _read_disk_cache(path: Path) -> Optional[Dict[str, Dict[str, str]]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return None
+    if not isinstance(data, dict) or data.get('compiler_version') != COMPILER_VERSION:
+        return None
+    # 以 [选择器, [[属性, 值], ...]] 列表保存，保证顺序
+    return {selector: dict(styles) for selector, styles in data.get('rules', [])}
+
+
+def _write_disk_cache(path: Path, digest: str, css_rules: Dict[str, Dict[str, str]]) -> None:
+    data = {
+        'compiler_version': COMPILER_VERSION,
+        'css_sha256': digest,
+        'rules': [[selector, list(styles.items())] for selector, styles in css_rules.items()],
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # 缓存目录不可写时只使用进程内缓存
+        pass
+
+
+def load_compiled_theme(css_text: str, cache_dir: Optional[Path] = None) -> CompiledTheme:
+    """
+    获取主题的编译结果：进程内缓存 → 磁盘缓存 → cssutils编译
+
+    Args:
+        css_text: 主题CSS文本
+        cache_dir: 磁盘缓存目录（默认 cache/themes）
+
+    Returns:
+        只读映射 {选择器: {属性: 值}}
+    """
+    digest = css_hash(css_text)
+    compiled = _memory_cache.get(digest)
+    if compiled is not None:
+        return compiled
+
+    path = _cache_path(digest, cache_dir or CACHE_DIR)
+    css_rules = _read_disk_cache(path)
+    if css_rules is None:
+        css_rules = compile_theme_css(css_text)
+        _write_disk_cache(path, digest, css_rules)
+
+    compiled = _freeze(css_rules)
+    _memory_cache[digest] = compiled
+    return compiled
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口调用额度记账
+按接口记录当天的调用次数（多个发布进程共用一个账本文件），发布前预估调用量，
+额度紧张时推迟非必要调用，额度用完（45009）后当天不再调用该接口
+
+- 每日计数：按北京时间零点重置（与微信额度的重置时间一致）
+- 额度：配置文件 api_quotas > 默认值；上次触发 45009 时的本地调用次数只用于提醒
+  （账本看不到其他工具的调用，该次数可能远小于实际额度，不能作为之后的额度）
+- 调用前记账：失败的调用同样计入微信的额度
+- 非必要调用（如确认缓存的素材是否存在）只在剩余额度高于保留比例时进行
+
+账本文件：~/.wechat-publisher/api_ledger.json
+    {"version": 1, "scope": "<appid>@<接口地址>", "date": "2025-01-01",
+     "calls": {"media/uploadimg": 12}, "exhausted": ["draft/add"], "learned_quotas": {"draft/add": 1000}}
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from token_manager import FileLock
+
+LEDGER_VERSION = 1
+
+# 默认每日额度（保守估计，以公众平台「开发 → 接口权限」中显示的为准，可在配置文件 api_quotas 中覆盖）
+DEFAULT_QUOTAS = {
+    'token': 2000,
+}
+
+# 剩余额度低于该比例时推迟非必要调用
+RESERVE_RATIO = 0.1
+
+# 微信额度按北京时间（UTC+8）零点重置
+RESET_UTC_OFFSET = 8 * 3600
+
+
+class QuotaExceededError(Exception):
+    """接口额度不足（本地记账预估不足，或接口返回 45009）"""
+
+    def __init__(self, message: str, endpoints: Iterable[str]):
+        self.endpoints = list(endpoints)
+        super().__init__(message)
+
+
+def ledger_date(now: Optional[float] = None) -> str:
+    """当前额度周期的日期（北京时间）"""
+    return time.strftime('%Y-%m-%d', time.gmtime((time.time() if now is None else now) + RESET_UTC_OFFSET))
+
+
+class ApiBudget:
+    """
+    接口调用账本（线程安全、多进程安全）
+
+    Args:
+        ledger_file: 账本文件
+        scope: 账本归属（如 appid@接口地址），与文件中的不一致时视为新账本
+        quotas: 每日额度 {接口: 次数}（覆盖默认值和记录的实际额度）
+        reserve_ratio: 剩余额度低于该比例时推迟非必要调用
+    """
+
+    def __init__(self, ledger_file: str, scope: str = "", quotas: Optional[Dict[str, int]] = None,
+                 reserve_ratio: float = RESERVE_RATIO):
+        self.ledger_file = ledger_file
+        self.lock_file = ledger_file + '.lock'
+        self.scope = scope
+        self.quotas = dict(quotas or {})
+        self.reserve_ratio = reserve_ratio
+        self._lock = threading.Lock()
+
+    def quota(self, endpoint: str) -> Optional[int]:
+        """接口的每日额度（未知时返回 None，表示不限制）"""
+        return self.quotas.get(endpoint, DEFAULT_QUOTAS.get(endpoint))
+
+    def remaining(self, endpoint: str, state: Optional[Dict] = None) -> Optional[int]:
+        """
+        接口当天的剩余额度
+
+        Returns:
+            剩余次数；额度未知时返回 None；已触发 45009 时返回 0
+        """
+        state = state if state is not None else self._read()
+        if endpoint in state['exhausted']:
+            return 0
+        quota = self.quota(endpoint)
+        if quota is None:
+            return None
+        return max(0, quota - state['calls'].get(endpoint, 0))
+
+    def allow(self, endpoint: str, count: int = 1, critical: bool = True) -> bool:
+        """
+        判断是否可以调用
+
+        Args:
+            endpoint: 接口（如 media/uploadimg）
+            count: 调用次数
+            critical: 是否必要调用。非必要调用在调用后剩余额度低于保留比例时不允许
+
+        Returns:
+            是否可以调用
+        """
+        state = self._read()
+        remaining = self.remaining(endpoint, state)
+        if remaining is None:
+            return True
+        if not critical:
+            return remaining - count >= self.quota(endpoint) * self.reserve_ratio
+        return remaining >= count
+
+    def acquire(self, endpoint: str) -> None:
+        """
+        记录一次调用（在发出请求前调用）
+
+        Raises:
+            QuotaExceededError: 当天额度已用完
+        """
+        with self._update() as state:
+            remaining = self.remaining(endpoint, state)
+            if remaining is not None and remaining <= 0:
+                raise QuotaExceededError(
+                    f"接口 {endpoint} 今日额度已用完（{self._describe(endpoint, state)}），请明天再试",
+                    [endpoint])
+            state['calls'][endpoint] = state['calls'].get(endpoint, 0) + 1
+
+    def mark_exhausted(self, endpoint: str) -> None:
+        """接口返回 45009：当天不再调用，并记下当天的本地调用次数（之后只用于提醒）"""
+        with self._update() as state:
+            if endpoint not in state['exhausted']:
+                state['exhausted'].append(endpoint)
+            used = state['calls'].get(endpoint, 0)
+            if used and endpoint not in self.quotas:
+                state['learned_quotas'][endpoint] = used
+
+    def check(self, expected: Dict[str, int]) -> None:
+        """
+        发布前预估：确认各接口的剩余额度足够完成本次发布
+
+        Args:
+            expected: 预计调用次数 {接口: 次数}
+
+        Raises:
+            QuotaExceededError: 有接口额度不足（列出全部不足的接口）
+        """
+        state = self._read()
+        short = {}
+        for endpoint, count in expected.items():
+            remaining = self.remaining(endpoint, state)
+            if count and remaining is not None and remaining < count:
+                short[endpoint] = (count, remaining)
+            learned = state['learned_quotas'].get(endpoint)
+            if count and learned is not None and state['calls'].get(endpoint, 0) + count > learned:
+                print(f"⚠ 接口 {endpoint} 之前在本地记录 {learned} 次调用时返回过 45009，本次可能额度不足")
+        if short:
+            details = '; '.join(f"{endpoint} 需要 {count} 次，剩余 {remaining} 次"
+                                for endpoint, (count, remaining) in sorted(short.items()))
+            raise QuotaExceededError(f"接口额度不足，未开始发布（{details}）", short)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        当天各接口的用量
+
+        Returns:
+            {接口: {'used': 已调用, 'quota': 额度或None, 'remaining': 剩余或None, 'exhausted': 是否已触发45009}}
+        """
+        state = self._read()
+        endpoints = set(state['calls']) | set(state['exhausted']) | set(self.quotas) | set(DEFAULT_QUOTAS)
+        return {
+            endpoint: {
+                'used': state['calls'].get(endpoint, 0),
+                'quota': self.quota(endpoint),
+                'remaining': self.remaining(endpoint, state),
+                'exhausted': endpoint in state['exhausted'],
+            }
+            for endpoint in sorted(endpoints)
+        }
+
+    # ==================== 内部 ====================
+
+    def _describe(self, endpoint: str, state: Dict) -> str:
+        used = state['calls'].get(endpoint, 0)
+        if endpoint in state['exhausted']:
+            return f"已调用 {used} 次，接口返回 45009"
+        return f"已调用 {used}/{self.quota(endpoint)} 次"
+
+    def _empty(self, previous: Optional[Dict] = None) -> Dict:
+        # 跨天时保留上次触发 45009 时的调用次数（只用于提醒）
+        learned = previous.get('learned_quotas', {}) if previous and previous.get('scope') == self.scope else {}
+        return {'version': LEDGER_VERSION, 'scope': self.scope, 'date': ledger_date(),
+                'calls': {}, 'exhausted': [], 'learned_quotas': dict(learned)}
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return self._empty()
+        except (OSError, ValueError) as e:
+            print(f"⚠ 读取接口账本失败: {e}")
+            return self._empty()
+        if (not isinstance(state, dict) or state.get('version') != LEDGER_VERSION
+                or state.get('scope') != self.scope or state.get('date') != ledger_date()):
+            return self._empty(state if isinstance(state, dict) else None)
+        return state
+
+    @contextmanager
+    def _update(self):
+        """加锁读取账本，退出时写回（发生异常时不写）"""
+        with self._lock, FileLock(self.lock_file):
+            state = self._read()
+            yield state
+            self._write(state)
+
+    def _write(self, state: Dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.ledger_file) or '.', exist_ok=True)
+            tmp_path = f"{self.ledger_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.ledger_file)
+        except OSError as e:
+            # 账本不可写时不影响发布，只是无法跨进程记账
+            print(f"⚠ 写入接口账本失败: {e}")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布流程性能基准
+启动本地微信接口替身（mock_wechat_server.py），用 WeChatPublisher 跑完整的 create_draft 流程（额度检查、上传封面和内容图片、提交草稿），
+统计吞吐量、单篇耗时、重试次数和上传字节数
+
+所有缓存文件（配置、token、素材缓存、接口账本）都放在临时目录，不影响 ~/.wechat-publisher
+
+用法:
+    python benchmark_publisher.py                          # 10 篇，每篇 6 张图片
+    python benchmark_publisher.py --drafts 20 --images 10 --latency 0.05
+    python benchmark_publisher.py --expire-every 5 --busy-rate 0.05   # 注入 token 过期和系统繁忙
+    python benchmark_publisher.py --shared-images          # 各篇使用相同图片（测试素材缓存）
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_wechat_server import MockWeChatServer
+from publisher import WeChatPublisher
+
+
+def make_images(directory: str, count: int, prefix: str, size=(1600, 1000), seed: int = 0):
+    """生成测试图片（随机噪声 PNG，避免被压缩得过小）"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{prefix}{i}.png")
+        if not os.path.exists(path):
+            img = Image.frombytes('RGB', (size[0] // 4, size[1] // 4), rng.randbytes(size[0] * size[1] * 3 // 16))
+            img.resize(size).save(path)
+        paths.append(path)
+    return paths
+
+
+def make_article(image_names, paragraphs: int = 30) -> str:
+    """生成测试文章 HTML（段落、背景色区块和图片交替）"""
+    # 图片均匀分布在段落之间
+    image_at = {k * paragraphs // len(image_names): name for k, name in enumerate(image_names)} if image_names else {}
+    parts = ['<section style="font-family: sans-serif; background-color: #ffffff; padding: 16px;">']
+    for i in range(paragraphs):
+        parts.append(f'<p style="margin-bottom: 24px; line-height: 1.8; color: #333333;">第 {i + 1} 段正文，'
+                     f'用于性能基准的示例内容。</p>')
+        if i % 5 == 0:
+            parts.append('<div style="background-color: #eff6ff; padding: 12px; border-radius: 8px; color: #93c5fd;">'
+                         '<p>提示框内容</p></div>')
+        if i in image_at:
+            parts.append(f'<img src="{image_at[i]}" alt="配图">')
+    parts.append('</section>')
+    return '\n'.join(parts)
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_benchmark(drafts: int = 10, images: int = 6, latency: float = 0.02, jitter: float = 0.2,
+                  expire_every: int = 0, busy_rate: float = 0.0, shared_images: bool = False,
+                  media_cache: bool = True, verbose: bool = False, seed: int = 0):
+    """
+    运行基准
+
+    Args:
+        drafts: 草稿数
+        images: 每篇文章的内容图片数
+        latency: 接口响应延迟（秒）
+        jitter: 延迟抖动比例
+        expire_every: 每隔几篇草稿让 token 失效一次（0 表示不注入）
+        busy_rate: 图片上传返回 -1（系统繁忙）的概率
+        shared_images: 各篇使用相同的图片
+        media_cache: 使用素材缓存
+        verbose: 显示发布器的输出
+        seed: 随机数种子
+
+    Returns:
+        统计结果字典
+    """
+    workdir = tempfile.mkdtemp(prefix='wechat-bench-')
+    try:
+        return _run(workdir, drafts, images, latency, jitter, expire_every, busy_rate, shared_images,
+                    media_cache, verbose, seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(workdir, drafts, images, latency, jitter, expire_every, busy_rate, shared_images, media_cache, verbose, seed):
+    cover = make_images(workdir, 1, 'cover_', size=(900, 383), seed=seed)[0]
+
+    class BenchPublisher(WeChatPublisher):
+        CONFIG_FILE = os.path.join(workdir, 'config.json')
+        TOKEN_CACHE_FILE = os.path.join(workdir, 'token_cache.json')
+        MEDIA_CACHE_FILE = os.path.join(workdir, 'media_cache.json')
+        API_LEDGER_FILE = os.path.join(workdir, 'api_ledger.json')
+
+    with open(BenchPublisher.CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'appid': 'wx' + '0' * 16, 'appsecret': 'benchmark-secret'}, f)
+
+    articles = []
+    for i in range(drafts):
+        prefix = 'shared_' if shared_images else f'a{i}_'
+        paths = make_images(workdir, images, prefix, seed=seed if shared_images else seed + i + 1)
+        articles.append(make_article([os.path.basename(p) for p in paths]))
+
+    output = None if verbose else io.StringIO()
+    durations = []
+    failures = []
+
+    with MockWeChatServer(latency=latency, jitter=jitter, seed=seed) as server:
+        if busy_rate:
+            server.inject_error('material/add_material', -1, rate=busy_rate)
+            server.inject_error('media/uploadimg', -1, rate=busy_rate)
+
+        with contextlib.redirect_stdout(output) if output is not None else contextlib.nullcontext():
+            publisher = BenchPublisher()
+            publisher.BASE_URL = server.base_url
+            if not media_cache:
+                publisher.media_cache = None
+
+            started = time.time()
+            for i, content in enumerate(articles):
+                if expire_every and i and i % expire_every == 0:
+                    server.inject_error('draft/add', 42001, times=1)
+                t0 = time.time()
+                try:
+                    publisher.create_draft(title=f"基准测试文章 {i + 1}", content=content, author="基准",
+                                           content_base_dir=workdir, cover=cover)
+                except Exception as e:
+                    failures.append((i + 1, str(e)))
+                durations.append(time.time() - t0)
+            elapsed = time.time() - started
+
+        stats = server.stats()
+
+    endpoints = stats['endpoints']
+    token_calls = endpoints.get('token', {}).get('calls', 0)
+    draft_calls = endpoints.get('draft/add', {}).get('calls', 0)
+    errors = {}
+    for entry in endpoints.values():
+        for errcode, count in entry['errors'].items():
+            errors[errcode] = errors.get(errcode, 0) + count
+
+    return {
+        'drafts': drafts,
+        'succeeded': drafts - len(failures),
+        'failures': failures,
+        'elapsed': elapsed,
+        'throughput': drafts / elapsed if elapsed else 0.0,
+        'mean': statistics.mean(durations),
+        'p95': percentile(durations, 0.95),
+        'requests': stats['requests'],
+        'bytes_uploaded': stats['bytes_in'],
+        'token_refreshes': max(0, token_calls - 1),
+        'draft_retries': max(0, draft_calls - (drafts - len(failures))),
+        'errors': errors,
+        'endpoints': endpoints,
+    }
+
+
+def print_report(result) -> None:
+    print(f"\n{'='*50}")
+    print(f"📊 发布基准: {result['succeeded']}/{result['drafts']} 篇成功")
+    print(f"{'='*50}")
+    print(f"总耗时:     {result['elapsed']:.2f}s")
+    print(f"吞吐量:     {result['throughput']:.2f} 篇/秒")
+    print(f"单篇耗时:   平均 {result['mean'] * 1000:.0f}ms, p95 {result['p95'] * 1000:.0f}ms")
+    print(f"请求数:     {result['requests']}")
+    print(f"上传字节:   {result['bytes_uploaded'] / 1024 / 1024:.2f}MB")
+    print(f"重试:       token 刷新 {result['token_refreshes']} 次, draft/add 重试 {result['draft_retries']} 次")
+    if result['errors']:
+        print("错误码:     " + ", ".join(f"{code} × {count}" for code, count in sorted(result['errors'].items())))
+    print("\n按接口:")
+    for endpoint, entry in sorted(result['endpoints'].items()):
+        print(f"  {endpoint:<28} {entry['calls']:>5} 次  {entry['bytes_in'] / 1024:>9.1f}KB")
+    for index, message in result['failures']:
+        print(f"⚠️ 第 {index} 篇失败: {message}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='发布流程性能基准（使用本地微信接口替身）')
+    parser.add_argument('--drafts', type=int, default=10, help='草稿数（默认: 10）')
+    parser.add_argument('--images', type=int, default=6, help='每篇文章的内容图片数（默认: 6）')
+    parser.add_argument('--latency', type=float, default=0.02, help='接口响应延迟（秒，默认: 0.02）')
+    parser.add_argument('--jitter', type=float, default=0.2, help='延迟抖动比例（默认: 0.2）')
+    parser.add_argument('--expire-every', type=int, default=0, help='每隔几篇让 token 失效一次（42001）')
+    parser.add_argument('--busy-rate', type=float, default=0.0, help='图片上传返回 -1 的概率')
+    parser.add_argument('--shared-images', action='store_true', help='各篇使用相同的图片')
+    parser.add_argument('--no-media-cache', action='store_true', help='不使用素材缓存')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示发布器输出')
+    args = parser.parse_args()
+
+    result = run_benchmark(drafts=args.drafts, images=args.images, latency=args.latency, jitter=args.jitter,
+                           expire_every=args.expire_every, busy_rate=args.busy_rate,
+                           shared_images=args.shared_images, media_cache=not args.no_media_cache,
+                           verbose=args.verbose, seed=args.seed)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    else:
+        print_report(result)
+
+
+if __name__ == '__main__':
+    main()
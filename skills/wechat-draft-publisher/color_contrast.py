@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+颜色对比度计算（WCAG 2.x）
+解析 CSS 颜色、计算相对亮度和对比度，并为背景找出满足对比度要求的文字颜色
+
+颜色解析、亮度和对比度计算都有缓存：一篇文章中的颜色种类很少，重复计算可以忽略
+"""
+
+import colorsys
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+RGBA = Tuple[float, float, float, float]  # r, g, b ∈ [0, 255]，a ∈ [0, 1]
+RGB = Tuple[float, float, float]
+
+# WCAG AA 正文最低对比度
+MIN_CONTRAST = 4.5
+
+BLACK: RGB = (0.0, 0.0, 0.0)
+WHITE: RGB = (255.0, 255.0, 255.0)
+
+# 常用的 CSS 颜色名（模板和文章中实际出现的范围）
+NAMED_COLORS = {
+    'black': '#000000', 'white': '#ffffff', 'red': '#ff0000', 'green': '#008000',
+    'blue': '#0000ff', 'yellow': '#ffff00', 'orange': '#ffa500', 'purple': '#800080',
+    'gray': '#808080', 'grey': '#808080', 'silver': '#c0c0c0', 'navy': '#000080',
+    'teal': '#008080', 'maroon': '#800000', 'olive': '#808000', 'lime': '#00ff00',
+    'aqua': '#00ffff', 'cyan': '#00ffff', 'fuchsia': '#ff00ff', 'magenta': '#ff00ff',
+    'pink': '#ffc0cb', 'brown': '#a52a2a', 'gold': '#ffd700', 'indigo': '#4b0082',
+    'violet': '#ee82ee', 'darkgray': '#a9a9a9', 'darkgrey': '#a9a9a9',
+    'lightgray': '#d3d3d3', 'lightgrey': '#d3d3d3', 'whitesmoke': '#f5f5f5',
+    'ghostwhite': '#f8f8ff', 'aliceblue': '#f0f8ff', 'ivory': '#fffff0',
+    'beige': '#f5f5dc', 'lavender': '#e6e6fa', 'darkred': '#8b0000',
+    'darkblue': '#00008b', 'darkgreen': '#006400',
+}
+
+HEX_RE = re.compile(r'#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})$')
+FUNC_RE = re.compile(r'(rgba?|hsla?)\(([^)]*)\)$')
+# background 简写或渐变中的颜色（颜色名不能是 repeat-x、--white 这类带连字符的单词的一部分）
+COLOR_TOKEN_RE = re.compile(r'#[0-9a-fA-F]{3,8}\b|(?:rgba?|hsla?)\([^)]*\)|(?<![\w#-])[a-zA-Z]+(?![\w-])')
+# 查找颜色前先去掉的部分：url()（如 url(white.png)）、var()（无法计算）和引号中的字符串
+NON_COLOR_RE = re.compile(r'\b(?:url|var)\((?:"[^"]*"|\'[^\']*\'|[^)])*\)|"[^"]*"|\'[^\']*\'', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def parse_color(value: str) -> Optional[RGBA]:
+    """
+    解析 CSS 颜色值
+
+    Args:
+        value: 颜色值（#rgb、#rrggbb、#rrggbbaa、rgb()/rgba()、hsl()/hsla()、颜色名、transparent）
+
+    Returns:
+        (r, g, b, a)，无法解析（如 var()、inherit、currentColor）时返回 None
+    """
+    value = value.strip().lower()
+    if value == 'transparent':
+        return (0.0, 0.0, 0.0, 0.0)
+    value = NAMED_COLORS.get(value, value)
+
+    match = HEX_RE.match(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) in (3, 4):
+            digits = ''.join(ch * 2 for ch in digits)
+        channels = [int(digits[i:i + 2], 16) for i in range(0, len(digits), 2)]
+        alpha = channels[3] / 255 if len(channels) == 4 else 1.0
+        return (float(channels[0]), float(channels[1]), float(channels[2]), alpha)
+
+    match = FUNC_RE.match(value)
+    if not match:
+        return None
+    parts = [p for p in re.split(r'[\s,/]+', match.group(2).strip()) if p]
+    if len(parts) not in (3, 4):
+        return None
+    try:
+        alpha = _parse_alpha(parts[3]) if len(parts) == 4 else 1.0
+        if match.group(1).startswith('rgb'):
+            rgb = [_parse_channel(p) for p in parts[:3]]
+        else:
+            rgb = _hsl_to_rgb(float(parts[0].rstrip('deg')), _parse_percent(parts[1]), _parse_percent(parts[2]))
+    except ValueError:
+        return None
+    return (rgb[0], rgb[1], rgb[2], alpha)
+
+
+def _parse_channel(part: str) -> float:
+    if part.endswith('%'):
+        return min(255.0, max(0.0, float(part[:-1]) * 2.55))
+    return min(255.0, max(0.0, float(part)))
+
+
+def _parse_alpha(part: str) -> float:
+    if part.endswith('%'):
+        return min(1.0, max(0.0, float(part[:-1]) / 100))
+    return min(1.0, max(0.0, float(part)))
+
+
+def _parse_percent(part: str) -> float:
+    return min(1.0, max(0.0, float(part.rstrip('%')) / 100))
+
+
+def _hsl_to_rgb(hue: float, saturation: float, lightness: float) -> RGB:
+    r, g, b = colorsys.hls_to_rgb((hue % 360) / 360, lightness, saturation)
+    return (r * 255, g * 255, b * 255)
+
+
+def find_colors(value: str):
+    """依次返回 background 简写、渐变等值中可以解析的颜色"""
+    for token in COLOR_TOKEN_RE.findall(NON_COLOR_RE.sub(' ', value)):
+        color = parse_color(token)
+        if color is not None:
+            yield color
+
+
+def composite(color: RGBA, backdrop: RGB) -> RGB:
+    """把半透明颜色叠加到不透明背景上"""
+    r, g, b, a = color
+    if a >= 1:
+        return (r, g, b)
+    return (r * a + backdrop[0] * (1 - a),
+            g * a + backdrop[1] * (1 - a),
+            b * a + backdrop[2] * (1 - a))
+
+
+@lru_cache(maxsize=1024)
+def relative_luminance(rgb: RGB) -> float:
+    """WCAG 相对亮度"""
+    def linear(channel):
+        channel /= 255
+        return channel / 12.92 if channel <= 0.03928 else ((channel + 0.055) / 1.055) ** 2.4
+    return 0.2126 * linear(rgb[0]) + 0.7152 * linear(rgb[1]) + 0.0722 * linear(rgb[2])
+
+
+@lru_cache(maxsize=4096)
+def contrast_ratio(foreground: RGB, background: RGB) -> float:
+    """WCAG 对比度（1 ~ 21）"""
+    lighter, darker = sorted((relative_luminance(foreground), relative_luminance(background)), reverse=True)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+@lru_cache(maxsize=1024)
+def readable_color(foreground: RGB, background: RGB, minimum: float = MIN_CONTRAST) -> RGB:
+    """
+    找出在背景上满足对比度要求、且最接近原文字颜色的颜色
+
+    把原颜色向黑色或白色（对比度更高的一方）混合，二分查找满足要求的最小混合比例，尽量保留原色调
+
+    Args:
+        foreground: 原文字颜色
+        background: 背景颜色
+        minimum: 最低对比度
+
+    Returns:
+        满足要求的文字颜色（原颜色已满足时原样返回）
+    """
+    if contrast_ratio(foreground, background) >= minimum:
+        return foreground
+    target = BLACK if contrast_ratio(BLACK, background) >= contrast_ratio(WHITE, background) else WHITE
+
+    def mix(t):
+        return tuple(round(f + (c - f) * t) for f, c in zip(foreground, target))
+
+    low, high = 0.0, 1.0
+    for _ in range(12):
+        middle = (low + high) / 2
+        if contrast_ratio(mix(middle), background) >= minimum:
+            high = middle
+        else:
+            low = middle
+    return mix(high)
+
+
+def to_hex(rgb: RGB) -> str:
+    return '#{:02x}{:02x}{:02x}'.format(*(int(round(c)) for c in rgb))
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微信 HTML 规范化
+一次扫描完成原来 _remove_cover_image、_fix_wechat_editor_issues、_fix_color_contrast 中
+数十次整篇 re.sub 的工作：
+
+- 标签只切分一次，每个 style 属性解析为声明列表
+- 所有样式改写规则（!important、渐变背景、margin 压缩、text-indent、阴影移除等）都作用在声明上
+- 空白压缩只作用于文本（不再误改正文和代码中形似 CSS 的文字）
+- 扫描时记录每个元素继承到的文字色和背景色，只修复 WCAG 对比度不足的元素（见 color_contrast.py）
+- 文章中大量重复的开始标签（继承颜色相同时）直接重放第一次的处理结果，不再解析和改写
+- 最后只序列化一次
+
+用法:
+    from html_normalizer import HTMLNormalizer
+    normalizer = HTMLNormalizer()
+    html = normalizer.normalize(html)
+    print(normalizer.stats)
+"""
+
+import html as html_lib
+import re
+from typing import Dict, List, Optional, Tuple
+
+from color_contrast import (
+    BLACK, MIN_CONTRAST, RGB, WHITE, composite, contrast_ratio, find_colors, parse_color, readable_color, to_hex
+)
+
+# 标签、注释、DOCTYPE（属性值中的 > 不会截断标签），连同前面的空白一起匹配：
+# 标签之间只有空白时不必再单独处理一段文本
+TOKEN_RE = re.compile(
+    r'\s*('
+    r'<!--.*?-->'
+    r'|<![^>]*>'
+    r'|<(/?)([A-Za-z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'
+    r')',
+    re.DOTALL
+)
+ATTR_RE = re.compile(r'([^\s"\'>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+IMPORTANT_RE = re.compile(r'\s*!\s*important\s*$', re.IGNORECASE)
+SPACES_RE = re.compile(r'  +')
+MARGIN_RE = re.compile(r'margin[^:]*:\s*([^;!]+)')
+# 一条声明（引号和括号中的分号不算分隔符）
+DECLARATION_RE = re.compile(r'(?:[^;"\'(]|"[^"]*"?|\'[^\']*\'?|\([^)]*\)?)+')
+
+# 内容不是 HTML 的元素（内容整体作为文本处理）
+RAW_TEXT_TAGS = ('script', 'style')
+
+# 空元素（没有结束标签）
+VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'param', 'source', 'track', 'wbr'])
+
+# 加 !important 的属性（防止被微信编辑器重置）
+IMPORTANT_PROPERTIES = frozenset(['border-radius', 'background-color', 'vertical-align', 'text-align',
+                                  'line-height', 'font-size', 'padding'])
+
+# 移除的属性（微信编辑器不支持）
+REMOVED_PROPERTIES = frozenset(['box-shadow', 'text-shadow'])
+
+HEX_ONLY_RE = re.compile(r'[#a-fA-F0-9]+')
+MARGIN_BOTTOM_PX_RE = re.compile(r'\d+px')
+# margin: Npx 0 Npx 0 / 0 0 Npx 0 / Npx 0 → 0 0 18px 0
+MARGIN_COMPRESS_RE = re.compile(r'(?:\d+px|0)\s+0\s+\d+px\s+0|\d+px\s+0')
+# 页面默认的文字色和背景色
+DEFAULT_TEXT_COLOR: RGB = BLACK
+DEFAULT_BACKGROUND: RGB = WHITE
+
+# 背景色区块转换成的表格样式
+BG_TABLE_STYLE = ('width:100%!important;border-collapse:separate!important;border-spacing:0!important;'
+                  'border-radius:10px!important;overflow:hidden!important;margin:{margin}!important;')
+
+Declaration = List  # [属性名, 值, 是否 !important]
+
+# 标签缓存中表示"没有压入结束标签替换栈"（None 表示压入了但不替换）
+_NO_CLOSE = object()
+
+
+def parse_style(style: str) -> List[Declaration]:
+    """把 style 属性解析为声明列表（忽略引号和括号中的分号）"""
+    declarations = []
+    for chunk in _split_declarations(style):
+        name, sep, value = chunk.partition(':')
+        name = name.strip().lower()
+        if not sep or not name:
+            continue
+        important = bool(IMPORTANT_RE.search(value))
+        if important:
+            value = IMPORTANT_RE.sub('', value)
+        declarations.append([name, ' '.join(value.split()), important])
+    return declarations
+
+
+def _split_declarations(style: str) -> List[str]:
+    if '"' not in style and "'" not in style and '(' not in style:
+        return style.split(';')
+    return DECLARATION_RE.findall(style)
+
+
+def serialize_style(declarations: List[Declaration]) -> str:
+    """把声明列表序列化为紧凑的 style 属性值"""
+    return ''.join(f"{name}:{value}{'!important' if important else ''};"
+                   for name, value, important in declarations)
+
+
+def _escape_attr(value: str) -> str:
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class Tag:
+    """切分出的开始标签"""
+
+    __slots__ = ('name', 'attrs', 'self_closing')
+
+    def __init__(self, name: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool):
+        self.name = name
+        self.attrs = attrs
+        self.self_closing = self_closing
+
+    @classmethod
+    def parse(cls, name: str, raw_attrs: str) -> 'Tag':
+        raw_attrs = raw_attrs.rstrip()
+        self_closing = raw_attrs.endswith('/')
+        if self_closing:
+            raw_attrs = raw_attrs[:-1]
+        attrs = []
+        for match in ATTR_RE.finditer(raw_attrs):
+            value = match.group(2)
+            if value is None:
+                value = match.group(3) if match.group(3) is not None else match.group(4)
+            attrs.append((match.group(1), value))
+        return cls(name.lower(), attrs, self_closing)
+
+    def get(self, attr: str) -> Optional[str]:
+        for key, value in self.attrs:
+            if key.lower() == attr:
+                return value
+        return None
+
+    def set(self, attr: str, value: str) -> None:
+        for i, (key, _) in enumerate(self.attrs):
+            if key.lower() == attr:
+                self.attrs[i] = (key, value)
+                return
+        self.attrs.append((attr, value))
+
+    def attr_index(self, attr: str) -> int:
+        for i, (key, _) in enumerate(self.attrs):
+            if key.lower() == attr:
+                return i
+        return -1
+
+    def __str__(self) -> str:
+        parts = [f'<{self.name}']
+        for key, value in self.attrs:
+            if value is None:
+                parts.append(f' {key}')
+            elif '"' not in value:
+                parts.append(f' {key}="{value}"')
+            elif "'" not in value:
+                parts.append(f" {key}='{value}'")
+            else:
+                parts.append(f' {key}="{value.replace(chr(34), "&quot;")}"')
+        parts.append('/>' if self.self_closing else '>')
+        return ''.join(parts)
+
+
+class HTMLNormalizer:
+    """
+    一次扫描完成封面图移除、微信编辑器兼容修复和颜色对比度修复
+
+    Args:
+        remove_cover: 移除封面图（cover.png、alt/title 含"封面"、标题注释后的第一张图）
+        fix_editor: 微信编辑器兼容修复（背景区块转表格、空白压缩、样式加 !important 等）
+        fix_contrast: 渐变背景改为纯色，文字与（继承的）背景对比度低于 WCAG AA（4.5:1）时调整文字颜色
+    """
+
+    def __init__(self, remove_cover: bool = True, fix_editor: bool = True, fix_contrast: bool = True):
+        self.remove_cover = remove_cover
+        self.fix_editor = fix_editor
+        self.fix_contrast = fix_contrast
+        self.stats: Dict[str, int] = {}
+
+    # ==================== 扫描 ====================
+
+    def normalize(self, html: str) -> str:
+        """规范化 HTML，统计信息见 self.stats"""
+        self.stats = {'converted': 0, 'excluded': 0, 'covers_removed': 0, 'contrast_fixed': 0}
+        self._out: List[str] = []
+        self._close_stacks: Dict[str, List[Optional[str]]] = {'div': [], 'section': []}
+        self._first_div_done = False
+        self._title_comment_at: Optional[int] = None
+        self._title_img_removed = False
+        # 同一 style 在同样位置的改写结果相同（文章中大量重复），按原文缓存
+        self._style_cache: Dict[tuple, Tuple[str, bool, Tuple[RGB, RGB]]] = {}
+        # 同一开始标签在同样的继承颜色下处理结果相同，按标签原文缓存整个处理结果；
+        # 只输出标签、不涉及结束标签替换和统计的（绝大多数）单独缓存，在扫描循环中直接重放
+        self._tag_cache: Dict[tuple, tuple] = {}
+        self._plain_tags: Dict[tuple, Tuple[Tuple[str, ...], Optional[Tuple[str, RGB, RGB]]]] = {}
+        # 打开的元素及其计算后的 (文字色, 背景色)
+        self._colors: List[Tuple[str, RGB, RGB]] = []
+        self._tag_colors: Tuple[RGB, RGB] = (DEFAULT_TEXT_COLOR, DEFAULT_BACKGROUND)
+
+        pos = 0
+        length = len(html)
+        # 编辑器修复会删除标签前的空白，否则标签前的空白按文本保留
+        text_group = 0 if self.fix_editor else 1
+        out, colors, plain_tags = self._out, self._colors, self._plain_tags
+        while pos < length:
+            for match in TOKEN_RE.finditer(html, pos):
+                start = match.start(text_group)
+                if start > pos:
+                    self._text(html[pos:start], at_start=pos == 0, at_end=False)
+                pos = match.end()
+
+                token, closing, name, raw_attrs = match.groups()
+                if name is None:
+                    self._markup(token)
+                elif closing:
+                    self._end_tag(name.lower())
+                else:
+                    parent = colors[-1] if colors else None
+                    plain = plain_tags.get((token, parent[1:] if parent else None))
+                    if plain is not None and self._title_comment_at is None:
+                        out.extend(plain[0])
+                        if plain[1] is not None:
+                            colors.append(plain[1])
+                        continue
+                    name, self_closing = self._start_tag_token(token, name, raw_attrs)
+                    if name in RAW_TEXT_TAGS and not self_closing:
+                        # script/style 的内容整体作为文本，从结束标签处重新扫描
+                        end = re.compile(rf'</{name}\s*>', re.IGNORECASE).search(html, pos)
+                        raw_end = end.start() if end else length
+                        if raw_end > pos:
+                            self._text(html[pos:raw_end], at_start=False, at_end=end is None)
+                        pos = raw_end
+                        break
+            else:
+                if pos < length:
+                    self._text(html[pos:], at_start=pos == 0, at_end=True)
+                break
+
+        return ''.join(self._out)
+
+    def _text(self, text: str, at_start: bool, at_end: bool) -> None:
+        if self._title_comment_at is not None and text.strip():
+            self._title_comment_at = None
+        if self.fix_editor:
+            # 标签前后的空白全部删除，连续空格压缩为一个（str.strip 与 \s 的空白字符集相同）
+            if not at_start:
+                text = text.lstrip()
+            if not at_end:
+                text = text.rstrip()
+            if '  ' in text:
+                text = SPACES_RE.sub(' ', text)
+        if text:
+            self._out.append(text)
+
+    def _markup(self, token: str) -> None:
+        """注释和 DOCTYPE"""
+        if self.fix_editor:
+            token = SPACES_RE.sub(' ', token)
+        self._out.append(token)
+        self._title_comment_at = None
+        if (self.remove_cover and not self._title_img_removed and token.startswith('<!--')
+                and '标题' in token and '>' not in token[4:-3]):
+            self._title_comment_at = len(self._out)
+
+    def _end_tag(self, name: str) -> None:
+        self._title_comment_at = None
+        # 弹出到最近的同名元素（没有对应开始标签的结束标签忽略），通常就是栈顶
+        colors = self._colors
+        if colors and colors[-1][0] == name:
+            colors.pop()
+        else:
+            for i in range(len(colors) - 2, -1, -1):
+                if colors[i][0] == name:
+                    del colors[i:]
+                    break
+        if name in self._close_stacks:
+            stack = self._close_stacks[name]
+            replacement = stack.pop() if stack else None
+            if replacement is not None:
+                self._out.append(replacement)
+                return
+        if self.fix_editor and name == 'section':
+            name = 'div'
+        self._out.append(f'</{name}>')
+
+    def _start_tag_token(self, token: str, name: str, raw_attrs: str) -> Tuple[str, bool]:
+        """
+        处理开始标签原文：重复出现的标签直接重放上次的处理结果，不再解析和改写
+
+        Returns:
+            (小写标签名, 是否自闭合)
+        """
+        parent = self._colors[-1] if self._colors else None
+        key = (token, parent[1:] if parent else None)
+        # 标题注释后的第一张图片要删除，此时不能重放缓存
+        cached = self._tag_cache.get(key) if self._title_comment_at is None else None
+        if cached is not None:
+            name, self_closing, output, close_replacement, pushed_colors, stat_changes = cached
+            self._out.extend(output)
+            if close_replacement is not _NO_CLOSE:
+                self._close_stacks[name].append(close_replacement)
+            if pushed_colors is not None:
+                self._colors.append(pushed_colors)
+            for stat, change in stat_changes:
+                self.stats[stat] += change
+            return name, self_closing
+
+        # 结果依赖扫描状态时不缓存：标题注释后的标签、第一个 div
+        cacheable = self._title_comment_at is None and (self._first_div_done or name.lower() != 'div')
+        tag = Tag.parse(name, raw_attrs)
+        if not cacheable:
+            self._start_tag(tag)
+            return tag.name, tag.self_closing
+
+        out_start = len(self._out)
+        colors_depth = len(self._colors)
+        stats_before = dict(self.stats)
+        stack = self._close_stacks.get(tag.name)
+        stack_depth = len(stack) if stack is not None else 0
+
+        self._start_tag(tag)
+
+        close_replacement = stack[-1] if stack is not None and len(stack) > stack_depth else _NO_CLOSE
+        pushed_colors = self._colors[-1] if len(self._colors) > colors_depth else None
+        stat_changes = tuple((stat, count - stats_before[stat])
+                             for stat, count in self.stats.items() if count != stats_before[stat])
+        output = tuple(self._out[out_start:])
+        if close_replacement is _NO_CLOSE and not stat_changes and tag.name not in RAW_TEXT_TAGS:
+            self._plain_tags[key] = (output, pushed_colors)
+        else:
+            self._tag_cache[key] = (tag.name, tag.self_closing, output,
+                                    close_replacement, pushed_colors, stat_changes)
+        return tag.name, tag.self_closing
+
+    def _start_tag(self, tag: Tag) -> None:
+        title_comment_at, self._title_comment_at = self._title_comment_at, None
+
+        if tag.name == 'img' and self.remove_cover:
+            if self._is_cover_image(tag):
+                self.stats['covers_removed'] += 1
+                return
+            if title_comment_at is not None:
+                # 标题注释后紧跟的第一张图片（通常是封面图位置）
+                del self._out[title_comment_at:]
+                self._title_img_removed = True
+                self.stats['covers_removed'] += 1
+                return
+
+        name = tag.name
+        if name in self._close_stacks and not tag.self_closing:
+            replacement = self._convert_bg_block(tag) if self.fix_editor else None
+            self._close_stacks[name].append(replacement)
+            if replacement is not None:
+                self._push_colors(name, tag.self_closing)
+                return
+
+        self._out.append(str(self._rewrite_tag(tag)))
+        self._push_colors(name, tag.self_closing)
+
+    def _push_colors(self, name: str, self_closing: bool) -> None:
+        if self.fix_contrast and not self_closing and name not in VOID_TAGS:
+            self._colors.append((name,) + self._tag_colors)
+
+    # ==================== 封面图 ====================
+
+    @staticmethod
+    def _is_cover_image(tag: Tag) -> bool:
+        src = tag.get('src')
+        if src is not None and re.fullmatch(r'cover\.(png|jpg|jpeg|gif)', src, re.IGNORECASE):
+            return True
+        return any('封面' in (tag.get(attr) or '') for attr in ('alt', 'title'))
+
+    # ==================== 背景色区块 → 表格 ====================
+
+    def _convert_bg_block(self, tag: Tag) -> Optional[str]:
+        """
+        带背景色的 div/section 转换为表格（微信编辑器会保留 table 的背景色）
+
+        Returns:
+            需要转换时返回替换结束标签的字符串，否则返回 None
+        """
+        # 只处理 style 为第一个属性的块（模板中的卡片写法）
+        if not tag.attrs or tag.attrs[0][0].lower() != 'style' or tag.attrs[0][1] is None:
+            return None
+        style = tag.attrs[0][1]
+        if 'background' not in style.lower():
+            return None
+
+        # 排除最外层容器（白色背景且包含 font-family）
+        if 'font-family' in style and 'ffffff' in style.lower():
+            self.stats['excluded'] += 1
+            return None
+
+        # 排除纯白色背景且没有边框的元素（可能是容器）
+        style_no_space = style.replace(' ', '')
+        if ('background:#ffffff' in style_no_space or 'background-color:#ffffff' in style_no_space) \
+                and 'border' not in style:
+            self.stats['excluded'] += 1
+            return None
+
+        margin_match = MARGIN_RE.search(style)
+        margin = margin_match.group(1).strip() if margin_match else '0'
+
+        table = Tag('table', [('style', BG_TABLE_STYLE.format(margin=margin))], False)
+        # 给所有CSS属性添加 !important（关键：确保微信编辑器不会覆盖样式）
+        td_declarations = parse_style(html_lib.unescape(style))
+        for declaration in td_declarations:
+            declaration[2] = True
+        td = Tag('td', [('style', _escape_attr(serialize_style(td_declarations)))], False)
+
+        self._out.append(f"{self._rewrite_tag(table)}<tr>{self._rewrite_tag(td)}")
+        self.stats['converted'] += 1
+        return '</td></tr></table>'
+
+    # ==================== 样式改写 ====================
+
+    def _rewrite_tag(self, tag: Tag) -> Tag:
+        if self.fix_editor and tag.name == 'section':
+            tag.name = 'div'
+        if self.fix_editor:
+            # src 保持原样（本地图片路径在规范化之后才上传替换）
+            tag.attrs = [(key, SPACES_RE.sub(' ', value) if value is not None and key.lower() != 'src' else value)
+                         for key, value in tag.attrs]
+
+        style_index = tag.attr_index('style')
+        style = tag.attrs[style_index][1] if style_index >= 0 else None
+        parent_colors = self._parent_colors()
+        self._tag_colors = parent_colors
+
+        if style is None:
+            if self.fix_editor and tag.name == 'img':
+                tag.set('style', 'border-radius:8px!important;')
+            return tag
+
+        key = (tag.name, style_index, len(tag.attrs), style, parent_colors)
+        cached = self._style_cache.get(key)
+        if cached is None:
+            # 第一个 div 的改写只发生一次，不缓存
+            cacheable = self._first_div_done or tag.name != 'div'
+            declarations = parse_style(html_lib.unescape(style))
+            check_contrast = self.fix_contrast and tag.name not in VOID_TAGS
+            if check_contrast:
+                self._flatten_gradients(declarations, parent_colors)
+            if self.fix_editor:
+                self._fix_editor_declarations(tag, declarations, style_index)
+            if check_contrast:
+                colors, contrast_fixed = self._fix_contrast_declarations(declarations, parent_colors)
+            else:
+                colors, contrast_fixed = parent_colors, False
+            cached = (_escape_attr(serialize_style(declarations)), contrast_fixed, colors)
+            if cacheable:
+                self._style_cache[key] = cached
+        if cached[1]:
+            self.stats['contrast_fixed'] += 1
+        self._tag_colors = cached[2]
+        tag.attrs[style_index] = (tag.attrs[style_index][0], cached[0])
+        return tag
+
+    def _fix_editor_declarations(self, tag: Tag, declarations: List[Declaration], style_index: int) -> None:
+        """微信编辑器兼容：逐条改写声明"""
+        rewritten = []
+        for declaration in declarations:
+            name, value, important = declaration
+            if name.endswith(tuple(REMOVED_PROPERTIES)):
+                # 阴影（微信编辑器不支持）
+                continue
+            if name == 'background' and value.startswith('linear-gradient'):
+                # 渐变背景（微信不支持 linear-gradient）
+                continue
+            if name == 'border-top' and not important and value == '1px dashed #ccc':
+                # 相关资源部分的虚线边框
+                continue
+
+            if not important:
+                if name == 'background' and HEX_ONLY_RE.fullmatch(value):
+                    # 统一 background 为 background-color
+                    declaration[0] = 'background-color'
+                    declaration[2] = True
+                elif name == 'margin-bottom' and MARGIN_BOTTOM_PX_RE.fullmatch(value):
+                    declaration[1:] = ['18px', True]
+                elif name == 'margin' and MARGIN_COMPRESS_RE.fullmatch(value):
+                    declaration[1:] = ['0 0 18px 0', True]
+                elif name == 'text-indent':
+                    # 彻底禁用缩进
+                    declaration[1:] = ['0', True]
+                elif name == 'display' and value == 'inline-block':
+                    declaration[2] = True
+                elif name == 'border-collapse' and value == 'collapse':
+                    # 允许圆角
+                    declaration[1] = 'separate'
+                    rewritten.append(declaration)
+                    rewritten.append(['border-spacing', '0', False])
+                    rewritten.append(['overflow', 'hidden', True])
+                    continue
+                elif name in IMPORTANT_PROPERTIES or name.endswith('border-radius'):
+                    declaration[2] = True
+            rewritten.append(declaration)
+
+        # 最外层容器强制禁用缩进并设置字体大小（第一个 div）
+        if not self._first_div_done and tag.name == 'div' and style_index == len(tag.attrs) - 1:
+            self._first_div_done = True
+            rewritten.append(['text-indent', '0', True])
+            rewritten.append(['font-size', '15px', True])
+
+        if not any(declaration[0] == 'text-indent' for declaration in rewritten):
+            rewritten.append(['text-indent', '0', True])
+
+        # 圆角：表格、单元格和图片
+        if tag.name == 'table' and style_index == 0:
+            rewritten.insert(0, ['border-radius', '10px', True])
+        elif tag.name == 'td' and len(tag.attrs) == 1:
+            rewritten.append(['border-radius', '10px', True])
+        elif tag.name == 'img':
+            rewritten.append(['border-radius', '8px', True])
+
+        declarations[:] = rewritten
+
+    # ==================== 对比度 ====================
+
+    def _parent_colors(self) -> Tuple[RGB, RGB]:
+        if self._colors:
+            return self._colors[-1][1], self._colors[-1][2]
+        return DEFAULT_TEXT_COLOR, DEFAULT_BACKGROUND
+
+    @staticmethod
+    def _flatten_gradients(declarations: List[Declaration], parent_colors: Tuple[RGB, RGB]) -> None:
+        """渐变背景（微信不支持，会显示为白色）改为渐变中与文字对比度最高的颜色"""
+        text_color = parent_colors[0]
+        for name, value, _ in declarations:
+            if name == 'color':
+                color = parse_color(value)
+                if color is not None:
+                    text_color = composite(color, parent_colors[1])
+
+        for declaration in declarations:
+            name, value, important = declaration
+            if name not in ('background', 'background-image') or 'gradient(' not in value:
+                continue
+            stops = [composite(color, parent_colors[1]) for color in find_colors(value)]
+            if stops:
+                best = max(stops, key=lambda stop: contrast_ratio(text_color, stop))
+                declaration[:] = ['background-color', to_hex(best), important]
+
+    @staticmethod
+    def _fix_contrast_declarations(declarations: List[Declaration],
+                                   parent_colors: Tuple[RGB, RGB]) -> Tuple[Tuple[RGB, RGB], bool]:
+        """
+        计算元素的文字色和背景色，对比度不足时调整文字颜色
+
+        Returns:
+            ((文字色, 背景色), 是否修改)
+        """
+        parent_text, parent_background = parent_colors
+        background = parent_background
+        color_declaration = None
+        for declaration in declarations:
+            name, value = declaration[0], declaration[1]
+            if name == 'background-color':
+                color = parse_color(value)
+            elif name == 'background':
+                color = next(find_colors(value), None)
+            else:
+                if name == 'color':
+                    color_declaration = declaration
+                continue
+            if color is not None:
+                background = composite(color, parent_background)
+
+        if color_declaration is None:
+            text = parent_text
+        else:
+            color = parse_color(color_declaration[1])
+            if color is None:
+                # var()、inherit 等无法计算的颜色不处理
+                return (parent_text, background), False
+            text = composite(color, background)
+
+        if (color_declaration is None and background == parent_background) \
+                or contrast_ratio(text, background) >= MIN_CONTRAST:
+            return (text, background), False
+
+        fixed = readable_color(text, background)
+        if color_declaration is None:
+            declarations.append(['color', to_hex(fixed), True])
+        else:
+            color_declaration[1:] = [to_hex(fixed), True]
+        return (fixed, background), True
+
+
+def normalize_html(html: str, **options) -> str:
+    """规范化 HTML（参数见 HTMLNormalizer）"""
+    return HTMLNormalizer(**options).normalize(html)
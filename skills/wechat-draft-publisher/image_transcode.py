@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片转码
+在内存中把图片转为适合上传微信的 JPEG：限制最大边长、去除元数据、二分查找 JPEG 质量使文件不超过字节上限
+
+不产生临时文件；批量转码可使用进程池
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+# 默认转码设置（微信要求图片为 JPG 且 ≤1MB）
+DEFAULT_PROFILE = {
+    'max_bytes': 1024 * 1024,
+    'max_dimension': 1920,
+    'max_quality': 90,
+    'min_quality': 40,
+}
+
+# 最低质量仍超出上限时，每轮缩小的比例
+SHRINK_FACTOR = 0.75
+
+
+class TranscodeResult(NamedTuple):
+    """转码结果"""
+    data: bytes            # JPEG 内容
+    width: int
+    height: int
+    quality: Optional[int]  # 使用的 JPEG 质量（原图直接使用时为 None）
+    original_size: int
+    format: str = 'JPEG'   # 输出格式（原图直接使用时可能是 keep_formats 中的其他格式）
+
+
+def _load_pil():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImportError("需要安装 Pillow 库: pip install Pillow")
+    return Image, ImageOps
+
+
+def _encode(img, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    # 不传 exif / icc_profile，输出不含元数据
+    img.save(buffer, 'JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _fit_quality(img, max_bytes: int, min_quality: int, max_quality: int):
+    """二分查找不超过 max_bytes 的最高质量，找不到时返回 (None, None)"""
+    data = _encode(img, max_quality)
+    if len(data) <= max_bytes:
+        return data, max_quality
+
+    best = (None, None)
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(img, quality)
+        if len(data) <= max_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+def transcode_image(source_bytes: bytes, max_bytes: int = DEFAULT_PROFILE['max_bytes'],
+                    max_dimension: int = DEFAULT_PROFILE['max_dimension'],
+                    max_quality: int = DEFAULT_PROFILE['max_quality'],
+                    min_quality: int = DEFAULT_PROFILE['min_quality'],
+                    keep_formats: Sequence[str] = ('JPEG',)) -> TranscodeResult:
+    """
+    把图片转码为不超过字节上限的 JPEG
+
+    已经符合要求（格式在 keep_formats 中、不超过上限和最大边长、不含 EXIF）的图片原样返回
+
+    Args:
+        source_bytes: 原始图片内容
+        max_bytes: 输出字节上限
+        max_dimension: 最大边长（像素），超出时等比缩小
+        max_quality: JPEG 质量上限
+        min_quality: JPEG 质量下限（低于下限仍超出上限时缩小尺寸）
+        keep_formats: 可以原样使用的格式（如截图保留 PNG，文字更清晰）
+
+    Returns:
+        TranscodeResult
+    """
+    Image, ImageOps = _load_pil()
+
+    img = Image.open(io.BytesIO(source_bytes))
+    if (img.format in keep_formats and len(source_bytes) <= max_bytes
+            and max(img.size) <= max_dimension and 'exif' not in img.info):
+        return TranscodeResult(source_bytes, img.width, img.height, None, len(source_bytes), img.format)
+
+    # 按 EXIF 方向旋转（元数据去除后方向信息会丢失）
+    img = ImageOps.exif_transpose(img)
+
+    # 转换为RGB（PNG可能有alpha通道，用白色背景填充）
+    if img.mode in ('RGBA', 'LA', 'P'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if max(img.size) > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    while True:
+        data, quality = _fit_quality(img, max_bytes, min_quality, max_quality)
+        if data is not None:
+            return TranscodeResult(data, img.width, img.height, quality, len(source_bytes))
+        if min(img.size) <= 16:
+            raise ValueError(f"图片无法压缩到 {max_bytes} 字节以内")
+        img = img.resize((max(1, int(img.width * SHRINK_FACTOR)), max(1, int(img.height * SHRINK_FACTOR))),
+                         Image.LANCZOS)
+
+
+def transcode_file(image_path: str, **profile) -> TranscodeResult:
+    """读取图片文件并转码（参数同 transcode_image）"""
+    with open(image_path, 'rb') as f:
+        return transcode_image(f.read(), **profile)
+
+
+def transcode_files(image_paths: List[str], processes: Optional[int] = None, **profile) -> List[TranscodeResult]:
+    """
+    用进程池批量转码
+
+    Args:
+        image_paths: 图片文件路径列表
+        processes: 进程数（默认 CPU 核数，且不超过图片数）
+        **profile: 转码设置（同 transcode_image）
+
+    Returns:
+        与 image_paths 对应的 TranscodeResult 列表（转码失败的位置为异常对象）
+    """
+    if not image_paths:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(image_paths))
+    if processes <= 1:
+        return [_transcode_or_error(path, profile) for path in image_paths]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_transcode_or_error, image_paths, [profile] * len(image_paths)))
+
+
+def _transcode_or_error(image_path, profile):
+    try:
+        return transcode_file(image_path, **profile)
+    except Exception as e:
+        return e
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微信素材缓存
+按「图片内容哈希 + 转换设置 + 归属（AppID@接口地址）」记录已上传图片的 media_id 和 URL，避免重复上传同一张图片
+（素材属于某个公众号：换 AppID 或指向本地接口替身时不会用到其他账号的素材）
+（正文图片通过 media/uploadimg 上传，只有 URL，media_id 为空）
+
+缓存文件：~/.wechat-publisher/media_cache.json
+    {
+      "version": 1,
+      "entries": {
+        "<key>": {"media_id": "...", "url": "...", "uploaded_at": 1700000000.0,
+                  "last_used": 1700000000.0, "source": "cover.png", "scope": "<appid>@<接口地址>"}
+      }
+    }
+
+多个进程共用一个缓存文件：写入时持文件锁读取磁盘上的最新内容，只应用本进程的修改，再原子替换
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from token_manager import FileLock
+
+CACHE_VERSION = 1
+
+# 缓存条目上限（超出后淘汰最久未使用的条目）
+MAX_ENTRIES = 1000
+
+
+def cache_key(source_bytes: bytes, settings: Dict[str, Any], scope: str = "") -> str:
+    """
+    计算缓存键：原图内容的 SHA-256 + 转换设置（设置变化时重新上传）+ 归属
+
+    Args:
+        source_bytes: 原始图片内容
+        settings: 转换与上传设置（如目标格式、质量、接口）
+        scope: 素材归属（如 appid@接口地址）
+
+    Returns:
+        缓存键（十六进制字符串）
+    """
+    key_data = {
+        'source': hashlib.sha256(source_bytes).hexdigest(),
+        'settings': settings,
+        'scope': scope,
+    }
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class MediaCache:
+    """已上传图片的持久化缓存（线程安全、多进程安全）"""
+
+    def __init__(self, cache_file: str, max_entries: int = MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.lock_file = cache_file + '.lock'
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._read_disk()
+        # 本进程尚未写回的修改：新增的条目、删除的键、使用时间
+        self._added: Dict[str, Dict[str, Any]] = {}
+        self._removed = set()
+        self._used: Dict[str, float] = {}
+
+    def _read_disk(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠ 读取素材缓存失败，将重新建立: {e}")
+            return {}
+        if data.get('version') != CACHE_VERSION:
+            return {}
+        return data.get('entries', {})
+
+    def _save(self, update: Optional[Callable[[Dict[str, Dict[str, Any]]], Set[str]]] = None) -> Set[str]:
+        """
+        加文件锁读取磁盘上的最新内容，只应用本进程的修改后原子写入（调用方需持有线程锁）
+
+        其他进程删除的条目不会因为本进程启动时读到过而被写回
+
+        Args:
+            update: 在合并后的条目上执行的删除操作（如对账、淘汰），返回删除的键
+
+        Returns:
+            update 删除的键
+        """
+        with FileLock(self.lock_file):
+            entries = self._read_disk()
+            for key in self._removed:
+                entries.pop(key, None)
+            entries.update(self._added)
+            for key, last_used in self._used.items():
+                if key in entries and entries[key].get('last_used', 0) < last_used:
+                    entries[key]['last_used'] = last_used
+
+            removed = update(entries) if update is not None else set()
+            for key in removed:
+                entries.pop(key, None)
+
+            # 超出上限时淘汰最久未使用的条目
+            if len(entries) > self.max_entries:
+                by_last_used = sorted(entries, key=lambda k: entries[k].get('last_used', 0))
+                for key in by_last_used[:len(entries) - self.max_entries]:
+                    del entries[key]
+
+            try:
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                tmp_path = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': CACHE_VERSION, 'entries': entries}, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_file)
+            except OSError as e:
+                # 缓存不可写时不影响上传
+                print(f"⚠ 写入素材缓存失败: {e}")
+
+        self._entries = entries
+        self._added = {}
+        self._removed = set()
+        self._used = {}
+        return removed
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存条目，命中时返回条目副本"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry['last_used'] = self._used[key] = time.time()
+            return dict(entry)
+
+    def put(self, key: str, media_id: str, url: str = "", source: str = "", scope: str = "") -> None:
+        """记录一次上传结果（scope 为素材归属，见 cache_key）"""
+        now = time.time()
+        with self._lock:
+            self._entries[key] = self._added[key] = {
+                'media_id': media_id,
+                'url': url,
+                'uploaded_at': now,
+                'last_used': now,
+                'source': source,
+                'scope': scope,
+            }
+            self._removed.discard(key)
+            self._save()
+
+    def remove(self, key: str) -> None:
+        """删除一个缓存条目（如素材已失效）"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._added.pop(key, None)
+                self._removed.add(key)
+                self._save()
+
+    def evict(self, older_than_days: Optional[float] = None, max_entries: Optional[int] = None) -> int:
+        """
+        淘汰缓存条目
+
+        Args:
+            older_than_days: 删除上传时间早于该天数的条目
+            max_entries: 只保留最近使用的若干条
+
+        Returns:
+            删除的条目数
+        """
+        def doomed_entries(entries):
+            doomed = set()
+            if older_than_days is not None:
+                cutoff = time.time() - older_than_days * 86400
+                doomed.update(k for k, e in entries.items() if e.get('uploaded_at', 0) < cutoff)
+
+            if max_entries is not None:
+                kept = [k for k in entries if k not in doomed]
+                kept.sort(key=lambda k: entries[k].get('last_used', 0), reverse=True)
+                doomed.update(kept[max_entries:])
+            return doomed
+
+        with self._lock:
+            return len(self._save(doomed_entries))
+
+    def reconcile(self, existing_media_ids: Iterable[str], scope: Optional[str] = None) -> int:
+        """
+        与公众号素材列表对账：删除 media_id 已不存在的条目
+
+        Args:
+            existing_media_ids: 素材库中现有的全部 media_id
+            scope: 只对账该归属的条目（其他公众号的素材不在这个列表中）
+
+        Returns:
+            删除的条目数
+        """
+        existing = set(existing_media_ids)
+
+        def stale_entries(entries):
+            # 只对账永久素材（有 media_id 的条目）
+            return {k for k, e in entries.items()
+                    if e.get('media_id') and e['media_id'] not in existing
+                    and (scope is None or e.get('scope', '') == scope)}
+
+        with self._lock:
+            return len(self._save(stale_entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
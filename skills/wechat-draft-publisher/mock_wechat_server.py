@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地微信公众号接口替身
+在本机模拟 publisher.py 用到的 cgi-bin 接口，用于端到端测试和性能基准（不需要公众号、IP 白名单和每日调用额度）
+
+模拟的接口：
+    GET  /cgi-bin/token                         获取 access_token
+    POST /cgi-bin/material/add_material         上传永久图片素材（≤10MB）
+    POST /cgi-bin/media/uploadimg               上传图文消息内的图片（≤1MB）
+    POST /cgi-bin/draft/add                     创建草稿（校验 thumb_media_id）
+    POST /cgi-bin/material/get_material         获取素材
+    POST /cgi-bin/material/del_material         删除素材
+    POST /cgi-bin/material/batchget_material    素材列表
+
+支持：
+    - 可配置的响应延迟（全局或按接口）
+    - 错误注入：40001/42001（token 失效，注入后现有 token 全部作废）、45009（超出额度）、-1（系统繁忙）
+    - 按接口的每日调用额度（超出返回 45009）
+    - 请求日志（内存中的记录，可同时写入 JSONL 文件）
+
+用法:
+    python mock_wechat_server.py --port 8900 --latency 0.05 --error draft/add:42001:1
+    WECHAT_API_BASE_URL=http://127.0.0.1:8900/cgi-bin python publisher.py --title ... --content ...
+
+    # 代码中使用
+    with MockWeChatServer(latency=0.02) as server:
+        server.inject_error('material/add_material', -1, times=2)
+        publisher.BASE_URL = server.base_url
+        ...
+        print(server.stats())
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+ERROR_MESSAGES = {
+    -1: "system error",
+    40001: "invalid credential, access_token is invalid or not latest",
+    40007: "invalid media_id",
+    40009: "invalid image size",
+    41001: "access_token missing",
+    42001: "access_token expired",
+    45009: "reach max api daily quota limit",
+    47003: "argument invalid!",
+}
+
+# 上传大小限制（字节）
+MATERIAL_MAX_BYTES = 10 * 1024 * 1024
+UPLOADIMG_MAX_BYTES = 1024 * 1024
+
+# 每个草稿最多的文章数
+DRAFT_MAX_ARTICLES = 8
+
+
+class ErrorRule:
+    """错误注入规则：前 times 次调用返回错误，或按 rate 概率返回错误"""
+
+    def __init__(self, endpoint: str, errcode: int, times: Optional[int] = None, rate: Optional[float] = None):
+        self.endpoint = endpoint
+        self.errcode = errcode
+        self.times = times
+        self.rate = rate
+
+    def fire(self, rng: random.Random) -> bool:
+        if self.times is not None:
+            if self.times <= 0:
+                return False
+            self.times -= 1
+            return True
+        return self.rate is not None and rng.random() < self.rate
+
+
+class MockWeChatServer:
+    """
+    微信接口替身服务器（在后台线程中运行）
+
+    Args:
+        host: 监听地址
+        port: 监听端口（0 表示自动分配）
+        latency: 响应延迟（秒），可以是数值或 {接口: 秒数}（未列出的接口用 'default'）
+        jitter: 延迟的随机抖动比例（0.2 表示 ±20%）
+        expires_in: access_token 有效期（秒）
+        daily_quota: 按接口的调用额度 {接口: 次数}，超出返回 45009
+        log_file: 请求日志 JSONL 文件路径
+        seed: 随机数种子（错误注入概率和延迟抖动可复现）
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Union[float, Dict[str, float]] = 0.0, jitter: float = 0.0,
+                 expires_in: int = 7200, daily_quota: Optional[Dict[str, int]] = None,
+                 log_file: Optional[str] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.expires_in = expires_in
+        self.daily_quota = dict(daily_quota or {})
+        self.log_file = log_file
+        self.requests: List[Dict[str, Any]] = []
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._rules: List[ErrorRule] = []
+        self._tokens: Dict[str, float] = {}    # token → 过期时间
+        self._calls: Dict[str, int] = {}       # 接口 → 调用次数（额度计数）
+        self.materials: Dict[str, Dict[str, Any]] = {}
+        self.drafts: Dict[str, List[Dict[str, Any]]] = {}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== 生命周期 ====================
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/cgi-bin"
+
+    def start(self) -> 'MockWeChatServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'MockWeChatServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ==================== 控制 ====================
+
+    def inject_error(self, endpoint: str, errcode: int, times: Optional[int] = 1, rate: Optional[float] = None) -> None:
+        """
+        注入错误
+
+        Args:
+            endpoint: 接口（如 'draft/add'、'material/add_material'，'*' 表示全部接口）
+            errcode: 错误码（40001/42001 会同时作废现有 token）
+            times: 接下来的前几次调用返回错误（与 rate 二选一）
+            rate: 每次调用返回错误的概率
+        """
+        if rate is not None:
+            times = None
+        with self._lock:
+            self._rules.append(ErrorRule(endpoint, errcode, times=times, rate=rate))
+
+    def clear_errors(self) -> None:
+        with self._lock:
+            self._rules.clear()
+
+    def expire_tokens(self) -> None:
+        """作废所有已发放的 access_token"""
+        with self._lock:
+            self._tokens.clear()
+
+    def reset_quota(self) -> None:
+        """清零调用计数（模拟新的一天）"""
+        with self._lock:
+            self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        按接口汇总请求日志
+
+        Returns:
+            {'requests': 总数, 'bytes_in': 上传字节数, 'endpoints': {接口: {'calls', 'errors': {错误码: 次数}, 'bytes_in'}}}
+        """
+        with self._lock:
+            records = list(self.requests)
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            entry = endpoints.setdefault(record['endpoint'], {'calls': 0, 'errors': {}, 'bytes_in': 0})
+            entry['calls'] += 1
+            entry['bytes_in'] += record['bytes_in']
+            if record['errcode']:
+                entry['errors'][record['errcode']] = entry['errors'].get(record['errcode'], 0) + 1
+        return {
+            'requests': len(records),
+            'bytes_in': sum(record['bytes_in'] for record in records),
+            'endpoints': endpoints,
+        }
+
+    # ==================== 请求处理 ====================
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self, 'GET')
+
+            def do_POST(self):
+                server._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        started = time.time()
+        parsed = urlparse(handler.path)
+        endpoint = parsed.path.split('/cgi-bin/', 1)[-1].strip('/')
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        delay = self._delay(endpoint)
+        if delay:
+            time.sleep(delay)
+
+        status, payload, content_type = self._dispatch(method, endpoint, query, body, handler.headers)
+        if isinstance(payload, (dict, list)):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        else:
+            data = payload
+
+        # 先记录再响应：客户端收到响应后立即调用 stats() 也能统计到这次请求
+        errcode = payload.get('errcode', 0) if isinstance(payload, dict) else 0
+        self._log({
+            'time': started,
+            'method': method,
+            'endpoint': endpoint,
+            'errcode': errcode,
+            'bytes_in': len(body),
+            'bytes_out': len(data),
+            'duration': round(time.time() - started, 4),
+        })
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _delay(self, endpoint: str) -> float:
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(endpoint, self.latency.get('default', 0.0))
+        else:
+            delay = self.latency
+        if delay and self.jitter:
+            with self._lock:
+                delay *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append(record)
+            if self.log_file:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+
+    @staticmethod
+    def _error(errcode: int):
+        return 200, {'errcode': errcode, 'errmsg': ERROR_MESSAGES.get(errcode, 'error')}, ''
+
+    def _dispatch(self, method, endpoint, query, body, headers):
+        handlers = {
+            ('GET', 'token'): self._token,
+            ('POST', 'material/add_material'): self._add_material,
+            ('POST', 'media/uploadimg'): self._uploadimg,
+            ('POST', 'draft/add'): self._draft_add,
+            ('POST', 'material/get_material'): self._get_material,
+            ('POST', 'material/del_material'): self._del_material,
+            ('POST', 'material/batchget_material'): self._batchget_material,
+        }
+        func = handlers.get((method, endpoint))
+        if func is None:
+            return 404, {'errcode': 404, 'errmsg': f'unknown api {method} {endpoint}'}, ''
+
+        with self._lock:
+            # 额度
+            limit = self.daily_quota.get(endpoint)
+            self._calls[endpoint] = self._calls.get(endpoint, 0) + 1
+            if limit is not None and self._calls[endpoint] > limit:
+                return self._error(45009)
+
+            # 注入的错误
+            for rule in self._rules:
+                if rule.endpoint in (endpoint, '*') and rule.fire(self._rng):
+                    if rule.errcode in (40001, 42001):
+                        self._tokens.clear()
+                    return self._error(rule.errcode)
+
+            # access_token 校验
+            if endpoint != 'token':
+                token = query.get('access_token')
+                if not token:
+                    return self._error(41001)
+                expires_at = self._tokens.get(token)
+                if expires_at is None:
+                    return self._error(40001)
+                if time.time() >= expires_at:
+                    del self._tokens[token]
+                    return self._error(42001)
+
+        return func(query, body, headers)
+
+    def _token(self, query, body, headers):
+        if query.get('grant_type') != 'client_credential' or not query.get('appid') or not query.get('secret'):
+            return self._error(47003)
+        token = f"mock-{uuid.uuid4().hex}"
+        with self._lock:
+            self._tokens[token] = time.time() + self.expires_in
+        return 200, {'access_token': token, 'expires_in': self.expires_in}, ''
+
+    def _add_material(self, query, body, headers):
+        if query.get('type') != 'image' or b'name="media"' not in body:
+            return self._error(47003)
+        if len(body) > MATERIAL_MAX_BYTES:
+            return self._error(40009)
+        media_id = f"mock_media_{uuid.uuid4().hex[:16]}"
+        url = f"http://mmbiz.qpic.cn/mock/{media_id}/0?wx_fmt=jpeg"
+        with self._lock:
+            self.materials[media_id] = {'url': url, 'bytes': len(body), 'created_at': time.time()}
+        return 200, {'media_id': media_id, 'url': url}, ''
+
+    def _uploadimg(self, query, body, headers):
+        if b'name="media"' not in body:
+            return self._error(47003)
+        if len(body) > UPLOADIMG_MAX_BYTES:
+            return self._error(40009)
+        return 200, {'url': f"http://mmbiz.qpic.cn/mock/img_{uuid.uuid4().hex[:16]}/0?wx_fmt=jpeg"}, ''
+
+    def _draft_add(self, query, body, headers):
+        try:
+            articles = json.loads(body.decode('utf-8'))['articles']
+        except (ValueError, KeyError, UnicodeDecodeError):
+            return self._error(47003)
+        if not articles or len(articles) > DRAFT_MAX_ARTICLES:
+            return self._error(47003)
+        with self._lock:
+            for article in articles:
+                if not article.get('title') or not article.get('content'):
+                    return self._error(47003)
+                thumb = article.get('thumb_media_id')
+                if thumb and thumb not in self.materials:
+                    return self._error(40007)
+            media_id = f"mock_draft_{uuid.uuid4().hex[:16]}"
+            self.drafts[media_id] = articles
+        return 200, {'media_id': media_id}, ''
+
+    def _get_material(self, query, body, headers):
+        media_id = self._media_id(body)
+        with self._lock:
+            if media_id not in self.materials:
+                return self._error(40007)
+        return 200, b'\xff\xd8\xff\xd9', 'image/jpeg'
+
+    def _del_material(self, query, body, headers):
+        media_id = self._media_id(body)
+        with self._lock:
+            if self.materials.pop(media_id, None) is None:
+                return self._error(40007)
+        return 200, {'errcode': 0, 'errmsg': 'ok'}, ''
+
+    def _batchget_material(self, query, body, headers):
+        try:
+            request = json.loads(body.decode('utf-8'))
+            offset, count = int(request.get('offset', 0)), min(int(request.get('count', 20)), 20)
+        except (ValueError, UnicodeDecodeError):
+            return self._error(47003)
+        with self._lock:
+            media_ids = sorted(self.materials, key=lambda m: self.materials[m]['created_at'])
+            items = [{'media_id': m, 'url': self.materials[m]['url']} for m in media_ids[offset:offset + count]]
+            total = len(media_ids)
+        return 200, {'total_count': total, 'item_count': len(items), 'item': items}, ''
+
+    @staticmethod
+    def _media_id(body: bytes) -> str:
+        try:
+            return json.loads(body.decode('utf-8')).get('media_id', '')
+        except (ValueError, UnicodeDecodeError):
+            return ''
+
+
+def parse_error_spec(spec: str) -> ErrorRule:
+    """解析 接口:错误码[:次数|:概率%]，如 draft/add:42001:1、material/add_material:-1:10%"""
+    parts = spec.rsplit(':', 2)
+    endpoint, errcode, amount = parts if len(parts) == 3 else (parts[0], parts[1], '1')
+    if amount.endswith('%'):
+        return ErrorRule(endpoint, int(errcode), rate=float(amount[:-1]) / 100)
+    return ErrorRule(endpoint, int(errcode), times=int(amount))
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='本地微信公众号接口替身（用于测试和性能基准）',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  %(prog)s --port 8900
+  %(prog)s --port 8900 --latency 0.05 --error draft/add:42001:1 --error material/add_material:-1:10%%
+  %(prog)s --port 8900 --quota draft/add=100 --log requests.jsonl
+        """
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8900, help='监听端口（默认: 8900）')
+    parser.add_argument('--latency', type=float, default=0.0, help='响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟抖动比例（如 0.2）')
+    parser.add_argument('--expires-in', type=int, default=7200, help='access_token 有效期（秒，默认: 7200）')
+    parser.add_argument('--error', action='append', default=[], metavar='ENDPOINT:ERRCODE[:N|:P%]',
+                        help='错误注入（可重复），如 draft/add:42001:1')
+    parser.add_argument('--quota', action='append', default=[], metavar='ENDPOINT=N', help='每日调用额度（可重复）')
+    parser.add_argument('--log', help='请求日志文件（JSONL）')
+    args = parser.parse_args()
+
+    quota = {}
+    for item in args.quota:
+        endpoint, _, limit = item.partition('=')
+        quota[endpoint] = int(limit)
+
+    server = MockWeChatServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                              expires_in=args.expires_in, daily_quota=quota, log_file=args.log)
+    for spec in args.error:
+        rule = parse_error_spec(spec)
+        server.inject_error(rule.endpoint, rule.errcode, times=rule.times, rate=rule.rate)
+
+    print(f"✓ 微信接口替身已启动: {server.base_url}")
+    print(f"  使用方法: WECHAT_API_BASE_URL={server.base_url} python publisher.py ...")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+        stats = server.stats()
+        print(f"📊 共 {stats['requests']} 个请求，上传 {stats['bytes_in'] / 1024:.1f}KB")
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
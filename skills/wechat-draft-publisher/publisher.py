@@ -6,27 +6,91 @@
 """
 
 import os
+import re
 import sys
 import json
+import hashlib
 import time
 import requests
 import argparse
+import threading
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from media_cache import MediaCache, cache_key
+from image_transcode import transcode_files, transcode_image
+from html_normalizer import HTMLNormalizer
+from token_manager import TokenManager
+from api_budget import ApiBudget, QuotaExceededError
+
+
+class DraftBatchError(Exception):
+    """多图文草稿中有文章准备失败"""
+
+    def __init__(self, failures: Dict[int, str], articles: List[Dict[str, Any]]):
+        self.failures = failures
+        details = '; '.join(f"第 {index + 1} 篇《{articles[index].get('title', '')}》: {message}"
+                            for index, message in sorted(failures.items()))
+        super().__init__(f"{len(failures)}/{len(articles)} 篇文章准备失败，未创建草稿（{details}）")
 
 
 class WeChatPublisher:
     """微信公众号草稿发布器"""
 
-    BASE_URL = "https://api.weixin.qq.com/cgi-bin"
+    # 接口地址（可用环境变量 WECHAT_API_BASE_URL 或配置文件 base_url 覆盖，如指向本地接口替身 mock_wechat_server.py）
+    BASE_URL = os.environ.get('WECHAT_API_BASE_URL', "https://api.weixin.qq.com/cgi-bin").rstrip('/')
     TOKEN_CACHE_FILE = os.path.expanduser("~/.wechat-publisher/token_cache.json")
     CONFIG_FILE = os.path.expanduser("~/.wechat-publisher/config.json")
+    MEDIA_CACHE_FILE = os.path.expanduser("~/.wechat-publisher/media_cache.json")
+    API_LEDGER_FILE = os.path.expanduser("~/.wechat-publisher/api_ledger.json")
     COVERS_DIR = "/home/ubuntu/.claude/skills/ai-content-publisher/assets/covers"
 
+    # HTML 中的 <img src="..."> 标签
+    IMG_SRC_PATTERN = re.compile(r'<img([^>]*?)src=["\']([^"\']+)["\']([^>]*?)>')
+
+    # 内容图片并发上传的线程数
+    CONTENT_IMAGE_WORKERS = 4
+
+    # 多图文草稿：并发准备的文章数、每个草稿最多的文章数
+    ARTICLE_WORKERS = 3
+    DRAFT_MAX_ARTICLES = 8
+
+    # 图片转码设置（见 image_transcode.transcode_image）
+    # 封面：永久素材，转为JPG且≤1MB
+    IMAGE_TRANSCODE_PROFILE = {
+        'max_bytes': 1024 * 1024,   # 字节上限
+        'max_dimension': 1920,      # 最大边长（像素）
+        'max_quality': 90,          # JPEG 质量上限
+        'min_quality': 40,          # JPEG 质量下限（仍超出上限时缩小尺寸）
+    }
+    # 正文图片：media/uploadimg 只接受 JPG/PNG 且≤1MB；符合要求的 PNG 截图原样上传（文字更清晰）
+    CONTENT_IMAGE_TRANSCODE_PROFILE = dict(IMAGE_TRANSCODE_PROFILE, keep_formats=['JPEG', 'PNG'])
+
+    # 内容图片达到该数量时用进程池转码
+    TRANSCODE_POOL_MIN = 3
+
+    # 图片上传路由：封面上传为永久素材（需要 media_id），正文图片只需要 URL，
+    # 使用不占素材库额度的 media/uploadimg
+    # （设置参与素材缓存键，修改后会重新上传）
+    IMAGE_UPLOAD_SETTINGS = {
+        'endpoint': 'material/add_material',
+        'format': 'jpeg',
+        'transcode': IMAGE_TRANSCODE_PROFILE,
+    }
+    CONTENT_IMAGE_UPLOAD_SETTINGS = {
+        'endpoint': 'media/uploadimg',
+        'format': 'jpeg/png',
+        'transcode': CONTENT_IMAGE_TRANSCODE_PROFILE,
+    }
+
     # 微信API错误码映射
     ERROR_CODES = {
         40001: "AppSecret错误或者AppSecret不属于这个AppID",
         40002: "请确保grant_type字段值为client_credential",
+        40007: "不合法的媒体文件id（素材可能已被删除）",
         40013: "不合法的AppID，请检查AppID是否正确",
         40125: "无效的appsecret，请检查AppSecret是否正确",
         40164: "调用接口的IP地址不在白名单中",
@@ -44,6 +108,16 @@ class WeChatPublisher:
         self.appid = None
         self.appsecret = None
         self.access_token = None
+        self._token_manager: Optional[TokenManager] = None
+        self._api_budget: Optional[ApiBudget] = None
+        self.api_quotas: Dict[str, int] = {}
+        # 已提示过推迟调用的接口（每个接口只提示一次）
+        self._deferred_endpoints = set()
+        self.media_cache = MediaCache(self.MEDIA_CACHE_FILE)
+        self.verify_media_cache = False
+        # 正在上传的图片（缓存键 → Future），并发准备多篇文章时同一张图片只上传一次
+        self._inflight_uploads: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
         self.load_config()
 
     def load_config(self):
@@ -83,6 +157,13 @@ class WeChatPublisher:
         if not self.appsecret or self.appsecret in ['your_appsecret_here', 'your_appsecret']:
             raise ValueError(f"请在配置文件中填写有效的appsecret\n配置文件: {self.CONFIG_FILE}")
 
+        # 每日接口额度（覆盖默认值，如 {"media/uploadimg": 1000}）
+        self.api_quotas = config.get('api_quotas', {})
+
+        if config.get('base_url') and 'WECHAT_API_BASE_URL' not in os.environ:
+            self.BASE_URL = config['base_url'].rstrip('/')
+            print(f"✓ 使用自定义接口地址: {self.BASE_URL}")
+
         # 验证格式
         if not self.appid.startswith('wx') or len(self.appid) != 18:
             print("⚠ 警告: AppID格式可能不正确（应为wx开头的18位字符）")
@@ -113,8 +194,11 @@ class WeChatPublisher:
         self.appid = appid
         self.appsecret = appsecret
 
-    def _handle_api_error(self, errcode: int, errmsg: str, context: str = "") -> str:
-        """统一处理API错误，返回友好的中文提示"""
+    def _handle_api_error(self, errcode: int, errmsg: str, context: str = "", endpoint: str = "") -> str:
+        """统一处理API错误，返回友好的中文提示（45009 时在账本中标记该接口当天额度已用完）"""
+        if errcode == 45009 and endpoint:
+            self.api_budget.mark_exhausted(endpoint)
+
         chinese_msg = self.ERROR_CODES.get(errcode, errmsg)
         error_detail = f"{context}失败 (错误码{errcode}): {chinese_msg}"
 
@@ -139,36 +223,80 @@ class WeChatPublisher:
 
         elif errcode == 45009:
             error_detail += "\n\n💡 解决方法："
-            error_detail += "\n  API调用次数已达上限，请明天再试"
+            error_detail += "\n  API调用次数已达上限，请明天再试（今天不会再调用该接口）"
             error_detail += "\n  或联系微信公众平台提升配额"
+            error_detail += "\n  查看各接口今日用量: python publisher.py --api-budget"
 
         return error_detail
 
-    def get_access_token(self, force_refresh: bool = False) -> str:
+    def _api_error(self, result: Dict[str, Any], context: str, endpoint: str) -> Exception:
+        """把接口返回的错误转为异常：45009 为 QuotaExceededError（调用方可据此降级），其余为 Exception"""
+        error_msg = self._handle_api_error(
+            result['errcode'],
+            result.get('errmsg', 'Unknown error'),
+            context=context,
+            endpoint=endpoint
+        )
+        if result['errcode'] == 45009:
+            return QuotaExceededError(error_msg, [endpoint])
+        return Exception(error_msg)
+
+    @property
+    def api_scope(self) -> str:
+        """账号归属（AppID@接口地址）：token、素材缓存和接口账本都按它区分"""
+        return f"{self.appid}@{self.BASE_URL}"
+
+    @property
+    def token_manager(self) -> TokenManager:
+        """access_token 管理器（首次使用时创建，缓存按 AppID 和接口地址区分）"""
+        if self._token_manager is None:
+            self._token_manager = TokenManager(self.TOKEN_CACHE_FILE, self._fetch_access_token,
+                                               scope=self.api_scope)
+        return self._token_manager
+
+    @property
+    def api_budget(self) -> ApiBudget:
+        """接口调用账本（首次使用时创建，按 AppID 和接口地址区分）"""
+        if self._api_budget is None:
+            self._api_budget = ApiBudget(self.API_LEDGER_FILE, scope=self.api_scope,
+                                         quotas=self.api_quotas)
+        return self._api_budget
+
+    def _defer_call(self, endpoint: str, reason: str) -> bool:
+        """非必要调用：额度紧张时返回 True（调用方跳过该调用），否则记账并返回 False"""
+        if self.api_budget.allow(endpoint, critical=False):
+            try:
+                self.api_budget.acquire(endpoint)
+                return False
+            except QuotaExceededError:
+                pass
+        if endpoint not in self._deferred_endpoints:
+            self._deferred_endpoints.add(endpoint)
+            print(f"  → 接口 {endpoint} 今日额度紧张，{reason}")
+        return True
+
+    def get_access_token(self, force_refresh: bool = False, stale_token: Optional[str] = None) -> str:
         """
         获取access_token，优先使用缓存
 
+        稳态下直接返回进程内缓存的token；临近过期时在后台提前刷新；
+        多个进程同时需要刷新时只有一个进程请求新token（见 token_manager.py）
+
         Args:
             force_refresh: 是否强制刷新token
+            stale_token: 被接口拒绝的token（强制刷新时传入，别的进程已刷新过则直接使用新token）
 
         Returns:
             access_token字符串
         """
-        # 尝试从缓存读取
-        if not force_refresh and os.path.exists(self.TOKEN_CACHE_FILE):
-            try:
-                with open(self.TOKEN_CACHE_FILE, 'r') as f:
-                    cache = json.load(f)
-
-                # 检查token是否过期（提前5分钟刷新）
-                if time.time() < cache.get('expires_at', 0) - 300:
-                    print("✓ 使用缓存的access_token")
-                    return cache['access_token']
-            except Exception as e:
-                print(f"⚠ 读取token缓存失败: {e}")
-
-        # 请求新的token
-        print("→ 正在获取新的access_token...")
+        if force_refresh:
+            self.access_token = self.token_manager.refresh(stale_token)
+        else:
+            self.access_token = self.token_manager.get()
+        return self.access_token
+
+    def _fetch_access_token(self):
+        """请求新的access_token，返回 (access_token, expires_in)"""
         url = f"{self.BASE_URL}/token"
         params = {
             'grant_type': 'client_credential',
@@ -176,33 +304,14 @@ class WeChatPublisher:
             'secret': self.appsecret
         }
 
+        self.api_budget.acquire('token')
         response = requests.get(url, params=params)
         result = response.json()
 
         if 'errcode' in result:
-            error_msg = self._handle_api_error(
-                result['errcode'],
-                result.get('errmsg', 'Unknown error'),
-                context="获取access_token"
-            )
-            raise Exception(error_msg)
-
-        access_token = result['access_token']
-        expires_in = result.get('expires_in', 7200)
-
-        # 缓存token
-        os.makedirs(os.path.dirname(self.TOKEN_CACHE_FILE), exist_ok=True)
-        cache_data = {
-            'access_token': access_token,
-            'expires_at': time.time() + expires_in,
-            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')
-        }
+            raise self._api_error(result, context="获取access_token", endpoint='token')
 
-        with open(self.TOKEN_CACHE_FILE, 'w') as f:
-            json.dump(cache_data, f, indent=2)
-
-        print(f"✓ 获取access_token成功 (有效期: {expires_in}秒)")
-        return access_token
+        return result['access_token'], result.get('expires_in', 7200)
 
     def auto_select_cover(self, title: str = "") -> str:
         """
@@ -229,112 +338,283 @@ class WeChatPublisher:
         print(f"✓ 使用默认封面: news_purple_analysis.png")
         return os.path.join(self.COVERS_DIR, "news_purple_analysis.png")
 
-    def _convert_to_jpg(self, image_path: str) -> str:
+    def _transcode_image(self, image_path: str, source_bytes: bytes, settings: Dict[str, Any]):
         """
-        将图片转换为JPG格式（如果需要）
-        微信要求封面图必须是JPG格式且≤1MB
+        在内存中把图片转为上传用的格式（限制尺寸、去除元数据、保证不超过字节上限）
 
         Args:
-            image_path: 原始图片路径
+            image_path: 原始图片路径（仅用于显示）
+            source_bytes: 原始图片内容
+            settings: 上传设置（IMAGE_UPLOAD_SETTINGS 或 CONTENT_IMAGE_UPLOAD_SETTINGS）
 
         Returns:
-            转换后的图片路径（JPG格式）
+            TranscodeResult
         """
-        try:
-            from PIL import Image
-        except ImportError:
-            raise ImportError("需要安装 Pillow 库: pip install Pillow")
-
-        # 检查文件大小
-        file_size = os.path.getsize(image_path)
-        if file_size > 1 * 1024 * 1024:  # >1MB
-            print(f"  → 图片过大 ({file_size / 1024 / 1024:.1f}MB)，需要压缩")
-
-        # 打开图片
-        img = Image.open(image_path)
-
-        # 如果已经是JPG且大小合适，直接返回
-        if img.format == 'JPEG' and file_size <= 1 * 1024 * 1024:
-            return image_path
-
-        # 创建临时文件
-        import tempfile
-        fd, temp_path = tempfile.mkstemp(suffix='.jpg')
-        os.close(fd)
-
-        # 转换为RGB（PNG可能有alpha通道）
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # 创建白色背景
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-
-        # 保存为JPG，控制质量
-        img.save(temp_path, 'JPEG', quality=85, optimize=True)
-
-        # 检查转换后大小
-        new_size = os.path.getsize(temp_path)
-        print(f"  → 图片转换: {os.path.basename(image_path)} ({img.format}) → JPG ({new_size / 1024 / 1024:.1f}MB)")
-
-        return temp_path
-
-    def upload_image(self, image_path: str, return_url: bool = False):
+        result = transcode_image(source_bytes, **settings['transcode'])
+        self._report_transcode(image_path, result)
+        return result
+
+    @staticmethod
+    def _report_transcode(image_path: str, result) -> None:
+        if result.quality is None:
+            return
+        print(f"  → 图片转换: {os.path.basename(image_path)} ({result.original_size / 1024 / 1024:.1f}MB)"
+              f" → JPG ({len(result.data) / 1024 / 1024:.2f}MB, {result.width}x{result.height}, 质量{result.quality})")
+
+    def upload_image(self, image_path: str, return_url: bool = False, verify_cache: Optional[bool] = None,
+                     prepared=None, uploaded: Optional[List] = None):
         """
-        上传图片到微信服务器
+        上传图片为永久素材（用于封面，草稿需要 media_id）
+
+        同一张图片（内容相同、转换设置相同）只上传一次，之后直接使用缓存的 media_id 和 URL
 
         Args:
             image_path: 图片文件路径
-            return_url: 是否返回图片URL（用于内容图片）
+            return_url: 是否同时返回图片URL
+            verify_cache: 命中缓存时是否确认素材仍然存在（默认使用 self.verify_media_cache）
+            prepared: 已转码好的 TranscodeResult（批量转码时传入，省去再次转码）
+            uploaded: 实际上传（未命中缓存）时追加 (缓存键, media_id)，用于失败时回滚
 
         Returns:
             media_id 或 (media_id, url) 元组
         """
+        media_id, image_url = self._upload_routed(image_path, self.IMAGE_UPLOAD_SETTINGS, verify_cache,
+                                                  prepared, uploaded)
+        if return_url:
+            return media_id, image_url
+        return media_id
+
+    def upload_content_image(self, image_path: str, prepared=None, uploaded: Optional[List] = None) -> str:
+        """
+        上传正文图片（media/uploadimg，不占用素材库数量额度）
+
+        该接口只返回 URL、没有 media_id，上传后无法删除，因此不参与失败回滚。
+        media/uploadimg 今日额度用完时改为上传永久素材（同样返回 URL），不中断发布
+
+        Args:
+            image_path: 图片文件路径
+            prepared: 已转码好的 TranscodeResult（批量转码时传入，省去再次转码）
+            uploaded: 改为上传永久素材时追加 (缓存键, media_id)，用于失败时回滚
+
+        Returns:
+            图片URL
+        """
+        endpoint = self.CONTENT_IMAGE_UPLOAD_SETTINGS['endpoint']
+        if self.api_budget.allow(endpoint):
+            try:
+                _, image_url = self._upload_routed(image_path, self.CONTENT_IMAGE_UPLOAD_SETTINGS, False,
+                                                   prepared, None)
+                return image_url
+            except QuotaExceededError:
+                pass
+
+        if endpoint not in self._deferred_endpoints:
+            self._deferred_endpoints.add(endpoint)
+            print(f"  → 接口 {endpoint} 今日额度已用完，正文图片改为上传永久素材")
+        # 永久素材路由按封面设置转码（PNG 原图不能直接用作该路由的缓存内容）
+        if prepared is not None and prepared.format != 'JPEG':
+            prepared = None
+        _, image_url = self._upload_routed(image_path, self.IMAGE_UPLOAD_SETTINGS, None, prepared, uploaded)
+        return image_url
+
+    def _upload_routed(self, image_path: str, settings: Dict[str, Any], verify_cache: Optional[bool],
+                       prepared, uploaded: Optional[List]):
+        """按上传设置查缓存、合并同时进行的相同上传、转码并上传，返回 (media_id, url)"""
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"图片文件不存在: {image_path}")
 
+        with open(image_path, 'rb') as f:
+            source_bytes = f.read()
+        key = cache_key(source_bytes, settings, self.api_scope)
+
+        # 查找已上传的图片（正文图片没有 media_id，无法确认是否存在）
+        if self.media_cache is not None:
+            cached = self.media_cache.get(key)
+            if verify_cache is None:
+                verify_cache = self.verify_media_cache
+            if cached and cached['media_id'] and verify_cache and not self.verify_media(cached['media_id']):
+                print(f"  → 缓存的素材已失效，重新上传: {os.path.basename(image_path)}")
+                self.media_cache.remove(key)
+                cached = None
+            if cached:
+                print(f"✓ 使用已上传的图片: {os.path.basename(image_path)}"
+                      + (f" (media_id: {cached['media_id']})" if cached['media_id'] else ""))
+                return cached['media_id'], cached['url']
+
+        # 其他线程正在上传同一张图片时等待其结果
+        with self._inflight_lock:
+            pending = self._inflight_uploads.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight_uploads[key] = Future()
+        if not owner:
+            media_id, image_url = pending.result()
+            print(f"✓ 使用已上传的图片: {os.path.basename(image_path)}")
+            return media_id, image_url
+
+        try:
+            media_id, image_url = self._upload_image_data(image_path, source_bytes, settings, prepared)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result((media_id, image_url))
+        finally:
+            with self._inflight_lock:
+                del self._inflight_uploads[key]
+
+        if self.media_cache is not None and (media_id or image_url):
+            self.media_cache.put(key, media_id or "", image_url, source=os.path.basename(image_path),
+                                 scope=self.api_scope)
+        if uploaded is not None and media_id:
+            uploaded.append((key, media_id))
+        return media_id, image_url
+
+    def _upload_image_data(self, image_path: str, source_bytes: bytes, settings: Dict[str, Any], prepared):
+        """按上传设置转码并调用对应接口上传，返回 (media_id, url)"""
         print(f"→ 正在上传图片: {os.path.basename(image_path)}")
 
-        # 转换为JPG格式（微信要求封面图必须是JPG格式且≤1MB）
-        converted_path = self._convert_to_jpg(image_path)
+        # 转换为接口接受的格式（封面必须是JPG，正文图片可以是JPG/PNG，均≤1MB）
+        image = prepared if prepared is not None else self._transcode_image(image_path, source_bytes, settings)
+        extension, mime_type = ('png', 'image/png') if image.format == 'PNG' else ('jpg', 'image/jpeg')
 
         token = self.get_access_token()
-        url = f"{self.BASE_URL}/material/add_material"
+        endpoint = settings['endpoint']
+        url = f"{self.BASE_URL}/{endpoint}"
 
-        params = {
-            'access_token': token,
-            'type': 'image'
-        }
+        params = {'access_token': token}
+        if endpoint == 'material/add_material':
+            params['type'] = 'image'
 
-        # 根据转换后的文件设置Content-Type
-        with open(converted_path, 'rb') as f:
-            files = {'media': (os.path.basename(converted_path), f, 'image/jpeg')}
-            response = requests.post(url, params=params, files=files)
-
-        # 清理临时文件
-        if converted_path != image_path:
-            os.unlink(converted_path)
+        files = {'media': (f"{Path(image_path).stem}.{extension}", image.data, mime_type)}
+        self.api_budget.acquire(endpoint)
+        response = requests.post(url, params=params, files=files)
 
         result = response.json()
 
         if 'errcode' in result and result['errcode'] != 0:
-            error_msg = self._handle_api_error(
-                result['errcode'],
-                result.get('errmsg', 'Unknown error'),
-                context="上传图片"
-            )
-            raise Exception(error_msg)
+            raise self._api_error(result, context="上传图片", endpoint=endpoint)
 
         media_id = result.get('media_id')
         image_url = result.get('url', '')
-        print(f"✓ 图片上传成功 (media_id: {media_id})")
+        if media_id:
+            print(f"✓ 图片上传成功 (media_id: {media_id})")
+        else:
+            print(f"✓ 图片上传成功: {os.path.basename(image_path)}")
+        return media_id, image_url
 
-        if return_url:
-            return media_id, image_url
-        return media_id
+    def delete_material(self, media_id: str) -> bool:
+        """
+        删除永久素材（调用 material/del_material）
+
+        Args:
+            media_id: 素材的media_id
+
+        Returns:
+            是否删除成功
+        """
+        token = self.get_access_token()
+        url = f"{self.BASE_URL}/material/del_material?access_token={token}"
+        try:
+            self.api_budget.acquire('material/del_material')
+            result = requests.post(url, data=json.dumps({'media_id': media_id})).json()
+        except (requests.RequestException, ValueError, QuotaExceededError) as e:
+            print(f"  ⚠️ 删除素材失败 {media_id}: {e}")
+            return False
+        if 'errcode' in result and result['errcode'] != 0:
+            if result['errcode'] == 45009:
+                self.api_budget.mark_exhausted('material/del_material')
+            print(f"  ⚠️ 删除素材失败 {media_id}: {result.get('errmsg', 'Unknown error')}")
+            return False
+        return True
+
+    def _rollback_uploads(self, uploaded: List) -> None:
+        """删除本次新上传的素材及其缓存条目（草稿未创建成功时避免留下孤立素材）"""
+        if not uploaded:
+            return
+        print(f"→ 正在回滚本次上传的 {len(uploaded)} 张图片...")
+        deleted = 0
+        for key, media_id in uploaded:
+            if self.media_cache is not None:
+                self.media_cache.remove(key)
+            if self.delete_material(media_id):
+                deleted += 1
+        print(f"  → 已删除 {deleted}/{len(uploaded)} 个素材")
+
+    def verify_media(self, media_id: str) -> bool:
+        """
+        确认永久素材仍然存在（调用 material/get_material）
+
+        Args:
+            media_id: 素材的media_id
+
+        Returns:
+            素材存在返回 True；网络错误或接口额度紧张时无法确认，也返回 True
+        """
+        # 确认素材是非必要调用，额度紧张时直接信任缓存
+        if self._defer_call('material/get_material', "跳过确认缓存的素材"):
+            return True
+
+        token = self.get_access_token()
+        url = f"{self.BASE_URL}/material/get_material?access_token={token}"
+        try:
+            # 图片素材直接返回文件内容，只看响应头，不下载图片
+            response = requests.post(url, data=json.dumps({'media_id': media_id}), stream=True)
+            try:
+                if 'json' not in response.headers.get('Content-Type', '') and 'text' not in response.headers.get('Content-Type', ''):
+                    return True
+                result = response.json()
+            finally:
+                response.close()
+        except (requests.RequestException, ValueError):
+            return True
+
+        if result.get('errcode') == 45009:
+            self.api_budget.mark_exhausted('material/get_material')
+            return True
+        return not ('errcode' in result and result['errcode'] != 0)
+
+    def list_image_materials(self) -> List[str]:
+        """
+        分页获取公众号素材库中全部图片素材的media_id
+
+        Returns:
+            media_id 列表
+        """
+        media_ids = []
+        offset = 0
+        page_size = 20  # 接口每页最多20条
+
+        while True:
+            token = self.get_access_token()
+            url = f"{self.BASE_URL}/material/batchget_material?access_token={token}"
+            data = json.dumps({'type': 'image', 'offset': offset, 'count': page_size})
+            self.api_budget.acquire('material/batchget_material')
+            result = requests.post(url, data=data).json()
+
+            if 'errcode' in result and result['errcode'] != 0:
+                raise self._api_error(result, context="获取素材列表", endpoint='material/batchget_material')
+
+            items = result.get('item', [])
+            media_ids.extend(item['media_id'] for item in items)
+            offset += len(items)
+            if not items or offset >= result.get('total_count', 0):
+                break
+
+        return media_ids
+
+    def reconcile_media_cache(self) -> int:
+        """
+        用公众号素材列表对账素材缓存，删除已在后台被删除的素材
+
+        Returns:
+            删除的缓存条目数
+        """
+        print("→ 正在获取素材列表...")
+        media_ids = self.list_image_materials()
+        removed = self.media_cache.reconcile(media_ids, scope=self.api_scope)
+        print(f"✓ 素材缓存对账完成: 素材库共 {len(media_ids)} 张图片，删除失效缓存 {removed} 条")
+        return removed
 
     def _remove_cover_image(self, content: str) -> str:
         """
@@ -342,8 +622,8 @@ class WeChatPublisher:
 
         移除策略：
         1. 移除 <img src="cover.png"> 及其变体
-        2. 移除第一个出现的 <img> 标签（通常是封面图）
-        3. 保留注释中的封面图引用说明
+        2. 移除 alt/title 包含"封面"的图片
+        3. 移除标题注释后紧跟的第一张图片（通常是封面图位置）
 
         Args:
             content: HTML内容
@@ -351,91 +631,139 @@ class WeChatPublisher:
         Returns:
             移除封面图后的HTML内容
         """
-        import re
+        return HTMLNormalizer(fix_editor=False, fix_contrast=False).normalize(content)
 
-        # 策略1: 移除明确的封面图引用（cover.png, cover.jpg, 封面图等）
-        cover_patterns = [
-            r'<img[^>]*src=["\']cover\.(png|jpg|jpeg|gif)["\'][^>]*>',  # cover.png
-            r'<img[^>]*alt=["\'][^"\']*封面[^"\']*["\'][^>]*>',  # alt包含"封面"
-            r'<img[^>]*title=["\'][^"\']*封面[^"\']*["\'][^>]*>',  # title包含"封面"
-        ]
+    def _scan_local_images(self, content: str, base_dir: str = ".", report: bool = True):
+        """
+        收集HTML中的本地图片引用（跳过网络图片和封面图）
 
-        for pattern in cover_patterns:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE)
-
-        # 策略2: 移除注释后的第一张图片（通常是封面图位置）
-        # 匹配：<!-- 注释 --> 后紧跟的 <img> 标签
-        content = re.sub(
-            r'(<!--[^>]*标题[^>]*-->)\s*<img[^>]*>',
-            r'\1',
-            content,
-            count=1,
-            flags=re.IGNORECASE
-        )
+        Args:
+            content: HTML内容
+            base_dir: 图片所在的基础目录
+            report: 是否提示不存在的图片
 
-        return content
+        Returns:
+            (src -> 实际路径（不存在时为None）, 实际路径 -> 内容哈希, 内容哈希 -> 正文图片缓存键)
+        """
+        src_to_path = {}
+        path_to_hash = {}
+        hash_to_key = {}
+        for match in self.IMG_SRC_PATTERN.finditer(content):
+            src = match.group(2)
+
+            # 跳过已经是HTTP/HTTPS的图片、封面图（已单独处理）和已收集的引用
+            if src.startswith(('http://', 'https://')) or 'cover' in src.lower() or src in src_to_path:
+                continue
+
+            # 构建完整路径
+            image_path = Path(base_dir) / src
 
-    def _upload_content_images(self, content: str, base_dir: str = ".") -> str:
+            if not image_path.exists():
+                if report:
+                    print(f"  ⚠️ 图片不存在，跳过: {src}")
+                src_to_path[src] = None
+                continue
+
+            resolved = str(image_path.resolve())
+            src_to_path[src] = resolved
+            if resolved not in path_to_hash:
+                with open(resolved, 'rb') as f:
+                    source_bytes = f.read()
+                digest = hashlib.sha256(source_bytes).hexdigest()
+                path_to_hash[resolved] = digest
+                hash_to_key[digest] = cache_key(source_bytes, self.CONTENT_IMAGE_UPLOAD_SETTINGS, self.api_scope)
+
+        return src_to_path, path_to_hash, hash_to_key
+
+    def _upload_content_images(self, content: str, base_dir: str = ".", uploaded: Optional[List] = None) -> str:
         """
         扫描HTML中的本地图片并上传到微信，替换为微信URL
 
+        先收集所有本地图片引用，按实际路径和文件内容去重，
+        再用有限大小的线程池并发上传，最后一次性替换HTML
+
         Args:
             content: HTML内容
             base_dir: 图片所在的基础目录
+            uploaded: 实际上传的永久素材记录（见 upload_content_image）
 
         Returns:
             替换后的HTML内容
         """
-        import re
-        from pathlib import Path
+        # 1. 收集本地图片引用
+        src_to_path, path_to_hash, hash_to_key = self._scan_local_images(content, base_dir)
 
-        # 正则匹配所有 <img src="本地路径"> 标签
-        img_pattern = r'<img([^>]*?)src=["\']([^"\']+)["\']([^>]*?)>'
+        # 2. 按内容哈希去重（同一张图片只上传一次）
+        hash_to_path = {}
+        for resolved, digest in path_to_hash.items():
+            hash_to_path.setdefault(digest, resolved)
 
-        uploaded_count = 0
+        if not hash_to_path:
+            return content
 
-        def replace_image(match):
-            nonlocal uploaded_count
-            before_src = match.group(1)
-            src = match.group(2)
-            after_src = match.group(3)
+        duplicates = len([src for src, path in src_to_path.items() if path]) - len(hash_to_path)
+        print(f"  → 发现 {len(hash_to_path)} 张待上传图片" + (f"（去重 {duplicates} 个重复引用）" if duplicates > 0 else ""))
 
-            # 跳过已经是HTTP/HTTPS的图片
-            if src.startswith(('http://', 'https://')):
-                return match.group(0)
-
-            # 跳过封面图（已单独处理）
-            if 'cover' in src.lower():
-                return match.group(0)
-
-            # 构建完整路径
-            image_path = Path(base_dir) / src
-
-            if not image_path.exists():
-                print(f"  ⚠️ 图片不存在，跳过: {src}")
-                return match.group(0)
-
-            try:
-                # 上传图片并获取URL
-                _, wechat_url = self.upload_image(str(image_path), return_url=True)
+        hash_to_url = {}
+        failures = {}
 
+        # 3. 未上传过的图片较多时，先用进程池批量转码
+        prepared = {}
+        to_transcode = [
+            digest for digest in hash_to_path
+            if self.media_cache is None or self.media_cache.get(hash_to_key[digest]) is None
+        ]
+        if len(to_transcode) >= self.TRANSCODE_POOL_MIN:
+            paths = [hash_to_path[digest] for digest in to_transcode]
+            results = transcode_files(paths, **self.CONTENT_IMAGE_TRANSCODE_PROFILE)
+            for digest, path, result in zip(to_transcode, paths, results):
+                if isinstance(result, Exception):
+                    failures[digest] = f"图片转换失败: {result}"
+                else:
+                    self._report_transcode(path, result)
+                    prepared[digest] = result
+
+        # 4. 并发上传（先获取一次token，避免多个线程同时刷新）
+        self.get_access_token()
+
+        def upload(digest):
+            return self.upload_content_image(hash_to_path[digest], prepared=prepared.get(digest), uploaded=uploaded)
+
+        workers = min(self.CONTENT_IMAGE_WORKERS, len(hash_to_path))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(upload, digest): digest for digest in hash_to_path if digest not in failures}
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    wechat_url = future.result()
+                except Exception as e:
+                    failures[digest] = str(e)
+                    continue
                 if wechat_url:
-                    uploaded_count += 1
-                    # 替换为微信URL
-                    return f'<img{before_src}src="{wechat_url}"{after_src}>'
+                    hash_to_url[digest] = wechat_url
                 else:
-                    print(f"  ⚠️ 未获取到URL，保持原路径: {src}")
-                    return match.group(0)
+                    failures[digest] = "未获取到URL"
 
-            except Exception as e:
-                print(f"  ⚠️ 上传图片失败 {src}: {e}")
+        # 按图片报告失败（失败的图片保持原路径）
+        for src, resolved in src_to_path.items():
+            digest = path_to_hash.get(resolved)
+            if digest in failures:
+                print(f"  ⚠️ 上传图片失败 {src}: {failures[digest]}，保持原路径")
+
+        # 5. 一次性替换为微信URL
+        def replace_image(match):
+            digest = path_to_hash.get(src_to_path.get(match.group(2)))
+            wechat_url = hash_to_url.get(digest)
+            if not wechat_url:
                 return match.group(0)
+            return f'<img{match.group(1)}src="{wechat_url}"{match.group(3)}>'
 
-        # 执行替换
-        content = re.sub(img_pattern, replace_image, content)
+        content = self.IMG_SRC_PATTERN.sub(replace_image, content)
 
-        if uploaded_count > 0:
-            print(f"  ✓ 成功上传 {uploaded_count} 张内容图片")
+        if hash_to_url:
+            print(f"  ✓ 成功上传 {len(hash_to_url)} 张内容图片")
+        if failures:
+            print(f"  ⚠️ {len(failures)} 张内容图片上传失败")
 
         return content
 
@@ -456,257 +784,17 @@ class WeChatPublisher:
         Returns:
             修复后的HTML内容
         """
-        import re
-
-        # === 核心修复：将带背景色的 div/section 转换为 table（微信编辑器会保留 table 的背景色）===
-        def add_important_to_style(style):
-            """给style中的所有CSS属性添加 !important"""
-            declarations = style.split(';')
-            important_declarations = []
-
-            for decl in declarations:
-                decl = decl.strip()
-                if not decl:
-                    continue
-
-                # 如果已经有 !important，保持不变
-                if '!important' in decl:
-                    important_declarations.append(decl)
-                else:
-                    # 否则添加 !important
-                    important_declarations.append(decl + '!important')
-
-            return ';'.join(important_declarations) + ';'
-
-        # 转换计数器
-        conversion_count = {'converted': 0, 'excluded': 0}
-
-        def convert_bg_div_to_table(match):
-            """将带背景色的 div/section 转换为 table 结构"""
-            tag = match.group(1)  # div 或 section
-            style = match.group(2)  # style 属性内容
-            content = match.group(3)  # 内部内容
-
-            # 排除不应该转换的情况：
-            # 1. 排除最外层容器（background-color: #ffffff 且包含 font-family）
-            if 'font-family' in style and 'ffffff' in style.lower():
-                conversion_count['excluded'] += 1
-                return match.group(0)
-
-            # 2. 排除纯白色背景且没有边框的元素（可能是容器）
-            # 去除空格后检查
-            style_no_space = style.replace(' ', '')
-            if ('background:#ffffff' in style_no_space or 'background-color:#ffffff' in style_no_space) and 'border' not in style:
-                conversion_count['excluded'] += 1
-                return match.group(0)
-
-            # 只转换真正需要的背景色区块
-            if 'background' not in style.lower():
-                return match.group(0)
-
-            # 给所有CSS属性添加 !important（关键：确保微信编辑器不会覆盖样式）
-            style_important = add_important_to_style(style)
-
-            # 提取 margin 值（如果有）
-            margin_match = re.search(r'margin[^:]*:\s*([^;!]+)', style)
-            margin = margin_match.group(1).strip() if margin_match else '0'
-
-            # 构建 table 结构（添加圆角）
-            # border-collapse:separate 才能让圆角生效，overflow:hidden 确保内容不会超出圆角
-            table_html = f'<table style="width:100%!important;border-collapse:separate!important;border-spacing:0!important;border-radius:10px!important;overflow:hidden!important;margin:{margin}!important;"><tr><td style="{style_important}">{content}</td></tr></table>'
-            conversion_count['converted'] += 1
-            return table_html
-
-        # 转换所有带 style 且包含 background 的 div/section（但排除 span 等行内元素）
-        content = re.sub(
-            r'<(div|section)\s+style="([^"]*background[^"]*)"[^>]*>(.*?)</\1>',
-            convert_bg_div_to_table,
-            content,
-            flags=re.DOTALL | re.IGNORECASE
-        )
-
-        # 打印转换统计
-        print(f"  → 背景色区块转换: 成功转换 {conversion_count['converted']} 个, 排除 {conversion_count['excluded']} 个")
-
-        # === 超级压缩：彻底删除所有空白（这是关键！）===
-        # 1. 删除所有标签间的空白和换行符
-        content = re.sub(r'>\s+<', '><', content)
-
-        # 2. 删除标签后的空白（包括标签内的换行）
-        content = re.sub(r'>\s+', '>', content)
-        content = re.sub(r'\s+<', '<', content)
-
-        # 3. 压缩多个连续空格为一个（保留正常文本中的空格）
-        content = re.sub(r'  +', ' ', content)
-
-        # === 微信编辑器兼容性修复：CSS属性处理 ===
-        # 1. 保留 border-radius 但添加 !important（尝试保留圆角效果）
-        content = re.sub(r'border-radius:\s*([^;!]+);', r'border-radius:\1!important;', content)
-
-        # 2. 移除 box-shadow（阴影，微信编辑器确实不支持）
-        content = re.sub(r'box-shadow:\s*[^;]+;\s*', '', content)
-
-        # 3. 移除 text-shadow
-        content = re.sub(r'text-shadow:\s*[^;]+;\s*', '', content)
-
-        # 4. 处理背景样式（微信编辑器对背景的限制）
-        # 4.1 移除渐变背景（微信不支持 linear-gradient）
-        content = re.sub(r'background:\s*linear-gradient[^;]+;', '', content)
-
-        # 4.2 统一 background 为 background-color 并添加 !important
-        content = re.sub(r'\bbackground:\s*([#a-fA-F0-9]+);', r'background-color:\1!important;', content)
-
-        # 4.3 确保所有 background-color 都有 !important
-        content = re.sub(r'background-color:\s*([^;!]+);', r'background-color:\1!important;', content)
-
-        # 5. 将所有 <section> 改为 <div>（避免额外空行）
-        content = content.replace('<section', '<div')
-        content = content.replace('</section>', '</div>')
-
-        # 6. 优化 margin（保持舒适间距，避免过于紧凑）
-        # 保留卡片间的间距（18px），只压缩过大的margin
-        content = re.sub(r'margin-bottom:\s*([3-9]\d+|[1-9]\d{2,})px;', 'margin-bottom:18px;', content)  # 只压缩>=30px的
-        content = re.sub(r'margin:\s*\d+px\s+0\s+\d+px\s+0;', 'margin:0 0 18px 0;', content)
-
-        # === 核心修复2：在最外层容器强制禁用缩进和设置字体大小 ===
-        # 修复微信编辑器默认添加的 text-indent: 2em
-        content = re.sub(
-            r'(<div[^>]*style="[^"]*)(">)',
-            lambda m: m.group(1) + ' text-indent: 0 !important; font-size: 15px !important;' + m.group(2),
-            content,
-            count=1  # 只修改第一个div（外层容器）
-        )
-
-        # === 样式修复：确保所有关键样式不被微信编辑器破坏 ===
-
-        # 1. text-indent 强制为 0 且使用 !important（彻底禁用缩进）
-        content = re.sub(r'text-indent:\s*[^;!]+;', 'text-indent: 0 !important;', content)
-        content = re.sub(r'text-indent:\s*0;', 'text-indent: 0 !important;', content)
-
-        # 给所有没有 text-indent 的 style 属性添加
-        content = re.sub(
-            r'style="(?![^"]*text-indent)([^"]*)"',
-            r'style="\1 text-indent: 0 !important;"',
-            content
-        )
-
-        # 2. margin 统一处理（保持舒适的段落间距和呼吸感）
-        # 段落的 margin 设置为舒适值
-        content = re.sub(
-            r'margin:\s*0\s+0\s+\d+px\s+0;',
-            'margin: 0 0 18px 0 !important;',
-            content
-        )
-        content = re.sub(
-            r'margin-bottom:\s*\d+px;',
-            'margin-bottom: 18px !important;',
-            content
-        )
-        # section/卡片 之间的间距（调整为18px，更自然）
-        content = re.sub(
-            r'margin:\s*\d+px\s+0;',
-            'margin: 0 0 18px 0 !important;',
-            content
-        )
-
-        # 3. 添加 !important 到关键对齐属性
-        # vertical-align（防止圆形序号错位）
-        content = re.sub(
-            r'vertical-align:\s*([^;!]+);',
-            r'vertical-align: \1 !important;',
-            content
-        )
-
-        # text-align（防止对齐错位）
-        content = re.sub(
-            r'text-align:\s*([^;!]+);',
-            r'text-align: \1 !important;',
-            content
-        )
-
-        # 4. display 属性加 !important（防止布局打乱）
-        content = re.sub(
-            r'display:\s*inline-block;',
-            'display: inline-block !important;',
-            content
-        )
-
-        # 5. line-height 加 !important（防止行高被重置）
-        content = re.sub(
-            r'line-height:\s*([^;!]+);',
-            r'line-height: \1 !important;',
-            content
-        )
-
-        # 6. font-size 加 !important（防止字体变大）
-        content = re.sub(
-            r'font-size:\s*([^;!]+);',
-            r'font-size: \1 !important;',
-            content
-        )
-
-        # 7. padding 加 !important（防止内边距变化）
-        content = re.sub(
-            r'padding:\s*([^;!]+);',
-            r'padding: \1 !important;',
-            content
-        )
-
-        # === 圆角优化：让所有框都圆润 ===
-        # 1. 将 border-collapse: collapse 改为 separate（允许圆角）
-        content = re.sub(
-            r'border-collapse:\s*collapse;',
-            'border-collapse:separate;border-spacing:0;overflow:hidden!important;',
-            content
-        )
-
-        # 2. 给所有表格添加圆角（直接在<table style="后面添加）
-        content = re.sub(
-            r'<table\s+style="',
-            '<table style="border-radius:10px!important;',
-            content
-        )
-
-        # 3. 给所有td也添加圆角（保证内外都圆润）
-        content = re.sub(
-            r'(<td\s+style="[^"]*)(">)',
-            r'\1border-radius:10px!important;\2',
-            content
-        )
-
-        # 4. 去除相关资源部分的边框（让结尾更简洁）
-        content = re.sub(
-            r'border-top:\s*1px\s+dashed\s+#ccc;',
-            '',
-            content
-        )
-
-        # === 图片圆角优化：让所有图片都圆润 ===
-        # 给所有 img 标签添加圆角（修复后的正则）
-        content = re.sub(
-            r'<img([^>]*style="[^"]*)"',
-            r'<img\1;border-radius:8px!important;"',
-            content
-        )
-
-        # 给没有 style 属性的 img 添加圆角
-        content = re.sub(
-            r'<img(?![^>]*style)([^>]*)>',
-            r'<img\1 style="border-radius:8px!important;">',
-            content
-        )
-
+        normalizer = HTMLNormalizer(remove_cover=False, fix_contrast=False)
+        content = normalizer.normalize(content)
+        self._report_normalize(normalizer.stats)
         return content
 
     def _fix_color_contrast(self, content: str) -> str:
         """
-        彻底修复颜色对比度问题，确保文字和背景的对比度足够
+        修复颜色对比度问题，确保文字和背景的对比度足够
 
-        解决问题：
-        1. 渐变背景 + 任何文字色 = 微信可能渲染为白色背景（看不见）
-        2. 浅色背景 + 浅色/白色文字 = 看不见
-        3. 白色背景 + 白色文字 = 看不见
-        4. 浅色背景没有设置字体颜色 = 继承不合适的颜色
+        按元素计算文字色和背景色（包括从祖先元素继承的），WCAG 对比度低于 4.5:1 时调整文字颜色；
+        渐变背景（微信可能渲染为白色）改为渐变中与文字对比度最高的纯色
 
         Args:
             content: HTML内容
@@ -714,164 +802,89 @@ class WeChatPublisher:
         Returns:
             修复后的HTML内容
         """
-        import re
-
-        # 第一步：替换所有渐变背景为纯色背景
-        # 因为微信公众号可能不支持渐变，会默认白色背景
-        print("  → 正在修复渐变背景问题...")
-
-        # 替换 background: linear-gradient 为纯色背景
-        def replace_gradient_bg(match):
-            """将渐变背景替换为纯色背景"""
-            style = match.group(1)
-
-            # 提取渐变中的颜色，选择第一个（或更深的颜色）
-            # 常见模式：linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%)
-            color_match = re.search(r'linear-gradient\([^,]+,\s*(#[0-9a-f]{6})', style, re.IGNORECASE)
-
-            if color_match:
-                # 使用渐变中的第一个颜色（或使用第二个颜色，如果第一个太浅）
-                primary_color = color_match.group(1).lower()
-
-                # 检查是否需要用更深的颜色（如果颜色太浅）
-                light_colors = ['#7c3aed', '#a78bfa', '#ddd6fe', '#ede9fe']
-                if primary_color in light_colors:
-                    # 从渐变中提取第二个颜色（通常更深）
-                    colors = re.findall(r'#[0-9a-f]{6}', style, re.IGNORECASE)
-                    if len(colors) > 1:
-                        primary_color = colors[-1].lower()  # 使用最后一个颜色（通常更深）
-
-                # 替换整个 background: ... 为 background-color: ...
-                new_style = re.sub(
-                    r'background:\s*linear-gradient\([^)]+\)',
-                    f'background-color: {primary_color}',
-                    style,
-                    flags=re.IGNORECASE
-                )
-
-                return f'style="{new_style}"'
-
-            return match.group(0)
+        normalizer = HTMLNormalizer(remove_cover=False, fix_editor=False)
+        content = normalizer.normalize(content)
+        print(f"  → 颜色对比度检查: {normalizer.stats['contrast_fixed']} 个元素对比度低于 4.5:1，已调整文字颜色")
+        return content
 
-        # 匹配所有 style 属性中的渐变背景
-        content = re.sub(
-            r'style="([^"]*background:\s*linear-gradient[^"]*)"',
-            replace_gradient_bg,
-            content,
-            flags=re.IGNORECASE
-        )
+    def _normalize_content(self, content: str) -> str:
+        """
+        一次扫描完成封面图移除、微信编辑器兼容修复和颜色对比度修复（见 html_normalizer.py）
 
-        # 第二步：修复浅色背景与文本颜色的对比度
-        print("  → 正在修复浅色背景与文本颜色对比度...")
-
-        # 颜色对比度修复规则
-        contrast_rules = [
-            # 深紫色背景（来自渐变背景替换）
-            {
-                'bg_pattern': r'background-color:\s*#6d28d9',
-                'required_color': '#ffffff',
-                'description': '深紫色背景'
-            },
-            # 浅黄色背景
-            {
-                'bg_pattern': r'background-color:\s*#fef[0-9a-f]{3}',
-                'required_color': '#78350f',
-                'description': '浅黄色背景'
-            },
-            # 浅蓝色背景
-            {
-                'bg_pattern': r'background-color:\s*#[de][0-9a-f]e[a-f]fe',
-                'required_color': '#0c4a6e',
-                'description': '浅蓝色背景'
-            },
-            # 浅绿色背景
-            {
-                'bg_pattern': r'background-color:\s*#[de][c1f][f c][ce7]',
-                'required_color': '#15803d',
-                'description': '浅绿色背景'
-            },
-            # 浅紫色背景
-            {
-                'bg_pattern': r'background-color:\s*#ede9fe',
-                'required_color': '#6b21a8',
-                'description': '浅紫色背景'
-            },
-            # 浅粉色背景
-            {
-                'bg_pattern': r'background-color:\s*#fe[ce][2a][e2]',
-                'required_color': '#991b1b',
-                'description': '浅粉色背景'
-            },
-            # 浅灰色背景
-            {
-                'bg_pattern': r'background-color:\s*#[ef][3e9][34f][46f]',
-                'required_color': '#111827',
-                'description': '浅灰色背景'
-            }
-        ]
+        Args:
+            content: HTML内容
 
-        def fix_element_color(match):
-            """修复单个元素的颜色对比度"""
-            tag = match.group(1)
-            style = match.group(2)
-            content_inner = match.group(3)
+        Returns:
+            规范化后的HTML内容
+        """
+        normalizer = HTMLNormalizer()
+        content = normalizer.normalize(content)
+        if normalizer.stats['covers_removed']:
+            print(f"  → 已移除封面图 {normalizer.stats['covers_removed']} 张")
+        self._report_normalize(normalizer.stats)
+        print(f"  → 颜色对比度检查: {normalizer.stats['contrast_fixed']} 个元素对比度低于 4.5:1，已调整文字颜色")
+        return content
 
-            # 检查是否有背景色
-            bg_match = re.search(r'background-color:\s*(#[0-9a-f]{6})', style, re.IGNORECASE)
-            if not bg_match:
-                return match.group(0)
+    @staticmethod
+    def _report_normalize(stats: Dict[str, int]) -> None:
+        print(f"  → 背景色区块转换: 成功转换 {stats['converted']} 个, 排除 {stats['excluded']} 个")
 
-            bg_color = bg_match.group(1).lower()
+    def estimate_api_calls(self, articles: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        预估发布这些文章需要的接口调用次数（素材缓存中已有的图片不计）
 
-            # 检查是否有浅色背景
-            has_light_bg = any(
-                re.search(rule['bg_pattern'], style, re.IGNORECASE)
-                for rule in contrast_rules
-            )
+        Args:
+            articles: 文章列表（同 create_draft_batch，使用 content、content_base_dir、cover、thumb_media_id）
 
-            if not has_light_bg:
-                return match.group(0)
+        Returns:
+            {接口: 次数}
+        """
+        content_keys = set()
+        cover_keys = set()
+        for spec in articles:
+            _, _, hash_to_key = self._scan_local_images(spec.get('content', ''), spec.get('content_base_dir', '.'),
+                                                        report=False)
+            content_keys.update(hash_to_key.values())
+            cover = spec.get('cover')
+            if cover and not spec.get('thumb_media_id') and os.path.exists(cover):
+                with open(cover, 'rb') as f:
+                    cover_keys.add(cache_key(f.read(), self.IMAGE_UPLOAD_SETTINGS, self.api_scope))
+
+        if self.media_cache is not None:
+            content_keys = {key for key in content_keys if self.media_cache.get(key) is None}
+            cover_keys = {key for key in cover_keys if self.media_cache.get(key) is None}
+
+        return {
+            self.CONTENT_IMAGE_UPLOAD_SETTINGS['endpoint']: len(content_keys),
+            self.IMAGE_UPLOAD_SETTINGS['endpoint']: len(cover_keys),
+            'draft/add': 1,
+        }
 
-            # 获取该背景色对应的推荐文本色
-            required_color = '#111827'  # 默认深灰色
-            for rule in contrast_rules:
-                if re.search(rule['bg_pattern'], style, re.IGNORECASE):
-                    required_color = rule['required_color']
-                    break
-
-            # 检查是否已经有 color 属性
-            color_match = re.search(r'color:\s*(#[0-9a-f]{6})', style, re.IGNORECASE)
-
-            if color_match:
-                current_color = color_match.group(1).lower()
-                # 检查当前文本色是否是浅色（会看不见）
-                light_text_colors = ['#ffffff', '#f9fafb', '#f3f4f6', '#e5e7eb', '#f0fdf4', '#ffffff', '#fef9e7']
-
-                if current_color in light_text_colors:
-                    # 替换为推荐的深色
-                    style = re.sub(
-                        r'color:\s*#[0-9a-f]{6}',
-                        f'color: {required_color}',
-                        style,
-                        flags=re.IGNORECASE
-                    )
-            else:
-                # 没有颜色属性，添加推荐的颜色
-                style += f'; color: {required_color}'
+    def check_api_budget(self, articles: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        发布前检查今日接口额度，不足时在上传任何图片之前失败（而不是发布到一半失败）
 
-            return f'<{tag} style="{style}">{content_inner}</{tag}>'
+        media/uploadimg 额度不够的部分按改为上传永久素材计算（见 upload_content_image）
 
-        # 修复所有带背景色的元素（包括 div, section, p 等）
-        content = re.sub(
-            r'<(div|section|p)\s+style="([^"]*background-color[^"]*)"[^>]*>(.*?)</\1>',
-            fix_element_color,
-            content,
-            flags=re.DOTALL | re.IGNORECASE
-        )
+        Args:
+            articles: 文章列表（同 estimate_api_calls）
 
-        print("  → 颜色对比度检查: 已彻底修复所有元素的对比度问题")
+        Returns:
+            预计调用次数 {接口: 次数}
 
-        return content
+        Raises:
+            QuotaExceededError: 额度不足
+        """
+        expected = self.estimate_api_calls(articles)
+        content_endpoint = self.CONTENT_IMAGE_UPLOAD_SETTINGS['endpoint']
+        remaining = self.api_budget.remaining(content_endpoint)
+        if remaining is not None and remaining < expected[content_endpoint]:
+            overflow = expected[content_endpoint] - remaining
+            expected[content_endpoint] = remaining
+            expected[self.IMAGE_UPLOAD_SETTINGS['endpoint']] += overflow
+            print(f"⚠ {content_endpoint} 今日剩余 {remaining} 次，{overflow} 张正文图片将上传为永久素材")
+        self.api_budget.check(expected)
+        return expected
 
     def create_draft(self,
                     title: str,
@@ -880,7 +893,8 @@ class WeChatPublisher:
                     thumb_media_id: str = "",
                     digest: str = "",
                     show_cover_pic: int = 1,
-                    content_base_dir: str = ".") -> Dict[str, Any]:
+                    content_base_dir: str = ".",
+                    cover: str = "") -> Dict[str, Any]:
         """
         创建草稿文章
 
@@ -892,23 +906,135 @@ class WeChatPublisher:
             digest: 摘要
             show_cover_pic: 是否显示封面，1显示，0不显示
             content_base_dir: 内容图片所在目录（默认当前目录）
+            cover: 封面图片路径（未提供 thumb_media_id 时上传，计入发布前的额度检查）
 
         Returns:
             创建结果
+
+        Raises:
+            QuotaExceededError: 今日接口额度不足（见 check_api_budget）
         """
-        # 1. 自动移除封面图片（封面已通过API单独上传）
-        content = self._remove_cover_image(content)
+        self.check_api_budget([{'content': content, 'content_base_dir': content_base_dir,
+                                'cover': cover, 'thumb_media_id': thumb_media_id}])
 
-        # 2. 上传内容中的其他图片并替换为微信URL
-        print("\n→ 正在处理内容中的图片...")
-        content = self._upload_content_images(content, content_base_dir)
+        article_data = self._prepare_article(
+            title=title,
+            content=content,
+            author=author,
+            thumb_media_id=thumb_media_id,
+            digest=digest,
+            show_cover_pic=show_cover_pic,
+            content_base_dir=content_base_dir,
+            cover=cover
+        )
+
+        print(f"→ 正在创建草稿: {article_data['title']}")
+        result = self._submit_draft([article_data])
+
+        print(f"✓ 草稿创建成功!")
+        print(f"  media_id: {result.get('media_id')}")
+
+        return result
+
+    def create_draft_batch(self, articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        创建多图文草稿（一次 draft/add 提交多篇文章，第一篇为头条）
+
+        各篇文章并发准备（上传封面和内容图片、规范化HTML），全部成功后才提交。
+        任何一篇失败或提交失败时，删除本次新上传的素材（缓存命中的素材不受影响）
+
+        Args:
+            articles: 文章列表，每项为 create_draft 的参数字典，另可用 cover 指定封面图片路径
+                      （未提供 thumb_media_id 时上传）
 
-        # 3. 修复微信编辑器的样式破坏问题
-        content = self._fix_wechat_editor_issues(content)
+        Returns:
+            创建结果
+
+        Raises:
+            DraftBatchError: 有文章准备失败（failures 为 {文章序号: 错误信息}）
+            QuotaExceededError: 今日接口额度不足（见 check_api_budget）
+        """
+        if not articles:
+            raise ValueError("至少需要一篇文章")
+        if len(articles) > self.DRAFT_MAX_ARTICLES:
+            raise ValueError(f"每个草稿最多 {self.DRAFT_MAX_ARTICLES} 篇文章，当前 {len(articles)} 篇")
+
+        self.check_api_budget(articles)
+
+        total = len(articles)
+        print(f"→ 正在准备 {total} 篇文章...")
+
+        # 先获取一次token，避免多个线程同时刷新
+        self.get_access_token()
+
+        uploaded = []
+        prepared: List[Optional[Dict[str, Any]]] = [None] * total
+        failures: Dict[int, str] = {}
+
+        def prepare(index):
+            spec = articles[index]
+            print(f"→ [{index + 1}/{total}] 正在准备: {spec.get('title', '')}")
+            return self._prepare_article(uploaded=uploaded, **spec)
+
+        with ThreadPoolExecutor(max_workers=min(self.ARTICLE_WORKERS, total)) as pool:
+            futures = {pool.submit(prepare, index): index for index in range(total)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    prepared[index] = future.result()
+                except Exception as e:
+                    failures[index] = str(e)
+
+        if failures:
+            for index in sorted(failures):
+                print(f"  ✗ 第 {index + 1} 篇《{articles[index].get('title', '')}》准备失败: {failures[index]}")
+            self._rollback_uploads(uploaded)
+            raise DraftBatchError(failures, articles)
+
+        print(f"→ 正在创建多图文草稿: {total} 篇")
+        try:
+            result = self._submit_draft(prepared)
+        except Exception:
+            self._rollback_uploads(uploaded)
+            raise
+
+        print(f"✓ 草稿创建成功!")
+        print(f"  media_id: {result.get('media_id')}")
+
+        return result
+
+    def _prepare_article(self,
+                         title: str,
+                         content: str,
+                         author: str = "",
+                         thumb_media_id: str = "",
+                         digest: str = "",
+                         show_cover_pic: int = 1,
+                         content_base_dir: str = ".",
+                         cover: str = "",
+                         uploaded: Optional[List] = None) -> Dict[str, Any]:
+        """
+        准备一篇文章：上传封面和内容图片、规范化HTML、按微信限制截断字段
+
+        Args:
+            cover: 封面图片路径（未提供 thumb_media_id 时上传）
+            uploaded: 实际上传的图片记录（见 upload_image）
+            其余参数同 create_draft
+
+        Returns:
+            draft/add 的文章数据
+        """
+        # 1. 一次扫描：移除封面图片（封面已通过API单独上传）、修复微信编辑器的样式破坏问题、
+        #    修复颜色对比度问题（确保文字可读）
+        content = self._normalize_content(content)
         print("✓ 已优化HTML格式（防止编辑模式样式错位）")
 
-        # 4. 修复颜色对比度问题（确保文字可读）
-        content = self._fix_color_contrast(content)
+        # 2. 上传内容中的其他图片并替换为微信URL
+        print("\n→ 正在处理内容中的图片...")
+        content = self._upload_content_images(content, content_base_dir, uploaded=uploaded)
+
+        if cover and not thumb_media_id:
+            thumb_media_id = self.upload_image(cover, uploaded=uploaded)
 
         # 微信字段长度限制
         MAX_AUTHOR_BYTES = 20      # 作者名20字节
@@ -954,8 +1080,6 @@ class WeChatPublisher:
             print(f"已截断为: {title}")
             print(f"\n提示: 您可以在微信编辑器中手动修改为完整标题\n")
 
-        print(f"→ 正在创建草稿: {title}")
-
         if author:
             original_author = author
             author = truncate_by_bytes(author, MAX_AUTHOR_BYTES)
@@ -970,9 +1094,6 @@ class WeChatPublisher:
         if digest != original_digest:
             print(f"⚠ 摘要超长，已自动截断")
 
-        token = self.get_access_token()
-        url = f"{self.BASE_URL}/draft/add?access_token={token}"
-
         # 构建文章数据
         article_data = {
             "title": title,
@@ -989,11 +1110,27 @@ class WeChatPublisher:
         if thumb_media_id:
             article_data["thumb_media_id"] = thumb_media_id
 
-        articles = {"articles": [article_data]}
+        return article_data
+
+    def _submit_draft(self, article_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        调用 draft/add 提交草稿（access_token 过期时刷新后重试一次）
+
+        Args:
+            article_list: 文章数据列表
+
+        Returns:
+            接口返回结果
+        """
+        token = self.get_access_token()
+        url = f"{self.BASE_URL}/draft/add?access_token={token}"
+
+        articles = {"articles": article_list}
 
         headers = {'Content-Type': 'application/json; charset=utf-8'}
         # 手动序列化JSON，确保中文不被转义
         data = json.dumps(articles, ensure_ascii=False).encode('utf-8')
+        self.api_budget.acquire('draft/add')
         response = requests.post(url, data=data, headers=headers)
         result = response.json()
 
@@ -1001,34 +1138,83 @@ class WeChatPublisher:
             # 如果是token过期，尝试刷新token后重试
             if result['errcode'] in [40001, 42001]:
                 print("⚠ access_token已过期，正在刷新...")
-                self.access_token = self.get_access_token(force_refresh=True)
-                token = self.access_token
+                token = self.get_access_token(force_refresh=True, stale_token=token)
                 url = f"{self.BASE_URL}/draft/add?access_token={token}"
                 data = json.dumps(articles, ensure_ascii=False).encode('utf-8')
+                self.api_budget.acquire('draft/add')
                 response = requests.post(url, data=data, headers=headers)
                 result = response.json()
 
                 if 'errcode' in result and result['errcode'] != 0:
-                    error_msg = self._handle_api_error(
-                        result['errcode'],
-                        result.get('errmsg', 'Unknown error'),
-                        context="创建草稿"
-                    )
-                    raise Exception(error_msg)
+                    raise self._api_error(result, context="创建草稿", endpoint='draft/add')
             else:
-                error_msg = self._handle_api_error(
-                    result['errcode'],
-                    result.get('errmsg', 'Unknown error'),
-                    context="创建草稿"
-                )
-                raise Exception(error_msg)
-
-        print(f"✓ 草稿创建成功!")
-        print(f"  media_id: {result.get('media_id')}")
+                raise self._api_error(result, context="创建草稿", endpoint='draft/add')
 
         return result
 
 
+def load_batch_manifest(manifest_file: str, publisher: WeChatPublisher, default_author: str = "") -> List[Dict[str, Any]]:
+    """
+    读取多图文草稿清单
+
+    清单为JSON数组，每项:
+        {"title": "标题", "content": "article.html", "author": "作者", "cover": "cover.png", "digest": "摘要"}
+    content、cover 为相对清单文件的路径；未指定封面时按标题自动选择
+
+    Args:
+        manifest_file: 清单文件路径
+        publisher: 发布器（用于自动选择封面）
+        default_author: 未指定作者时使用的作者
+
+    Returns:
+        create_draft_batch 的文章参数列表
+    """
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"清单必须是JSON数组: {manifest_file}")
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    articles = []
+    for index, entry in enumerate(entries, 1):
+        if not entry.get('title') or not entry.get('content'):
+            raise ValueError(f"清单第 {index} 项缺少 title 或 content")
+        content_file = os.path.join(base_dir, entry['content'])
+        if not os.path.exists(content_file):
+            raise FileNotFoundError(f"清单第 {index} 项的内容文件不存在: {content_file}")
+        with open(content_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        cover = os.path.join(base_dir, entry['cover']) if entry.get('cover') else publisher.auto_select_cover(entry['title'])
+        if not os.path.exists(cover):
+            print(f"⚠ 第 {index} 篇的封面不存在，不设置封面: {cover}")
+            cover = ""
+
+        articles.append({
+            'title': entry['title'],
+            'content': content,
+            'author': entry.get('author', default_author),
+            'digest': entry.get('digest', ''),
+            'cover': cover,
+            'content_base_dir': os.path.dirname(os.path.abspath(content_file)),
+        })
+    return articles
+
+
+# 因接口额度不足而失败时的退出码（编排脚本据此跳过发布而不是重试）
+EXIT_QUOTA_EXCEEDED = 3
+
+
+def print_api_budget(snapshot: Dict[str, Dict[str, Any]]) -> None:
+    """打印各接口今日用量（见 ApiBudget.snapshot）"""
+    print(f"📊 今日接口用量")
+    for endpoint, entry in snapshot.items():
+        quota = entry['quota'] if entry['quota'] is not None else '未知'
+        remaining = entry['remaining'] if entry['remaining'] is not None else '-'
+        status = "  ⚠️ 已用完（45009）" if entry['exhausted'] else ""
+        print(f"  {endpoint:<28} 已调用 {entry['used']:>5}  额度 {quota:>5}  剩余 {remaining:>5}{status}")
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -1039,6 +1225,7 @@ def main():
   %(prog)s --title "文章标题" --content article.html
   %(prog)s --title "文章标题" --content article.html --cover cover.png --author "作者名"
   %(prog)s --interactive  # 交互式模式
+  %(prog)s --batch articles.json  # 多图文草稿（一次提交多篇文章）
         """
     )
 
@@ -1048,11 +1235,51 @@ def main():
     parser.add_argument('--cover', default=os.path.join(os.path.dirname(__file__), 'cover.png'), help='封面图片路径（默认: skill 内置 cover.png）')
     parser.add_argument('-d', '--digest', help='文章摘要')
     parser.add_argument('--interactive', action='store_true', help='交互式模式')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='多图文草稿清单（JSON数组，每项含 title、content，可选 author、cover、digest；路径相对清单文件）')
+    parser.add_argument('--no-media-cache', action='store_true', help='不使用素材缓存（总是重新上传图片）')
+    parser.add_argument('--verify-media-cache', action='store_true', help='使用缓存的素材前确认其仍然存在')
+    parser.add_argument('--reconcile-media-cache', action='store_true', help='与素材库对账，清理失效的缓存条目后退出')
+    parser.add_argument('--evict-media-cache', type=float, metavar='DAYS', help='删除早于指定天数上传的缓存条目后退出')
+    parser.add_argument('--api-budget', action='store_true', help='显示各接口今日调用次数和剩余额度后退出')
+    parser.add_argument('--json', action='store_true', help='与 --api-budget 一起使用，以 JSON 输出')
 
     args = parser.parse_args()
 
     try:
-        publisher = WeChatPublisher()
+        # JSON 输出时加载配置的提示写到 stderr，stdout 只有 JSON
+        with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+            publisher = WeChatPublisher()
+
+        if args.api_budget:
+            if args.json:
+                print(json.dumps(publisher.api_budget.snapshot(), ensure_ascii=False, indent=2))
+            else:
+                print_api_budget(publisher.api_budget.snapshot())
+            return
+
+        # 素材缓存维护
+        if args.reconcile_media_cache or args.evict_media_cache is not None:
+            if args.evict_media_cache is not None:
+                removed = publisher.media_cache.evict(older_than_days=args.evict_media_cache)
+                print(f"✓ 已删除 {removed} 条素材缓存")
+            if args.reconcile_media_cache:
+                publisher.reconcile_media_cache()
+            return
+
+        if args.no_media_cache:
+            publisher.media_cache = None
+        publisher.verify_media_cache = args.verify_media_cache
+
+        # 多图文草稿
+        if args.batch:
+            articles = load_batch_manifest(args.batch, publisher, default_author=args.author)
+            publisher.create_draft_batch(articles)
+
+            print(f"\n{'='*50}")
+            print(f"✓ 发布成功！{len(articles)} 篇文章已合并为一个草稿，请前往微信公众号后台查看")
+            print(f"{'='*50}")
+            return
 
         # 交互式模式
         if args.interactive:
@@ -1091,19 +1318,14 @@ def main():
         print(f"封面: {cover or '(无)'}")
         print(f"{'='*50}\n")
 
-        # 上传封面（如果有）
-        thumb_media_id = ""
-        if cover and os.path.exists(cover):
-            thumb_media_id = publisher.upload_image(cover)
-
-        # 创建草稿
+        # 创建草稿（封面在额度检查之后随文章一起上传）
         result = publisher.create_draft(
             title=title,
             content=content,
             author=author,
-            thumb_media_id=thumb_media_id,
             digest=digest,
-            content_base_dir=os.path.dirname(os.path.abspath(content_file)) or "."
+            content_base_dir=os.path.dirname(os.path.abspath(content_file)) or ".",
+            cover=cover if cover and os.path.exists(cover) else ""
         )
 
         print(f"\n{'='*50}")
@@ -1113,6 +1335,9 @@ def main():
     except KeyboardInterrupt:
         print("\n\n操作已取消")
         sys.exit(0)
+    except QuotaExceededError as e:
+        print(f"\n✗ 接口额度不足: {e}")
+        sys.exit(EXIT_QUOTA_EXCEEDED)
     except Exception as e:
         print(f"\n✗ 错误: {e}")
         sys.exit(1)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+access_token 管理
+多个发布进程共用一个 token 缓存文件，保证同一时间只有一个进程请求新 token
+（微信每次发放新 token 都会让旧 token 在几分钟后失效，多个进程同时刷新会互相顶掉）
+
+- 进程内缓存：有效期内直接返回，不读文件
+- 跨进程文件锁：刷新前加锁，加锁后重新读取缓存文件，别的进程已经刷新过就直接使用
+- 提前刷新：进入过期前的刷新窗口后，在后台线程刷新，调用方继续使用当前 token
+- 原子写入：先写临时文件再替换
+
+缓存文件：~/.wechat-publisher/token_cache.json
+    {"access_token": "...", "expires_at": 1700007200.0, "updated_at": "2025-01-01 12:00:00", "scope": "<appid>@<接口地址>"}
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 过期前多少秒视为已过期（必须刷新后才能使用）
+EXPIRY_MARGIN = 300
+
+# 过期前多少秒开始在后台提前刷新
+PROACTIVE_MARGIN = 900
+
+
+class FileLock:
+    """跨进程排他文件锁（上下文管理器）"""
+
+    def __init__(self, lock_file: str):
+        self.lock_file = lock_file
+        self._fd = None
+
+    def __enter__(self) -> 'FileLock':
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 重试约 10 秒后失败，继续等待
+                    continue
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TokenManager:
+    """
+    access_token 管理器（线程安全、多进程安全）
+
+    Args:
+        cache_file: token 缓存文件
+        fetch: 请求新 token 的函数，返回 (access_token, expires_in)
+        scope: 缓存归属（如 appid@接口地址），与缓存文件中的不一致时视为没有缓存
+        expiry_margin: 过期前多少秒视为已过期
+        proactive_margin: 过期前多少秒开始在后台提前刷新
+    """
+
+    def __init__(self, cache_file: str, fetch: Callable[[], Tuple[str, int]], scope: str = "",
+                 expiry_margin: int = EXPIRY_MARGIN, proactive_margin: int = PROACTIVE_MARGIN):
+        self.cache_file = cache_file
+        self.lock_file = cache_file + '.lock'
+        self.fetch = fetch
+        self.scope = scope
+        self.expiry_margin = expiry_margin
+        self.proactive_margin = max(proactive_margin, expiry_margin)
+
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refreshing = False
+
+    @property
+    def token(self) -> Optional[str]:
+        """当前进程内缓存的 token（可能已过期）"""
+        return self._token
+
+    def get(self) -> str:
+        """
+        获取有效的 access_token
+
+        稳态下只读进程内缓存；进入提前刷新窗口时启动后台刷新并立即返回当前 token；
+        已过期（或没有缓存）时加锁刷新
+        """
+        now = time.time()
+        token, expires_at = self._token, self._expires_at
+        if token and now < expires_at - self.expiry_margin:
+            if now >= expires_at - self.proactive_margin:
+                self._refresh_in_background()
+            return token
+
+        with self._lock:
+            if self._token and time.time() < self._expires_at - self.expiry_margin:
+                return self._token
+            return self._refresh(stale_token=None)
+
+    def refresh(self, stale_token: Optional[str] = None) -> str:
+        """
+        强制刷新（接口返回 40001/42001 时调用）
+
+        Args:
+            stale_token: 被接口拒绝的 token。别的线程或进程已经换成新 token 时直接使用新的，不再请求
+
+        Returns:
+            新的 access_token
+        """
+        with self._lock:
+            if stale_token is not None and self._token and self._token != stale_token \
+                    and time.time() < self._expires_at - self.expiry_margin:
+                return self._token
+            return self._refresh(stale_token=stale_token or self._token)
+
+    # ==================== 内部 ====================
+
+    def _refresh(self, stale_token: Optional[str]) -> str:
+        """刷新（调用方需持有 self._lock）：缓存文件中有可用的新 token 时直接使用"""
+        return self._locked_refresh(lambda cached: self._usable(cached, stale_token, self.expiry_margin))
+
+    def _locked_refresh(self, usable: Callable[[Dict], bool]) -> str:
+        # 先看缓存文件（别的进程可能已经刷新），不必加文件锁
+        cached = self._read_disk()
+        if usable(cached):
+            return self._adopt(cached)
+
+        with FileLock(self.lock_file):
+            # 加锁后再读一次：等锁期间别的进程可能已经刷新
+            cached = self._read_disk()
+            if usable(cached):
+                return self._adopt(cached)
+
+            print("→ 正在获取新的access_token...")
+            access_token, expires_in = self.fetch()
+            entry = {
+                'access_token': access_token,
+                'expires_at': time.time() + expires_in,
+                'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'scope': self.scope,
+            }
+            self._write_disk(entry)
+            print(f"✓ 获取access_token成功 (有效期: {expires_in}秒)")
+            return self._adopt(entry)
+
+    def _usable(self, cached: Optional[Dict], stale_token: Optional[str], margin: float) -> bool:
+        if not cached or cached.get('scope', '') != self.scope:
+            return False
+        if stale_token is not None and cached.get('access_token') == stale_token:
+            return False
+        return time.time() < cached.get('expires_at', 0) - margin
+
+    def _adopt(self, entry: Dict) -> str:
+        self._token = entry['access_token']
+        self._expires_at = entry['expires_at']
+        return self._token
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                # 缓存文件中的 token 已经不在刷新窗口内（别的进程刷新过）时直接使用
+                self._locked_refresh(lambda cached: self._usable(cached, None, self.proactive_margin))
+        except Exception as e:
+            # 后台刷新失败不影响当前 token，过期时会在前台重试
+            print(f"⚠ 后台刷新access_token失败: {e}")
+        finally:
+            self._refreshing = False
+
+    def _read_disk(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠ 读取token缓存失败: {e}")
+            return None
+        if not isinstance(cached, dict) or 'access_token' not in cached:
+            return None
+        return cached
+
+    def _write_disk(self, entry: Dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            # 缓存不可写时仍可使用进程内的 token
+            print(f"⚠ 写入token缓存失败: {e}")